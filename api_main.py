@@ -1,15 +1,44 @@
 # api_main.py
 import os
 import uuid   # 🔹 ADD THIS
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, Field
 import numpy as np
 
 from config.variables import VARIABLES
-from src.embeddings import W2VEmbedder, build_weighted_user_vector
-from src.pinecone_client import ensure_index_exists, query_similar, upsert_users  # 🔹 ADD upsert_users
+from src.async_index import AsyncIndexClient
+from src.embeddings import (
+    INFERENCE_VECTORS_FILE,
+    InferenceEmbedder,
+    W2VEmbedder,
+    build_weighted_user_vector,
+    build_weighted_user_vectors,
+    check_weight_overrides,
+    combine_field_vectors,
+    embed_user_fields,
+    embedding_fields,
+    field_weights,
+)
+from src.executors import BoundedExecutor, Overloaded
+from src.ingest import append_profile_log
+from src.field_store import META_FILE, FieldVectorStore
+from src.match_cache import MatchCache, cache_key
+from src.metadata_filter import validate_filter
+from src.precomputed import META_FILE as PRECOMPUTED_META_FILE, PrecomputedMatches
+from src.profile_store import PROFILE_STORE_PATH, ProfileStore
+from src.profiling import RequestProfiler
+from src.metrics import REGISTRY, counter, gauge, histogram
+from src.model_registry import ACTIVE_INDEX_POINTER, load_published_embedder, read_pointer
+from src.reciprocal import reciprocal_filter, rescore_matches
+from src.vector_backend import backend_name, get_index_client
+from src.write_buffer import BufferedIndexClient
 
 
 
@@ -55,12 +84,102 @@ PINE_ENV = os.getenv("PINECONE_ENV")
 INDEX_NAME = os.getenv("PINECONE_INDEX", "connectwise-index")
 VECTOR_DIM = int(os.getenv("VECTOR_DIM", 100))
 
+# "pinecone" (default), "local" (in-process NumPy index, no network) or
+# "shared" (local index mmap'd across all workers on the host)
+VECTOR_BACKEND = backend_name()
+index_client = get_index_client(VECTOR_BACKEND)
+ensure_index_exists = index_client.ensure_index_exists
+query_similar = index_client.query_similar
+
 # Path to trained W2V model
 BASE_DIR = os.path.dirname(__file__)
 W2V_MODEL_PATH = os.path.join(BASE_DIR, "models", "w2v_connectwise.model")
+# vectors-only export written by run_pipeline.py; memory-mapped and shared by all workers
+W2V_VECTORS_PATH = os.getenv("W2V_VECTORS_PATH", os.path.join(BASE_DIR, "models", "w2v_connectwise.kv"))
+# gensim-free export (vocab.txt + vectors.npy); preferred because it needs only NumPy
+W2V_INFERENCE_DIR = os.getenv("W2V_INFERENCE_DIR", os.path.join(BASE_DIR, "models", "w2v_connectwise_inference"))
+
+# per-field vectors written by `run_pipeline.py --field-store`; needed for custom match weights
+FIELD_STORE_DIR = os.getenv("FIELD_STORE_DIR", os.path.join(BASE_DIR, "models", "field_store"))
+# candidates fetched from the index and rescored when /match-users gets custom weights
+RESCORE_CANDIDATES = int(os.getenv("RESCORE_CANDIDATES", 200))
+
+# output of scripts/precompute_matches.py, served by GET /users/{user_id}/matches
+PRECOMPUTED_DIR = os.getenv("PRECOMPUTED_DIR", os.path.join(BASE_DIR, "models", "precomputed"))
+
+# active-index alias changes (scripts/migrate_index.py) are picked up every MODEL_POLL_INTERVAL seconds; 0 = never
+MODEL_POLL_INTERVAL = float(os.getenv("MODEL_POLL_INTERVAL", 10))
+# registrations are appended here for the incremental model updater ("" = off)
+NEW_PROFILES_LOG = os.getenv("NEW_PROFILES_LOG", os.path.join(BASE_DIR, "data", "new_profiles.ndjson"))
+
+# Start-up: model + index are loaded in the background so /health answers right away
+STARTUP_TIMEOUT = float(os.getenv("STARTUP_TIMEOUT", 30))   # seconds per attempt
+STARTUP_RETRIES = int(os.getenv("STARTUP_RETRIES", 5))
+STARTUP_BACKOFF = float(os.getenv("STARTUP_BACKOFF", 1.0))  # seconds, doubled per retry
+
+# Per-stage pools: CPU-bound embedding vs blocking index I/O.
+# *_MAX_PENDING caps queued work; beyond it requests get a fast 503 instead of a long wait.
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", os.cpu_count() or 4))
+EMBED_MAX_PENDING = int(os.getenv("EMBED_MAX_PENDING", 64))
+INDEX_WORKERS = int(os.getenv("INDEX_WORKERS", 16))  # also the Pinecone connection pool size
+INDEX_MAX_PENDING = int(os.getenv("INDEX_MAX_PENDING", 256))
+# max profiles accepted by /match-users/batch in one request
+MATCH_BATCH_MAX = int(os.getenv("MATCH_BATCH_MAX", 256))
+
+# Write-behind upserts (src/write_buffer.py): registrations are coalesced into one
+# upsert per WRITE_BUFFER_MAX_BATCH vectors or WRITE_BUFFER_MAX_AGE seconds, and
+# merged into query results until WRITE_BUFFER_LINGER seconds after their flush.
+# WRITE_BUFFER_MAX_AGE=0 disables the buffer (one upsert per registration).
+WRITE_BUFFER_MAX_AGE = float(os.getenv("WRITE_BUFFER_MAX_AGE", 0.05))
+WRITE_BUFFER_MAX_BATCH = int(os.getenv("WRITE_BUFFER_MAX_BATCH", 100))  # Pinecone's recommended upsert batch
+WRITE_BUFFER_MAX_PENDING = int(os.getenv("WRITE_BUFFER_MAX_PENDING", 5000))
+WRITE_BUFFER_LINGER = float(os.getenv("WRITE_BUFFER_LINGER", 5.0))
+
+# /match-users result cache (MATCH_CACHE_SIZE=0 disables it).
+# TTL also bounds staleness across workers; within a worker, a registration makes
+# older entries stale after MATCH_CACHE_MAX_STALENESS seconds.
+MATCH_CACHE_SIZE = int(os.getenv("MATCH_CACHE_SIZE", 10000))
+MATCH_CACHE_MAX_BYTES = int(os.getenv("MATCH_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+MATCH_CACHE_TTL = float(os.getenv("MATCH_CACHE_TTL", 30))
+MATCH_CACHE_MAX_STALENESS = float(os.getenv("MATCH_CACHE_MAX_STALENESS", 1.0))
+
+# Sampling profiler (src/profiling.py), off by default: PROFILE_SAMPLE_RATE of the
+# requests are sampled and saved to PROFILE_DIR when slower than PROFILE_SLOW_MS.
+# With PROFILE_ALLOW_HEADER=1 a request sent with "X-Profile: 1" is always profiled.
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", 500))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(BASE_DIR, "data", "request_profiles"))
+PROFILE_ALLOW_HEADER = os.getenv("PROFILE_ALLOW_HEADER", "0") == "1"
 
 # ----------------- FastAPI app -----------------
-app = FastAPI(title="ConnectWise Matching API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # don't block start-up: the process serves /health immediately, /ready flips when done
+    task = asyncio.create_task(startup())
+    watcher = asyncio.create_task(watch_serving()) if MODEL_POLL_INTERVAL > 0 else None
+    yield
+    task.cancel()
+    if watcher is not None:
+        watcher.cancel()
+    EMBED_POOL.shutdown()
+    # flush queued registrations before the index pools go away
+    for client, closing in list(RETIRING.items()):
+        if not closing.done():
+            closing.cancel()
+            await close_index(client)
+    if NEXT is not None and NEXT["async_index"] is not ASYNC_INDEX:
+        await close_index(NEXT["async_index"])
+    if ASYNC_INDEX is not None:
+        await close_index(ASYNC_INDEX)
+    if PRECOMPUTED is not None:
+        PRECOMPUTED.close()
+    if PROFILE_STORE is not None:
+        PROFILE_STORE.close()
+
+
+app = FastAPI(title="ConnectWise Matching API", lifespan=lifespan)
 
 # CORS (so frontend can call this from another port)
 app.add_middleware(
@@ -71,86 +190,603 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def instrument(request: Request, call_next):
+    """Request latency by route template, plus the opt-in sampling profiler."""
+    forced = PROFILE_ALLOW_HEADER and request.headers.get("x-profile") == "1"
+    sampler = PROFILER.start(forced) if forced or PROFILE_SAMPLE_RATE > 0 else None
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - start
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"  # raw paths would explode cardinality
+        HTTP_LATENCY.observe(elapsed, path=path, method=request.method, status=status)
+        if sampler is not None:
+            profile = await asyncio.to_thread(PROFILER.finish, sampler, f"{request.method} {path}", elapsed, forced)
+            if profile is not None:
+                PROFILES_WRITTEN.inc()
+                print(f"💾 Profiled {request.method} {path} ({elapsed * 1000:.0f} ms): {profile}")
+    return response
+
 # ----------------- Pydantic models -----------------
 
 class ProfilePayload(BaseModel):
     profile: dict
     saved_at: str | None = None
     version: str | None = None
+    # optional metadata filter on FILTERABLE_FIELDS, Pinecone syntax (see src/metadata_filter.py)
+    filter: dict | None = None
+
+
+class MatchPayload(ProfilePayload):
+    # optional {VARIABLES key: weight} override, e.g. {"skills": 2.0, "location": 0.1}
+    weights: dict[str, float] | None = None
+    # only return users whose offers meet this profile's needs and vice versa (src/reciprocal.py)
+    reciprocal: bool = False
+
+
+class BatchProfile(BaseModel):
+    profile: dict
+    top_k: int = Field(3, ge=1, le=100)
+    user_id: str | None = None  # if the profile is already stored, its id is left out of its matches
+    filter: dict | None = None
+
+
+class BatchMatchPayload(BaseModel):
+    profiles: list[BatchProfile]
 
 
 # ----------------- Global objects (start-up) -----------------
 
-if not os.path.exists(W2V_MODEL_PATH):
+def load_embedder():
+    """
+    Load the model the index was built with (no active-index alias), fastest
+    serving format first: inference export (NumPy only) > mmap'd KeyedVectors
+    > full Word2Vec model (both need gensim). Published versions
+    (src/model_registry.py) are only served through the alias.
+    """
+    if os.path.exists(os.path.join(W2V_INFERENCE_DIR, INFERENCE_VECTORS_FILE)):
+        embedder = InferenceEmbedder.load(W2V_INFERENCE_DIR)
+        print("✅ Loaded inference vectors (NumPy only).")
+        return embedder
+    if os.path.exists(W2V_VECTORS_PATH):
+        embedder = W2VEmbedder.load_vectors(W2V_VECTORS_PATH, mmap="r")
+        print("✅ Memory-mapped Word2Vec vectors.")
+        return embedder
+    if os.path.exists(W2V_MODEL_PATH):
+        embedder = W2VEmbedder.load(W2V_MODEL_PATH)
+        print("✅ Loaded Word2Vec model.")
+        return embedder
     raise RuntimeError(f"Word2Vec model not found at {W2V_MODEL_PATH}. Run scripts/run_pipeline.py first.")
 
-if not PINE_API or not PINE_ENV:
-    raise RuntimeError("Pinecone API key or environment not configured in .env.")
 
-# load W2V model
-EMBEDDER = W2VEmbedder.load(W2V_MODEL_PATH)
-print("✅ Loaded Word2Vec model.")
+# small profile embedded (and queried) once before the worker reports ready
+WARMUP_PROFILE = {
+    "role": "Student",
+    "domain": "Computer Science",
+    "skills": ["Python", "Machine Learning"],
+    "languages_spoken": ["English"],
+    "offers": ["Code/Design"],
+    "needs": ["Collaborator"],
+    "one_line_bio": "Warmup profile",
+    "location": "Delhi India",
+}
+
+EMBEDDER = None
+INDEX = None
+ASYNC_INDEX = None
+# index being served; follows the active-index alias (scripts/migrate_index.py) when there is one
+ACTIVE_INDEX_NAME = INDEX_NAME
+# during a migration: {"index", "embedder", "async_index"} of the new index, which gets dual-writes
+NEXT = None
+# index clients replaced by an alias switch -> their delayed close_index() task
+RETIRING = {}
+FIELD_STORE = None
+PRECOMPUTED = None
+# every registered profile, by user id (src/profile_store.py); PROFILE_STORE_PATH="" = off
+PROFILE_STORE = None
+EMBED_POOL = BoundedExecutor("embed", EMBED_WORKERS, EMBED_MAX_PENDING)
+MATCH_CACHE = MatchCache(MATCH_CACHE_SIZE, MATCH_CACHE_MAX_BYTES, MATCH_CACHE_TTL, MATCH_CACHE_MAX_STALENESS)
+# per-step start-up status, reported by /ready
+STARTUP = {"embedder": "pending", "index": "pending", "field_store": "pending", "precomputed": "pending", "profile_store": "pending", "warmup": "pending", "ready": False, "error": None}
+
+# /match-users latency, default vs custom field weights
+MATCH_LATENCY = histogram(
+    "match_users_latency_seconds", "Latency of /match-users requests.", ["weights"]
+)
+HTTP_LATENCY = histogram(
+    "http_request_duration_seconds", "Latency of HTTP requests by route.", ["path", "method", "status"]
+)
+# hot-path breakdown: embed (tokenize + vector lookups), sanitize, upsert, query, rescore, ...
+STAGE_LATENCY = histogram(
+    "request_stage_seconds", "Time spent in each stage of a request.", ["endpoint", "stage"]
+)
+MATCH_RESULTS = histogram(
+    "match_results", "Matches returned per query.", ["endpoint"], buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+)
+ZERO_VECTORS = counter(
+    "zero_vector_rejections_total", "Profiles rejected because they embed to a zero vector.", ["endpoint"]
+)
+INDEX_ERRORS = counter(
+    "index_errors_total", "Failed vector index calls (overload rejections included).", ["endpoint", "operation"]
+)
+PROFILES_WRITTEN = counter("profiles_written_total", "Slow-request profiles saved by the sampling profiler.")
+PROFILER = RequestProfiler(PROFILE_SAMPLE_RATE, PROFILE_SLOW_MS, PROFILE_DIR, PROFILE_INTERVAL_MS)
+
+
+# the numbers below already live on the objects: read them at scrape time only
+def _embedder_cache_stats(field: str) -> dict:
+    stats = EMBEDDER.cache_stats() if EMBEDDER is not None else {}
+    return {(cache,): s[field] for cache, s in stats.items() if s is not None}
+
+
+counter(
+    "embedder_cache_hits_total", "Embedder cache hits (option table, text vectors); resets on model switch.", ["cache"]
+).set_function(lambda: _embedder_cache_stats("hits"))
+counter(
+    "embedder_cache_misses_total", "Embedder cache misses (option table, text vectors); resets on model switch.", ["cache"]
+).set_function(lambda: _embedder_cache_stats("misses"))
+counter("match_cache_hits_total", "/match-users result cache hits.").set_function(lambda: MATCH_CACHE.stats()["hits"])
+counter("match_cache_misses_total", "/match-users result cache misses.").set_function(lambda: MATCH_CACHE.stats()["misses"])
+gauge("match_cache_entries", "Entries in the /match-users result cache.").set_function(lambda: MATCH_CACHE.stats()["size"])
+
+
+def _write_buffer_stats() -> dict:
+    return ASYNC_INDEX.stats() if isinstance(ASYNC_INDEX, BufferedIndexClient) else {}
 
-# connect / create Pinecone index
-INDEX = ensure_index_exists(PINE_API, INDEX_NAME, VECTOR_DIM, PINE_ENV)
-print(f"✅ Connected to Pinecone index '{INDEX_NAME}'.")
+
+counter("index_upsert_calls_total", "Upsert calls sent to the vector index by the write buffer.").set_function(
+    lambda: _write_buffer_stats().get("upsert_calls", 0)
+)
+counter("write_buffer_vectors_flushed_total", "Vectors upserted by write buffer flushes.").set_function(
+    lambda: _write_buffer_stats().get("vectors_flushed", 0)
+)
+counter("write_buffer_flushes_total", "Successful write buffer flushes by trigger.", ["reason"]).set_function(
+    lambda: {(reason,): n for reason, n in _write_buffer_stats().get("flushes", {}).items()}
+)
+counter("write_buffer_flush_failures_total", "Failed write buffer flushes (their vectors are retried).").set_function(
+    lambda: _write_buffer_stats().get("failures", 0)
+)
+gauge("write_buffer_pending", "Vectors queued in the write buffer, not yet sent.").set_function(
+    lambda: _write_buffer_stats().get("pending", 0)
+)
+gauge("executor_pending_jobs", "Jobs queued or running per executor.", ["executor"]).set_function(
+    lambda: {(pool.name,): pool.pending for pool in (EMBED_POOL, ASYNC_INDEX and ASYNC_INDEX.pool) if pool}
+)
+
+
+def stage(endpoint: str, name: str):
+    """with stage("match_users", "embed"): ... -> request_stage_seconds"""
+    return STAGE_LATENCY.time(endpoint=endpoint, stage=name)
+
+
+async def index_call(endpoint: str, operation: str, call):
+    """Await an index call as its own stage, counting failures in index_errors_total."""
+    with stage(endpoint, operation):
+        try:
+            return await call
+        except Exception:
+            INDEX_ERRORS.inc(endpoint=endpoint, operation=operation)
+            raise
+
+
+def make_async_index(index):
+    """Async client for a raw index, behind the write buffer unless it's disabled."""
+    client = AsyncIndexClient(index_client, index, INDEX_WORKERS, INDEX_MAX_PENDING)
+    if WRITE_BUFFER_MAX_AGE <= 0:
+        return client
+    return BufferedIndexClient(
+        client, WRITE_BUFFER_MAX_BATCH, WRITE_BUFFER_MAX_AGE, WRITE_BUFFER_MAX_PENDING, WRITE_BUFFER_LINGER
+    )
+
+
+async def close_index(client, delay: float = 0):
+    """Close an index client after `delay` seconds, flushing its write buffer first."""
+    await asyncio.sleep(delay)
+    if isinstance(client, BufferedIndexClient):
+        await client.aclose()
+    else:
+        client.close()
+    RETIRING.pop(client, None)
+
+
+async def _with_retries(step: str, fn, *args):
+    """Run a blocking start-up step in a thread with a timeout, retrying with backoff."""
+    for attempt in range(1, STARTUP_RETRIES + 1):
+        try:
+            return await asyncio.wait_for(asyncio.to_thread(fn, *args), timeout=STARTUP_TIMEOUT)
+        except Exception as e:
+            reason = "timed out" if isinstance(e, asyncio.TimeoutError) else repr(e)
+            print(f"⚠️ Start-up step '{step}' failed (attempt {attempt}/{STARTUP_RETRIES}): {reason}")
+            if attempt == STARTUP_RETRIES:
+                raise
+            await asyncio.sleep(STARTUP_BACKOFF * 2 ** (attempt - 1))
+
+
+def warmup():
+    """Embed a sample profile and run one query so the first real request isn't cold."""
+    vec = build_weighted_user_vector(WARMUP_PROFILE, EMBEDDER, VARIABLES)
+    if np.any(vec):
+        query_similar(INDEX, vec, top_k=1)
+
+
+async def startup():
+    global EMBEDDER, INDEX, ASYNC_INDEX, ACTIVE_INDEX_NAME, FIELD_STORE, PRECOMPUTED, PROFILE_STORE
+    try:
+        if VECTOR_BACKEND == "pinecone" and (not PINE_API or not PINE_ENV):
+            raise RuntimeError("Pinecone API key or environment not configured in .env.")
+
+        # load W2V vectors (the alias pins index + model after a blue/green migration)
+        STARTUP["embedder"] = "loading"
+        alias = read_pointer(ACTIVE_INDEX_POINTER)
+        if alias is not None:
+            ACTIVE_INDEX_NAME = alias["index"]
+            EMBEDDER = await _with_retries("embedder", load_published_embedder, alias["model"])
+        else:
+            EMBEDDER = await _with_retries("embedder", load_embedder)
+        STARTUP["embedder"] = "ok"
+
+        # connect / create vector index
+        STARTUP["index"] = "connecting"
+        INDEX = await _with_retries(
+            "index", ensure_index_exists, PINE_API, ACTIVE_INDEX_NAME, VECTOR_DIM, PINE_ENV, INDEX_WORKERS
+        )
+        ASYNC_INDEX = make_async_index(INDEX)
+        STARTUP["index"] = "ok"
+        print(f"✅ Connected to {VECTOR_BACKEND} index '{ACTIVE_INDEX_NAME}'.")
+
+        # optional: without it, /match-users rejects custom weights
+        if os.path.exists(os.path.join(FIELD_STORE_DIR, META_FILE)):
+            STARTUP["field_store"] = "loading"
+            FIELD_STORE = await _with_retries("field_store", FieldVectorStore.open, FIELD_STORE_DIR)
+            STARTUP["field_store"] = "ok"
+            print(f"✅ Memory-mapped field store ({len(FIELD_STORE)} users).")
+        else:
+            STARTUP["field_store"] = "skipped"
+
+        # optional: without it, /users/{id}/matches always queries live
+        if os.path.exists(os.path.join(PRECOMPUTED_DIR, PRECOMPUTED_META_FILE)):
+            STARTUP["precomputed"] = "loading"
+            PRECOMPUTED = await _with_retries("precomputed", PrecomputedMatches.open, PRECOMPUTED_DIR)
+            STARTUP["precomputed"] = "ok"
+            print(f"✅ Memory-mapped precomputed matches ({len(PRECOMPUTED)} users, k={PRECOMPUTED.k}).")
+        else:
+            STARTUP["precomputed"] = "skipped"
+
+        if PROFILE_STORE_PATH:
+            STARTUP["profile_store"] = "opening"
+            PROFILE_STORE = await _with_retries("profile_store", ProfileStore, PROFILE_STORE_PATH)
+            STARTUP["profile_store"] = "ok"
+            print(f"✅ Opened profile store {PROFILE_STORE_PATH}.")
+        else:
+            STARTUP["profile_store"] = "skipped"
+
+        STARTUP["warmup"] = "running"
+        await _with_retries("warmup", warmup)
+        STARTUP["warmup"] = "ok"
+        STARTUP["ready"] = True
+        print("✅ Ready to serve traffic.")
+    except Exception as e:
+        for step in ("embedder", "index", "field_store", "precomputed", "profile_store", "warmup"):
+            if STARTUP[step] not in ("ok", "pending", "skipped"):
+                STARTUP[step] = "failed"
+        STARTUP["error"] = str(e) or repr(e)
+        print(f"❌ Start-up failed: {STARTUP['error']}")
+
+
+async def open_serving(target: dict) -> dict:
+    """Embedder + index client for an alias entry {"index", "model"}."""
+    embedder = await asyncio.to_thread(load_published_embedder, target["model"])
+    index = await asyncio.to_thread(
+        ensure_index_exists, PINE_API, target["index"], embedder.vector_size, PINE_ENV, INDEX_WORKERS
+    )
+    return {
+        "index": target["index"],
+        "embedder": embedder,
+        "async_index": make_async_index(index),
+    }
+
+
+async def sync_alias(alias: dict):
+    """Follow the active-index alias: start/stop dual-writes to "next", switch index + model together."""
+    global EMBEDDER, INDEX, ASYNC_INDEX, ACTIVE_INDEX_NAME, NEXT
+    target = alias.get("next")
+    if target is not None and (
+        NEXT is None or (NEXT["index"], NEXT["embedder"].version) != (target["index"], target["model"]["version"])
+    ):
+        NEXT = await open_serving(target)
+        print(f"🔹 Dual-writing new registrations to '{target['index']}'.")
+
+    if (alias["index"], alias["model"]["version"]) != (ACTIVE_INDEX_NAME, EMBEDDER.version):
+        if NEXT is not None and (NEXT["index"], NEXT["embedder"].version) == (alias["index"], alias["model"]["version"]):
+            serving = NEXT
+        else:
+            serving = await open_serving(alias)
+        old_index = ASYNC_INDEX
+        # no await between these assignments: every request sees either the old or the new pair
+        EMBEDDER, INDEX, ASYNC_INDEX = serving["embedder"], serving["async_index"].index, serving["async_index"]
+        ACTIVE_INDEX_NAME = serving["index"]
+        MATCH_CACHE.clear()
+        # let in-flight requests on the old index finish (and its queued writes
+        # flush: it's the rollback target) before its pool goes away
+        RETIRING[old_index] = asyncio.create_task(close_index(old_index, delay=60))
+        print(f"✅ Switched to index '{ACTIVE_INDEX_NAME}' with model version {EMBEDDER.version}.")
+
+    if target is None and NEXT is not None:
+        if NEXT["async_index"] is not ASYNC_INDEX:
+            await close_index(NEXT["async_index"])
+        NEXT = None
+
+
+async def watch_serving():
+    """
+    Poll for a new serving set-up; in-flight requests keep the objects they started with.
+    With an active-index alias, follow it (index and model switch together).
+    Without one the index holds vectors of the model loaded at start-up, so a
+    newly published version is not swapped in: queries embedded with it would
+    be scored against vectors from the old space. It goes live through
+    scripts/migrate_index.py (re-embed, then flip the alias).
+    """
+    ignored = None
+    while True:
+        await asyncio.sleep(MODEL_POLL_INTERVAL)
+        if not STARTUP["ready"]:
+            continue
+        try:
+            alias = await asyncio.to_thread(read_pointer, ACTIVE_INDEX_POINTER)
+            if alias is not None:
+                await sync_alias(alias)
+                continue
+            record = await asyncio.to_thread(read_pointer)
+            if record is not None and record["version"] not in (EMBEDDER.version, ignored):
+                ignored = record["version"]
+                print(f"⚠️ Model version {record['version']} was published but index '{ACTIVE_INDEX_NAME}' holds "
+                      f"vectors from {EMBEDDER.version}; not switching. Run scripts/migrate_index.py to re-embed and switch.")
+        except Exception as e:
+            print(f"⚠️ Reload failed, keeping index '{ACTIVE_INDEX_NAME}' / model {EMBEDDER.version}: {e!r}")
+
+
+def require_ready():
+    if not STARTUP["ready"]:
+        raise HTTPException(status_code=503, detail="Service is starting up, not ready yet.")
+
+
+def check_filter(filter: dict | None) -> dict | None:
+    """400 on a malformed filter; an empty filter means no filter."""
+    if not filter:
+        return None
+    try:
+        return validate_filter(filter)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def embed_profile(user_data: dict, endpoint: str) -> np.ndarray:
+    """Embed on the dedicated embedding pool; 400 if the profile has no usable tokens."""
+    with stage(endpoint, "embed"):
+        vec = await EMBED_POOL.run(build_weighted_user_vector, user_data, EMBEDDER, VARIABLES)
+    if not np.any(vec):  # all zeros
+        ZERO_VECTORS.inc(endpoint=endpoint)
+        raise HTTPException(status_code=400, detail="Could not build a meaningful vector from profile.")
+    return vec
+
+
+def weighted_query_vector(user_data: dict, weights: np.ndarray) -> np.ndarray:
+    """Query vector from the profile's per-field vectors, combined with `weights`."""
+    field_vecs, present = embed_user_fields([user_data], EMBEDDER, VARIABLES)
+    return combine_field_vectors(field_vecs, present, weights)[0]
+
+
+async def match_with_weights(user_data: dict, overrides: dict, top_k: int, filter: dict = None) -> list:
+    """
+    Custom-weighted match:
+    1. Combine the query's field vectors with the custom weights
+    2. Fetch RESCORE_CANDIDATES candidates from the index (stored vectors use the default weights)
+    3. Rescore the candidates from their stored field vectors with the custom weights
+    Candidates missing from the field store (registered after it was built) keep their index score.
+    """
+    weights = field_weights(VARIABLES, overrides)
+    with stage("match_users", "embed"):
+        vec = await EMBED_POOL.run(weighted_query_vector, user_data, weights)
+    if not np.any(vec):
+        ZERO_VECTORS.inc(endpoint="match_users")
+        raise HTTPException(status_code=400, detail="Could not build a meaningful vector from profile.")
+
+    res = await index_call(
+        "match_users", "query", ASYNC_INDEX.query_similar(vec, top_k=max(RESCORE_CANDIDATES, top_k), filter=filter)
+    )
+    candidates = format_matches(res)
+    keys = [v["key"] for v in embedding_fields(VARIABLES)]
+    store_weights = FIELD_STORE.weights_vector(dict(zip(keys, weights.tolist())))
+    with stage("match_users", "rescore"):
+        ids, scores = await EMBED_POOL.run(FIELD_STORE.rescore, vec, [m["id"] for m in candidates], store_weights)
+    rescored = dict(zip(ids, scores.tolist()))
+    for m in candidates:
+        m["score"] = rescored.get(m["id"], m["score"])
+    candidates.sort(key=lambda m: m["score"], reverse=True)
+    return candidates[:top_k]
+
+
+async def save_profile(user_id: str, profile: dict, saved_at: str = None):
+    with stage("register_and_match", "store"):
+        await asyncio.to_thread(PROFILE_STORE.put, user_id, profile, saved_at)
+
+
+def format_matches(res, exclude_id: str = None) -> list:
+    # res is a dict-like: {"matches": [...]}
+    matches = []
+    for m in res["matches"]:
+        if m["id"] == exclude_id:
+            continue  # skip self
+        matches.append({
+            "id": m["id"],
+            "score": float(m["score"]),
+            "metadata": m.get("metadata", {}),
+        })
+    return matches
 
 
 # ----------------- Routes -----------------
 
 @app.get("/health")
 def health():
+    # liveness only: answers even while the model/index are still loading
     return {
         "status": "ok",
-        "index": INDEX_NAME,
+        "ready": STARTUP["ready"],
+        "backend": VECTOR_BACKEND,
+        "index": ACTIVE_INDEX_NAME,
+        "model_version": EMBEDDER.version if EMBEDDER is not None else None,
+        "dual_write_index": NEXT["index"] if NEXT is not None else None,
         "vector_dim": VECTOR_DIM
     }
 
 
-@app.post("/match-users")
-def match_users(payload: ProfilePayload):
-    try:
-        user_data = payload.profile  # this is exactly your profile dict from frontend
+@app.get("/ready")
+def ready():
+    """Readiness probe: 200 once model, index and warmup are done, 503 before that."""
+    status_code = 200 if STARTUP["ready"] else 503
+    return JSONResponse(status_code=status_code, content=STARTUP)
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
-        # embed new profile
-        vec = build_weighted_user_vector(user_data, EMBEDDER, VARIABLES)
 
-        if not np.any(vec):  # all zeros
-            raise HTTPException(status_code=400, detail="Could not build a meaningful vector from profile.")
+@app.get("/users/{user_id}/profile")
+async def user_profile(user_id: str):
+    """A stored profile, by id (profile store lookup, no index call)."""
+    require_ready()
+    if PROFILE_STORE is None:
+        raise HTTPException(status_code=404, detail="No profile store configured (set PROFILE_STORE_PATH).")
+    profile = await asyncio.to_thread(PROFILE_STORE.get, user_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Unknown user '{user_id}'.")
+    return {"user_id": user_id, "profile": profile}
 
-        # query pinecone
-        res = query_similar(INDEX, vec, top_k=3)
 
-        # res is a dict-like: {"matches": [...]}
-        matches = []
-        for m in res["matches"]:
-            matches.append({
-                "id": m["id"],
-                "score": float(m["score"]),
-                "metadata": m.get("metadata", {})
-            })
+@app.get("/users/{user_id}/matches")
+async def user_matches(user_id: str, top_k: int = Query(10, ge=1, le=100)):
+    """
+    Matches for an already stored user: served from the precomputed table
+    (scripts/precompute_matches.py) when the user was in the last run,
+    otherwise a live query with the user's stored vector.
+    """
+    require_ready()
+    if PRECOMPUTED is not None and user_id in PRECOMPUTED and top_k <= PRECOMPUTED.k:
+        with stage("user_matches", "precomputed"):
+            # reads rows of the mmap'd table (and their metadata): off the event loop
+            matches = await asyncio.to_thread(PRECOMPUTED.get, user_id, top_k)
+        MATCH_RESULTS.observe(len(matches), endpoint="user_matches")
+        return {"user_id": user_id, "source": "precomputed", "matches": matches}
 
-        return {"matches": matches}
+    try:
+        vectors = await index_call("user_matches", "fetch", ASYNC_INDEX.fetch_vectors([user_id]))
+        if user_id not in vectors:
+            raise HTTPException(status_code=404, detail=f"Unknown user '{user_id}'.")
+        # one extra hit so dropping the user itself still leaves top_k
+        res = await index_call("user_matches", "query", ASYNC_INDEX.query_similar(vectors[user_id], top_k=top_k + 1))
+        matches = format_matches(res, exclude_id=user_id)[:top_k]
+        MATCH_RESULTS.observe(len(matches), endpoint="user_matches")
+        return {"user_id": user_id, "source": "live", "matches": matches}
 
     except HTTPException:
         raise
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/match-users")
+async def match_users(payload: MatchPayload):
+    require_ready()
+    filter = check_filter(payload.filter)
+    overrides = payload.weights or None
+    if overrides is not None:
+        if FIELD_STORE is None:
+            raise HTTPException(status_code=400, detail="Custom weights need a field store (set FIELD_STORE_DIR).")
+        try:
+            overrides = check_weight_overrides(VARIABLES, overrides)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    reciprocal = payload.reciprocal
+    if reciprocal and not (payload.profile.get("needs") and payload.profile.get("offers")):
+        raise HTTPException(status_code=400, detail="Reciprocal matching needs both 'needs' and 'offers' in the profile.")
+
+    try:
+        with MATCH_LATENCY.time(weights="custom" if overrides else "default"):
+            user_data = payload.profile  # this is exactly your profile dict from frontend
+            top_k = 3
+
+            # same embedding-relevant fields + top_k + model (+ weights, filter, mode) -> same answer
+            extra = {"weights": overrides, "filter": filter, "reciprocal": reciprocal} if overrides or filter or reciprocal else None
+            with stage("match_users", "cache"):
+                key = cache_key(user_data, VARIABLES, top_k, EMBEDDER.version, extra=extra)
+                cached = MATCH_CACHE.get(key)
+            if cached is not None:
+                return cached
+
+            fetch_k = top_k
+            if reciprocal:
+                # only users who could be mutual matches, then rescore by mutual benefit
+                mutual_filter = reciprocal_filter(user_data.get("needs"), user_data.get("offers"))
+                if mutual_filter is None:
+                    return {"matches": []}
+                filter = {"$and": [filter, mutual_filter]} if filter else mutual_filter
+                fetch_k = max(RESCORE_CANDIDATES, top_k)
+
+            if overrides:
+                matches = await match_with_weights(user_data, overrides, fetch_k, filter)
+            else:
+                # embed new profile
+                vec = await embed_profile(user_data, "match_users")
+
+                # query the index
+                res = await index_call("match_users", "query", ASYNC_INDEX.query_similar(vec, top_k=fetch_k, filter=filter))
+                matches = format_matches(res)
+
+            if reciprocal:
+                with stage("match_users", "reciprocal"):
+                    matches = rescore_matches(user_data, matches)
+
+            result = {"matches": matches[:top_k]}
+            MATCH_RESULTS.observe(len(result["matches"]), endpoint="match_users")
+            MATCH_CACHE.put(key, result)
+            return result
+
+    except HTTPException:
+        raise
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/register-and-match")
-def register_and_match(payload: ProfilePayload):
+async def register_and_match(payload: ProfilePayload):
     """
     1. Embed the incoming profile
-    2. Store (upsert) it as a new user in Pinecone
-    3. Query Pinecone for similar users
+    2. Store (upsert) it as a new user in Pinecone, and in the profile store
+       (the upsert is queued in the write buffer and batched with other registrations)
+    3. Query Pinecone for similar users (buffered users, this one included, are merged in)
     4. Return the new user's ID + list of matches (excluding themself)
     """
+    require_ready()
+    filter = check_filter(payload.filter)
     try:
         user_data = payload.profile  # the profile dict from frontend
 
         # 1) Embed the new profile
-        vec = build_weighted_user_vector(user_data, EMBEDDER, VARIABLES)
-        if not np.any(vec):  # all zeros
-            raise HTTPException(status_code=400, detail="Could not build a meaningful vector from profile.")
+        vec = await embed_profile(user_data, "register_and_match")
 
         # 2) Create a unique user ID
         user_id = f"user_{uuid.uuid4().hex}"
@@ -167,33 +803,55 @@ def register_and_match(payload: ProfilePayload):
             raw_metadata["version"] = payload.version
 
         # 🔹 sanitize for Pinecone
-        metadata = sanitize_metadata(raw_metadata)
+        with stage("register_and_match", "sanitize"):
+            metadata = sanitize_metadata(raw_metadata)
 
         user_doc = {
             "id": user_id,
             "vector": vec.tolist(),
-            "metadata": metadata,
+            "metadata": {**metadata, "model_version": EMBEDDER.version},
         }
-
-
-        # Reuse existing helper
-        upsert_users(INDEX, [user_doc])
-
-        # 4) Query Pinecone for similar users
-        # You can tune top_k as you like
-        res = query_similar(INDEX, vec, top_k=10)
+        writes = [index_call("register_and_match", "upsert", ASYNC_INDEX.upsert_users([user_doc]))]
+
+        # during a blue/green migration also write to the new index, embedded with its model
+        nxt = NEXT
+        if nxt is not None:
+            with stage("register_and_match", "embed_next"):
+                next_vec = await EMBED_POOL.run(build_weighted_user_vector, user_data, nxt["embedder"], VARIABLES)
+            if np.any(next_vec):
+                writes.append(index_call("register_and_match", "upsert_next", nxt["async_index"].upsert_users([{
+                    "id": user_id,
+                    "vector": next_vec.tolist(),
+                    "metadata": {**metadata, "model_version": nxt["embedder"].version},
+                }])))
+
+        # durable copy of the full profile, written alongside the index
+        if PROFILE_STORE is not None:
+            writes.append(save_profile(user_id, raw_metadata, payload.saved_at))
+
+        # 3 + 4) Upsert and query don't depend on each other (self is filtered
+        # out anyway), so run them concurrently. With the write buffer the upsert
+        # only queues the vector, and the query already sees it.
+        # One extra hit: whether the new user comes back depends on timing, and
+        # dropping it must still leave top_k.
+        top_k = 10  # You can tune top_k as you like
+        *_, res = await asyncio.gather(
+            *writes,
+            index_call("register_and_match", "query", ASYNC_INDEX.query_similar(vec, top_k=top_k + 1, filter=filter)),
+        )
+        # cached /match-users results may now be missing this user
+        MATCH_CACHE.record_write()
+        # feed the incremental model updater (scripts/update_model.py)
+        if NEW_PROFILES_LOG:
+            try:
+                with stage("register_and_match", "log"):
+                    await asyncio.to_thread(append_profile_log, NEW_PROFILES_LOG, user_id, metadata)
+            except OSError as e:
+                print(f"⚠️ Could not log new profile {user_id}: {e!r}")
 
         # 5) Build matches list and exclude the new user itself (if returned)
-        matches = []
-        for m in res["matches"]:
-            if m["id"] == user_id:
-                continue  # skip self
-            matches.append({
-                "id": m["id"],
-                "score": float(m["score"]),
-                "metadata": m.get("metadata", {}),
-            })
-
+        matches = format_matches(res, exclude_id=user_id)[:top_k]
+        MATCH_RESULTS.observe(len(matches), endpoint="register_and_match")
         return {
             "user_id": user_id,
             "matches": matches,
@@ -201,5 +859,61 @@ def register_and_match(payload: ProfilePayload):
 
     except HTTPException:
         raise
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/match-users/batch")
+async def match_users_batch(payload: BatchMatchPayload):
+    """
+    Match many profiles in one request:
+    1. Embed all profiles in one vectorized pass
+    2. Query the index for all of them (one matrix multiply on the local
+       backend, concurrent queries on Pinecone)
+    3. Return per-profile top-k lists, each excluding the profile's own user_id
+    """
+    require_ready()
+    items = payload.profiles
+    if len(items) > MATCH_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {MATCH_BATCH_MAX} profiles per batch.")
+    if not items:
+        return {"results": []}
+    filters = [check_filter(it.filter) for it in items]
+    try:
+        with stage("match_users_batch", "embed"):
+            vecs = await EMBED_POOL.run(build_weighted_user_vectors, [it.profile for it in items], EMBEDDER, VARIABLES)
+
+        # zero vectors get a per-profile error instead of failing the whole batch
+        valid = [i for i in range(len(items)) if np.any(vecs[i])]
+        if len(valid) < len(items):
+            ZERO_VECTORS.inc(len(items) - len(valid), endpoint="match_users_batch")
+        # one batched query per distinct filter (usually just one)
+        groups = {}
+        for i in valid:
+            groups.setdefault(json.dumps(filters[i], sort_keys=True), []).append(i)
+
+        async def query_group(rows):
+            # one extra hit per query so dropping the profile itself still leaves top_k
+            top_k = max(items[i].top_k for i in rows) + 1
+            return await index_call(
+                "match_users_batch", "query", ASYNC_INDEX.query_similar_batch(vecs[rows], top_k=top_k, filter=filters[rows[0]])
+            )
+
+        responses = await asyncio.gather(*(query_group(rows) for rows in groups.values()))
+
+        results = [{"error": "Could not build a meaningful vector from profile."} for _ in items]
+        for rows, group_responses in zip(groups.values(), responses):
+            for i, res in zip(rows, group_responses):
+                matches = format_matches(res, exclude_id=items[i].user_id)
+                results[i] = {"matches": matches[: items[i].top_k]}
+                MATCH_RESULTS.observe(len(results[i]["matches"]), endpoint="match_users_batch")
+        return {"results": results}
+
+    except HTTPException:
+        raise
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
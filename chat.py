@@ -2,7 +2,7 @@
 """
 Professional Profile Match Bot (Streamlit)
 - Terminal & dashboard friendly
-- Saves structured JSON as <username>.json in ./profiles/
+- Saves the structured profile to the profile store (data/profiles.db, see src/profile_store.py)
 - Designed so most answers are structured (select/multiselect/controlled format)
 - Skills & Hobbies include a large catalog + search filter for quick selection
 - Past notable projects require a short structured entry: "Title | Role | 1-line summary"
@@ -15,123 +15,14 @@ import streamlit as st
 import json
 import os
 import datetime
+import uuid
 from typing import List
 
-st.set_page_config(page_title="Professional Profile Match Bot", page_icon="🧑‍💼", layout="centered")
-
-# -------------------------
-# Catalogs (extended lists)
-# -------------------------
-SKILL_CATALOG = [
-    # programming & data
-    "Python", "Java", "C++", "C", "C#", "JavaScript", "TypeScript", "Go", "Rust", "Kotlin",
-    "SQL", "NoSQL", "PostgreSQL", "MySQL", "MongoDB",
-    "Pandas", "NumPy", "SciPy", "Scikit-Learn", "TensorFlow", "PyTorch", "Keras",
-    "Machine Learning", "Deep Learning", "NLP", "Computer Vision",
-    "Data Engineering", "ETL", "Airflow", "Spark",
-    # web & infra
-    "React", "Vue", "Angular", "Django", "Flask", "FastAPI", "Node.js",
-    "Docker", "Kubernetes", "CI/CD", "Git", "GitHub Actions",
-    "AWS", "GCP", "Azure", "Terraform", "Serverless",
-    # product & design
-    "UI/UX Design", "Figma", "Product Management", "A/B Testing",
-    # business & others
-    "SQLAlchemy", "Jenkins", "Linux", "Windows Server", "Cybersecurity",
-    "Project Management", "Agile", "Scrum", "Finance Analysis",
-    "Marketing", "SEO", "Public Speaking", "Sales", "Business Development",
-    # soft skills
-    "Leadership", "Mentoring", "Collaboration", "Critical Thinking",
-    "Communication", "Presentation", "Negotiation"
-]
-
-HOBBY_CATALOG = [
-    "Photography", "Videography", "Traveling", "Hiking", "Cycling", "Running",
-    "Gaming", "Reading", "Writing", "Blogging", "Podcasting", "Cooking",
-    "Gardening", "Painting", "Drawing", "Music (instrument)", "Singing",
-    "Dancing", "Yoga", "Meditation", "DIY", "Woodworking", "Knitting", "Chess",
-    "Board Games", "Puzzles", "Robotics", "Electronics"
-]
-
-INDUSTRY_OPTIONS = [
-    "Finance", "Fintech", "Healthcare", "Biotech", "SaaS", "E-commerce",
-    "Education", "Media", "Entertainment", "Gaming", "Retail",
-    "Energy", "Automotive", "Manufacturing", "Telecommunications", "Logistics"
-]
-
-PREFERRED_COLLAB_OPTIONS = ["Remote", "In-person", "Hybrid", "Flexible"]
-PREFERRED_ROLES = ["Developer", "Designer", "Data Analyst", "Data Scientist", "ML Engineer",
-                   "Project Lead", "Product Manager", "Researcher", "QA Engineer", "DevOps Engineer"]
-LANGUAGE_OPTIONS = [
-    "English", "Hindi", "Spanish", "French", "German", "Chinese (Mandarin)", "Japanese",
-    "Korean", "Portuguese", "Arabic", "Russian", "Bengali", "Urdu", "Punjabi", "Gujarati"
-]
-CERTIFICATION_OPTIONS = [
-    "AWS Certified", "GCP Certified", "Azure Certified", "PMP", "Scrum Master",
-    "Certified Data Scientist", "TensorFlow Developer", "Cisco Certified", "MBA",
-    "BTech / BE", "MTech / ME", "PhD", "Certificate in AI/ML", "Other"
-]
-CONTACT_METHODS = ["Email", "WhatsApp", "Slack", "LinkedIn Message", "Phone Call", "Telegram", "Signal"]
-AVAILABILITY_TIMEFRAME = ["Mornings", "Afternoons", "Evenings", "Weekends", "Flexible", "As-needed"]
-
-# -------------------------
-# Question flow (structured)
-# -------------------------
-QUESTIONS = [
-    # Basic identity
-    {"key": "name", "text": "👋 Hi! What's your full name?", "type": "text"},
-    {"key": "preferred_name", "text": "Nice to meet you, {name}! What should we call you (nickname)?", "type": "text", "optional": True},
-    {"key": "age", "text": "How old are you, {preferred_name_or_name}?", "type": "number"},
-    {"key": "location", "text": "Where are you currently based (City / Region)?", "type": "text"},
-
-    # Roles & domain
-    {"key": "role", "text": "Which best describes your current role, {preferred_name_or_name}?", "type": "select",
-     "options": ["Student", "Employee", "Freelancer", "Founder", "Investor", "Mentor"]},
-    {"key": "domain", "text": "What's your primary domain of work or study?", "type": "select",
-     "options": ["Computer Science", "Biotech", "Fintech", "Design", "Healthcare", "Education", "Marketing", "Other"]},
+# Catalogs and the structured question flow live in config/catalogs.py
+from config.catalogs import QUESTIONS
+from src.profile_store import PROFILE_STORE_PATH, ProfileStore
 
-    # Experience & industry
-    {"key": "experience", "text": "How many years of professional experience do you have?", "type": "number"},
-    {"key": "industry_experience", "text": "Select industries you've worked in (choose all that apply)", "type": "multiselect",
-     "options": INDUSTRY_OPTIONS},
-
-    # Skills (searchable catalog)
-    {"key": "skills", "text": "Select your professional skills (use search box to filter and pick multiple). These will be used as structured tags.", "type": "searchable_multiselect",
-     "options": SKILL_CATALOG, "min_selection": 1},
-
-    # Preferred collaboration specifics
-    {"key": "preferred_collaboration", "text": "Preferred collaboration type?", "type": "select", "options": PREFERRED_COLLAB_OPTIONS},
-    {"key": "preferred_roles_in_projects", "text": "Preferred roles you'd like to take in projects (pick multiple).", "type": "multiselect",
-     "options": PREFERRED_ROLES},
-
-    # Availability & commitment
-    {"key": "availability_timeframe", "text": "When are you usually available to collaborate?", "type": "multiselect", "options": AVAILABILITY_TIMEFRAME},
-    {"key": "time_commitment_per_week", "text": "How many hours per week can you commit to projects/mentorship?", "type": "number", "min": 0, "max": 168},
-
-    # Contact & links (structured)
-    {"key": "email", "text": "What's your professional email (preferred contact)?", "type": "text"},
-    {"key": "preferred_contact_method", "text": "Preferred contact method?", "type": "select", "options": CONTACT_METHODS},
-    {"key": "linkedin", "text": "LinkedIn profile URL (separate from portfolio):", "type": "text"},
-    {"key": "github", "text": "GitHub / GitLab URL (for code projects):", "type": "text"},
-    {"key": "portfolio", "text": "Portfolio URL (if different from LinkedIn/GitHub):", "type": "text"},
-
-    # Projects & profile enrichment (structured short entries)
-    {"key": "past_projects", "text": "List up to 3 notable past projects. Use the format: Title | Role | One-line summary (<=120 chars). Enter one project per input box.", "type": "structured_projects", "max_projects": 3},
-
-    # Languages / certifications / education
-    {"key": "languages_spoken", "text": "Languages you speak (choose all that apply)", "type": "multiselect", "options": LANGUAGE_OPTIONS},
-    {"key": "certifications", "text": "Select certifications/degrees you hold (choose all that apply)", "type": "multiselect", "options": CERTIFICATION_OPTIONS},
-
-    # Offers / Needs (existing fields - structured)
-    {"key": "offers", "text": "What can you offer the community? (select multiple)", "type": "multiselect",
-     "options": ["Mentorship", "Code/Design", "Services", "Capital", "Datasets", "Distribution", "Facilities", "Research Support"]},
-    {"key": "needs", "text": "What are you currently seeking? (Choose up to 3)", "type": "multiselect", "options": ["Collaborator", "Job", "Client", "Investor", "Advisor", "Pilot Site", "Co-Founder"], "max_selections": 3},
-
-    # Interests & hobbies (searchable + multi)
-    {"key": "interests_hobbies", "text": "Interests / Hobbies (use search to pick many). These help with personal matching (choose multiple).", "type": "searchable_multiselect", "options": HOBBY_CATALOG},
-
-    # Final optional short narrative but constrained (single-line tags)
-    {"key": "one_line_bio", "text": "Write a one-line professional tagline (<=120 chars) — keep it concise, no paragraphs (used as a short vector tag).", "type": "text", "max_length": 120, "optional": True},
-]
+st.set_page_config(page_title="Professional Profile Match Bot", page_icon="🧑‍💼", layout="centered")
 
 # -------------------------
 # Helpers
@@ -139,9 +30,10 @@ QUESTIONS = [
 def format_list(items):
     return ", ".join(items) if isinstance(items, list) else items
 
-def safe_filename(name: str) -> str:
-    safe = (name or "user").strip().lower().replace(" ", "_")
-    return safe if safe else "user"
+@st.cache_resource
+def profile_store() -> ProfileStore:
+    # one connection per server process, shared by all sessions
+    return ProfileStore(PROFILE_STORE_PATH)
 
 def searchable_multiselect_widget(label: str, options: List[str], key: str, min_selection: int = 0):
     """
@@ -161,6 +53,9 @@ if "step" not in st.session_state:
     st.session_state["step"] = 0
 if "completed" not in st.session_state:
     st.session_state["completed"] = False
+# stable per profile, so reruns of the summary page rewrite the same record
+if "profile_id" not in st.session_state:
+    st.session_state["profile_id"] = f"user_{uuid.uuid4().hex}"
 
 # If step overflows, mark completed
 if st.session_state["step"] >= len(QUESTIONS):
@@ -338,18 +233,14 @@ else:
     st.markdown(f"**Interests / Hobbies:** {format_list(responses.get('interests_hobbies', []))}")
     st.markdown(f"**One-line bio (tag):** {responses.get('one_line_bio', 'N/A')}")
 
-    # Save JSON file in profiles/
-    folder = os.path.join(os.getcwd(), "profiles")
-    os.makedirs(folder, exist_ok=True)
-    filename = f"{safe_filename(responses.get('name'))}.json"
-    file_path = os.path.join(folder, filename)
+    # Save to the profile store, keyed by this session's profile id (names aren't unique)
+    profile_id = st.session_state["profile_id"]
     try:
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(responses, f, indent=4, ensure_ascii=False)
         ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        st.success(f"Your profile data has been saved as **{filename}** in the server folder `profiles/`.")
-        st.info(f"Absolute server path: `{file_path}`")
-        print(f"DEBUG: User profile saved to {file_path} at {ts}")
+        profile_store().put(profile_id, responses, saved_at=ts)
+        st.success(f"Your profile data has been saved with id **{profile_id}**.")
+        st.info(f"Profile store: `{os.path.abspath(PROFILE_STORE_PATH)}`")
+        print(f"DEBUG: User profile {profile_id} saved to {PROFILE_STORE_PATH} at {ts}")
     except Exception as e:
         st.error(f"Failed to save profile: {e}")
         print(f"ERROR saving profile: {e}")
@@ -357,7 +248,7 @@ else:
     # Download button for local persistence
     try:
         json_bytes = json.dumps(responses, indent=4, ensure_ascii=False).encode("utf-8")
-        st.download_button(label="Download profile JSON", data=json_bytes, file_name=filename, mime="application/json")
+        st.download_button(label="Download profile JSON", data=json_bytes, file_name=f"{profile_id}.json", mime="application/json")
     except Exception as e:
         st.warning("Download button failed: " + str(e))
 
@@ -366,4 +257,5 @@ else:
         st.session_state["responses"] = {}
         st.session_state["step"] = 0
         st.session_state["completed"] = False
+        st.session_state["profile_id"] = f"user_{uuid.uuid4().hex}"
         st.experimental_rerun()
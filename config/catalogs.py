@@ -0,0 +1,147 @@
+# config/catalogs.py
+
+# Closed option catalogs and the structured question flow used by chat.py.
+# Kept here (instead of inside the Streamlit app) so the embedding and batch
+# code can import them without starting a Streamlit session.
+
+# -------------------------
+# Catalogs (extended lists)
+# -------------------------
+SKILL_CATALOG = [
+    # programming & data
+    "Python", "Java", "C++", "C", "C#", "JavaScript", "TypeScript", "Go", "Rust", "Kotlin",
+    "SQL", "NoSQL", "PostgreSQL", "MySQL", "MongoDB",
+    "Pandas", "NumPy", "SciPy", "Scikit-Learn", "TensorFlow", "PyTorch", "Keras",
+    "Machine Learning", "Deep Learning", "NLP", "Computer Vision",
+    "Data Engineering", "ETL", "Airflow", "Spark",
+    # web & infra
+    "React", "Vue", "Angular", "Django", "Flask", "FastAPI", "Node.js",
+    "Docker", "Kubernetes", "CI/CD", "Git", "GitHub Actions",
+    "AWS", "GCP", "Azure", "Terraform", "Serverless",
+    # product & design
+    "UI/UX Design", "Figma", "Product Management", "A/B Testing",
+    # business & others
+    "SQLAlchemy", "Jenkins", "Linux", "Windows Server", "Cybersecurity",
+    "Project Management", "Agile", "Scrum", "Finance Analysis",
+    "Marketing", "SEO", "Public Speaking", "Sales", "Business Development",
+    # soft skills
+    "Leadership", "Mentoring", "Collaboration", "Critical Thinking",
+    "Communication", "Presentation", "Negotiation"
+]
+
+HOBBY_CATALOG = [
+    "Photography", "Videography", "Traveling", "Hiking", "Cycling", "Running",
+    "Gaming", "Reading", "Writing", "Blogging", "Podcasting", "Cooking",
+    "Gardening", "Painting", "Drawing", "Music (instrument)", "Singing",
+    "Dancing", "Yoga", "Meditation", "DIY", "Woodworking", "Knitting", "Chess",
+    "Board Games", "Puzzles", "Robotics", "Electronics"
+]
+
+INDUSTRY_OPTIONS = [
+    "Finance", "Fintech", "Healthcare", "Biotech", "SaaS", "E-commerce",
+    "Education", "Media", "Entertainment", "Gaming", "Retail",
+    "Energy", "Automotive", "Manufacturing", "Telecommunications", "Logistics"
+]
+
+PREFERRED_COLLAB_OPTIONS = ["Remote", "In-person", "Hybrid", "Flexible"]
+PREFERRED_ROLES = ["Developer", "Designer", "Data Analyst", "Data Scientist", "ML Engineer",
+                   "Project Lead", "Product Manager", "Researcher", "QA Engineer", "DevOps Engineer"]
+LANGUAGE_OPTIONS = [
+    "English", "Hindi", "Spanish", "French", "German", "Chinese (Mandarin)", "Japanese",
+    "Korean", "Portuguese", "Arabic", "Russian", "Bengali", "Urdu", "Punjabi", "Gujarati"
+]
+CERTIFICATION_OPTIONS = [
+    "AWS Certified", "GCP Certified", "Azure Certified", "PMP", "Scrum Master",
+    "Certified Data Scientist", "TensorFlow Developer", "Cisco Certified", "MBA",
+    "BTech / BE", "MTech / ME", "PhD", "Certificate in AI/ML", "Other"
+]
+CONTACT_METHODS = ["Email", "WhatsApp", "Slack", "LinkedIn Message", "Phone Call", "Telegram", "Signal"]
+AVAILABILITY_TIMEFRAME = ["Mornings", "Afternoons", "Evenings", "Weekends", "Flexible", "As-needed"]
+ROLE_OPTIONS = ["Student", "Employee", "Freelancer", "Founder", "Investor", "Mentor"]
+DOMAIN_OPTIONS = ["Computer Science", "Biotech", "Fintech", "Design", "Healthcare", "Education", "Marketing", "Other"]
+OFFER_OPTIONS = ["Mentorship", "Code/Design", "Services", "Capital", "Datasets", "Distribution", "Facilities", "Research Support"]
+NEED_OPTIONS = ["Collaborator", "Job", "Client", "Investor", "Advisor", "Pilot Site", "Co-Founder"]
+
+# How well each offer covers each need (0..1), used by reciprocal matching (src/reciprocal.py).
+# Pairs not listed don't help at all.
+NEED_OFFER_COMPATIBILITY = {
+    "Collaborator": {"Code/Design": 1.0, "Research Support": 0.8, "Datasets": 0.6, "Services": 0.5},
+    "Job": {"Capital": 0.6, "Services": 0.5, "Mentorship": 0.3},
+    "Client": {"Capital": 0.8, "Distribution": 0.8},
+    "Investor": {"Capital": 1.0},
+    "Advisor": {"Mentorship": 1.0, "Research Support": 0.5},
+    "Pilot Site": {"Facilities": 1.0, "Distribution": 0.6, "Datasets": 0.4},
+    "Co-Founder": {"Code/Design": 0.8, "Capital": 0.6, "Mentorship": 0.4},
+}
+
+# -------------------------
+# Question flow (structured)
+# -------------------------
+QUESTIONS = [
+    # Basic identity
+    {"key": "name", "text": "👋 Hi! What's your full name?", "type": "text"},
+    {"key": "preferred_name", "text": "Nice to meet you, {name}! What should we call you (nickname)?", "type": "text", "optional": True},
+    {"key": "age", "text": "How old are you, {preferred_name_or_name}?", "type": "number"},
+    {"key": "location", "text": "Where are you currently based (City / Region)?", "type": "text"},
+
+    # Roles & domain
+    {"key": "role", "text": "Which best describes your current role, {preferred_name_or_name}?", "type": "select",
+     "options": ROLE_OPTIONS},
+    {"key": "domain", "text": "What's your primary domain of work or study?", "type": "select",
+     "options": DOMAIN_OPTIONS},
+
+    # Experience & industry
+    {"key": "experience", "text": "How many years of professional experience do you have?", "type": "number"},
+    {"key": "industry_experience", "text": "Select industries you've worked in (choose all that apply)", "type": "multiselect",
+     "options": INDUSTRY_OPTIONS},
+
+    # Skills (searchable catalog)
+    {"key": "skills", "text": "Select your professional skills (use search box to filter and pick multiple). These will be used as structured tags.", "type": "searchable_multiselect",
+     "options": SKILL_CATALOG, "min_selection": 1},
+
+    # Preferred collaboration specifics
+    {"key": "preferred_collaboration", "text": "Preferred collaboration type?", "type": "select", "options": PREFERRED_COLLAB_OPTIONS},
+    {"key": "preferred_roles_in_projects", "text": "Preferred roles you'd like to take in projects (pick multiple).", "type": "multiselect",
+     "options": PREFERRED_ROLES},
+
+    # Availability & commitment
+    {"key": "availability_timeframe", "text": "When are you usually available to collaborate?", "type": "multiselect", "options": AVAILABILITY_TIMEFRAME},
+    {"key": "time_commitment_per_week", "text": "How many hours per week can you commit to projects/mentorship?", "type": "number", "min": 0, "max": 168},
+
+    # Contact & links (structured)
+    {"key": "email", "text": "What's your professional email (preferred contact)?", "type": "text"},
+    {"key": "preferred_contact_method", "text": "Preferred contact method?", "type": "select", "options": CONTACT_METHODS},
+    {"key": "linkedin", "text": "LinkedIn profile URL (separate from portfolio):", "type": "text"},
+    {"key": "github", "text": "GitHub / GitLab URL (for code projects):", "type": "text"},
+    {"key": "portfolio", "text": "Portfolio URL (if different from LinkedIn/GitHub):", "type": "text"},
+
+    # Projects & profile enrichment (structured short entries)
+    {"key": "past_projects", "text": "List up to 3 notable past projects. Use the format: Title | Role | One-line summary (<=120 chars). Enter one project per input box.", "type": "structured_projects", "max_projects": 3},
+
+    # Languages / certifications / education
+    {"key": "languages_spoken", "text": "Languages you speak (choose all that apply)", "type": "multiselect", "options": LANGUAGE_OPTIONS},
+    {"key": "certifications", "text": "Select certifications/degrees you hold (choose all that apply)", "type": "multiselect", "options": CERTIFICATION_OPTIONS},
+
+    # Offers / Needs (existing fields - structured)
+    {"key": "offers", "text": "What can you offer the community? (select multiple)", "type": "multiselect",
+     "options": OFFER_OPTIONS},
+    {"key": "needs", "text": "What are you currently seeking? (Choose up to 3)", "type": "multiselect", "options": NEED_OPTIONS, "max_selections": 3},
+
+    # Interests & hobbies (searchable + multi)
+    {"key": "interests_hobbies", "text": "Interests / Hobbies (use search to pick many). These help with personal matching (choose multiple).", "type": "searchable_multiselect", "options": HOBBY_CATALOG},
+
+    # Final optional short narrative but constrained (single-line tags)
+    {"key": "one_line_bio", "text": "Write a one-line professional tagline (<=120 chars) — keep it concise, no paragraphs (used as a short vector tag).", "type": "text", "max_length": 120, "optional": True},
+]
+
+
+# -------------------------
+# Every catalog option that can end up in an embedded field
+# (used to precompute the option embedding table in src/embeddings.py)
+# -------------------------
+CATALOG_OPTIONS = list(dict.fromkeys(
+    ROLE_OPTIONS + DOMAIN_OPTIONS + INDUSTRY_OPTIONS + SKILL_CATALOG
+    + PREFERRED_COLLAB_OPTIONS + PREFERRED_ROLES + AVAILABILITY_TIMEFRAME
+    + LANGUAGE_OPTIONS + CERTIFICATION_OPTIONS + OFFER_OPTIONS + NEED_OPTIONS
+    + HOBBY_CATALOG
+))
@@ -20,3 +20,14 @@ VARIABLES = [
     {"key": "one_line_bio", "desc": "Professional tagline", "use_for_embedding": True, "default_weight": 0.7},
     {"key": "location", "desc": "City or region", "use_for_embedding": True, "default_weight": 0.4},
 ]
+
+# Metadata fields the match endpoints can filter on (see src/metadata_filter.py).
+# sanitize_metadata stores them as strings or lists of strings.
+FILTERABLE_FIELDS = [
+    "preferred_collaboration",
+    "location",
+    "needs",
+    "offers",
+    "languages_spoken",
+    "availability_timeframe",
+]
@@ -0,0 +1,135 @@
+# scripts/bench_quantization.py
+"""
+Recall@k vs memory for the local index storage modes (src/quantization.py).
+
+    python scripts/bench_quantization.py                                 # saved local index
+    python scripts/bench_quantization.py --field-store models/field_store
+    python scripts/bench_quantization.py --random 200000 --rerank 0,50,200 --output bench_quant.json
+
+Ground truth is the exact float32 top-k of each query (a sample of the stored
+vectors). Recall counts a returned user as correct when its exact score reaches
+the k-th true score, so duplicate profiles (tied scores) are not penalised.
+For every storage mode x rerank depth it reports recall@k, RAM per vector,
+compression vs float32, build time and single-query latency, as JSON.
+"""
+import os
+import json
+import time
+import argparse
+import platform
+from datetime import datetime, timezone
+import numpy as np
+from dotenv import load_dotenv
+from config.variables import VARIABLES
+from src.local_index import LocalIndex, _normalize_rows, index_path
+from src.quantization import STORAGE_MODES
+
+load_dotenv()
+
+INDEX_NAME = os.getenv("PINECONE_INDEX", "connectwise-index")
+
+
+def load_vectors(args):
+    """((N, d) float32 vectors, source description)."""
+    if args.random:
+        # clustered unit vectors, closer to real profiles than uniform noise
+        rng = np.random.default_rng(args.seed)
+        centers = rng.standard_normal((max(1, args.random // 500), args.dim)).astype(np.float32)
+        labels = rng.integers(len(centers), size=args.random)
+        vectors = centers[labels] + 0.5 * rng.standard_normal((args.random, args.dim)).astype(np.float32)
+        return vectors, f"random:{args.random}x{args.dim}"
+    if args.field_store:
+        from src.field_store import FieldVectorStore
+        store = FieldVectorStore.open(args.field_store)
+        return store.default_vectors(VARIABLES), f"field_store:{args.field_store}"
+    index = LocalIndex.load(index_path(INDEX_NAME))
+    return np.asarray(index.vectors) * index._norms[: len(index), None], f"local_index:{INDEX_NAME}"
+
+
+def top_rows(index, queries, k):
+    return [[int(m["id"]) for m in index.query(q, top_k=k, include_metadata=False)["matches"]] for q in queries]
+
+
+def recall(found, unit, queries, kth_scores):
+    hits = [np.sum(unit[rows] @ q >= kth - 1e-5) / len(rows) for rows, q, kth in zip(found, queries, kth_scores) if rows]
+    return float(np.mean(hits))
+
+
+def run_config(storage, rerank, ids, unit, norms, queries, kth_scores, args):
+    start = time.perf_counter()
+    index = LocalIndex.from_arrays(ids, unit, norms, [{}] * len(ids), storage=storage, rerank=rerank, pq_m=args.pq_m)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    found = top_rows(index, queries, args.top_k)
+    query_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    return {
+        "storage": storage,
+        "rerank": rerank,
+        f"recall_at_{args.top_k}": round(recall(found, unit, queries, kth_scores), 4),
+        "bytes_per_vector": round(index.vector_bytes() / len(ids), 2),
+        "vector_bytes": index.vector_bytes(),
+        "build_s": round(build_s, 3),
+        "query_ms": round(query_ms, 3),
+    }
+
+
+def main(args):
+    vectors, source = load_vectors(args)
+    unit, norms = _normalize_rows(np.asarray(vectors, dtype=np.float32))
+    unit = unit.astype(np.float32)
+    n, dim = unit.shape
+    ids = [str(i) for i in range(n)]
+    rng = np.random.default_rng(args.seed)
+    queries = unit[rng.choice(n, size=min(args.queries, n), replace=False)]
+    print(f"🔹 {n} vectors (dim {dim}) from {source}; {len(queries)} queries, k={args.top_k}")
+
+    exact = LocalIndex.from_arrays(ids, unit, norms, [{}] * n)
+    kth_scores = [exact.query(q, top_k=args.top_k, include_metadata=False)["matches"][-1]["score"] for q in queries]
+    float32_bytes = exact.vector_bytes()
+
+    results = []
+    for storage in args.storage.split(","):
+        for rerank in ([0] if storage == "float32" else [int(r) for r in args.rerank.split(",")]):
+            row = run_config(storage, rerank, ids, unit, norms, queries, kth_scores, args)
+            row["compression"] = round(float32_bytes / max(row["vector_bytes"], 1), 2)
+            results.append(row)
+            print(f"   {storage:8s} rerank={rerank:<4d} recall@{args.top_k}={row[f'recall_at_{args.top_k}']:.3f} "
+                  f"{row['bytes_per_vector']:7.1f} B/vec  x{row['compression']:<6} {row['query_ms']:.2f} ms/query")
+
+    report = {
+        "benchmark": "quantization",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "machine": {"python": platform.python_version(), "numpy": np.__version__, "cpus": os.cpu_count()},
+        "source": source,
+        "count": n,
+        "dimension": dim,
+        "top_k": args.top_k,
+        "queries": len(queries),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Wrote {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark recall@k vs memory of the local index storage modes.")
+    parser.add_argument("--field-store", default=None, help="directory written by run_pipeline.py --field-store")
+    parser.add_argument("--random", type=int, default=0, help="use N clustered random vectors instead of stored ones")
+    parser.add_argument("--dim", type=int, default=100, help="dimension of --random vectors")
+    parser.add_argument("--storage", default=",".join(STORAGE_MODES), help="comma-separated storage modes")
+    parser.add_argument("--rerank", default="0,50", help="comma-separated exact re-rank depths (quantized modes)")
+    parser.add_argument("--pq-m", type=int, default=None, help="PQ sub-spaces (default dim // 4)")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(parse_args())
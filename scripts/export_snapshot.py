@@ -0,0 +1,51 @@
+# scripts/export_snapshot.py
+"""
+Export profiles to a columnar snapshot (src/snapshot.py) for batch jobs.
+
+    python scripts/export_snapshot.py                                   # profile store -> data/snapshots/profiles
+    python scripts/export_snapshot.py --input data/synthetic_profiles.ndjson --output /tmp/snap
+
+From the profile store, rows keep their store ids and write order; from a
+file, ids are user_1..user_N in input order (like run_pipeline.py).
+"""
+import os
+import argparse
+from tqdm import tqdm
+from src.ingest import chunked, iter_profiles
+from src.profile_store import PROFILE_STORE_PATH, ProfileStore
+from src.snapshot import SnapshotWriter
+
+DEFAULT_OUTPUT = os.path.join("data", "snapshots", "profiles")
+CHUNK_SIZE = 10000
+
+
+def main(args):
+    store = None
+    if args.input:
+        records = ((f"user_{i + 1}", p) for i, p in enumerate(iter_profiles(args.input)))
+    else:
+        store = ProfileStore(args.store)
+        records = store.iter_profiles()
+
+    with SnapshotWriter(args.output) as writer:
+        for chunk in chunked(tqdm(records, desc="Exporting", unit="profiles"), args.chunk_size):
+            writer.append([uid for uid, _ in chunk], [p for _, p in chunk])
+    if store is not None:
+        store.close()
+
+    size = sum(os.path.getsize(os.path.join(args.output, f)) for f in os.listdir(args.output))
+    entries = sum(len(c.dictionary) for c in writer.columns)
+    print(f"💾 Wrote {writer.count} profiles to {args.output} ({size / 1e6:.1f} MB, {entries} dictionary entries)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export profiles to a columnar, dictionary-encoded snapshot.")
+    parser.add_argument("--store", default=PROFILE_STORE_PATH, help="profile store to export (default)")
+    parser.add_argument("--input", default=None, help="export this JSON array / NDJSON file instead")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,42 @@
+# scripts/generate_profiles.py
+"""
+Write N deterministic synthetic profiles (src/synthetic.py) as NDJSON, ready for
+`run_pipeline.py --stream --input ...`.
+
+    python scripts/generate_profiles.py --count 1000000 --output data/synthetic_profiles.ndjson
+    python scripts/generate_profiles.py --count 500000 --start 500000 --output part2.ndjson   # shard
+
+The same --seed always produces the same profiles; --start lets several
+processes write disjoint slices of one population.
+"""
+import os
+import json
+import argparse
+from tqdm import tqdm
+from src.synthetic import iter_synthetic_profiles
+
+DEFAULT_OUTPUT = os.path.join("data", "synthetic_profiles.ndjson")
+
+
+def main(args):
+    tmp_path = f"{args.output}.tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        profiles = iter_synthetic_profiles(args.count, seed=args.seed, start=args.start)
+        for profile in tqdm(profiles, total=args.count, desc="Generating", unit="profiles"):
+            f.write(json.dumps(profile, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, args.output)
+    print(f"💾 Wrote {args.count} synthetic profiles (seed {args.seed}, from #{args.start}) to {args.output}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate deterministic synthetic profiles as NDJSON.")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--start", type=int, default=0, help="index of the first profile (for sharded generation)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(parse_args())
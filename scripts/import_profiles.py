@@ -0,0 +1,51 @@
+# scripts/import_profiles.py
+"""
+One-off import of the legacy profiles/<name>.json files into the profile store.
+
+    python scripts/import_profiles.py                        # profiles/ -> data/profiles.db
+    python scripts/import_profiles.py --dir old/profiles --store /srv/profiles.db
+
+Files are imported oldest first, so the store's write order (and latest())
+matches the old newest-by-mtime lookup. Ids are derived from the file name,
+so running the import twice rewrites the same records instead of duplicating them.
+"""
+import os
+import json
+import uuid
+import argparse
+from glob import glob
+from src.profile_store import PROFILE_STORE_PATH, ProfileStore
+
+
+def legacy_id(path: str) -> str:
+    return f"user_{uuid.uuid5(uuid.NAMESPACE_URL, 'profiles/' + os.path.basename(path)).hex}"
+
+
+def main(args):
+    files = sorted(glob(os.path.join(args.dir, "*.json")), key=os.path.getmtime)
+    if not files:
+        print(f"⚠️ No profiles found in {args.dir}.")
+        return
+    records = []
+    for path in files:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                records.append((legacy_id(path), json.load(f)))
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Skipping {path}: {e}")
+            continue
+        print(f"   {os.path.basename(path)} -> {records[-1][0]}")
+    with ProfileStore(args.store) as store:
+        store.put_many(records)
+        print(f"💾 Imported {len(records)} profiles into {args.store} ({len(store)} stored)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Import profiles/*.json into the profile store.")
+    parser.add_argument("--dir", default="profiles")
+    parser.add_argument("--store", default=PROFILE_STORE_PATH)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,168 @@
+# scripts/migrate_index.py
+"""
+Blue/green migration after a model change: re-embed every stored profile with
+the new model into a new index named after the model version, then switch the
+API over in one atomic write of the active-index alias (src/model_registry.py).
+
+    python scripts/migrate_index.py                       # migrate to the currently published model
+    python scripts/migrate_index.py --workers 8 --no-switch
+
+Steps:
+1. create <base index>-<model version> and set it as "next" in the alias; API
+   workers start dual-writing new registrations to both indexes
+2. wait --settle seconds so every worker has seen the alias
+3. stream all records from the active index, re-embed their profiles on a
+   process pool and upsert them into the new index (throughput + ETA on the
+   progress bar)
+4. point the alias at the new index + model; workers switch on their next poll
+
+The old index is left untouched for rollback (write the old alias back).
+With the local backend each process has its own in-memory copy, so stop the
+API while migrating (dual-writes would stay in the API's copy).
+"""
+import os
+import time
+import argparse
+import multiprocessing as mp
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+from tqdm import tqdm
+from config.variables import VARIABLES
+from src.embeddings import build_weighted_user_vectors
+from src.ingest import BatchUpserter
+from src.model_registry import (
+    ACTIVE_INDEX_POINTER,
+    MODELS_DIR,
+    files_model_record,
+    load_published_embedder,
+    read_pointer,
+    versioned_index_name,
+    write_pointer,
+)
+from src.vector_backend import backend_name, get_index_client
+
+load_dotenv()
+
+PINE_API = os.getenv("PINECONE_API_KEY")
+PINE_ENV = os.getenv("PINECONE_ENV")
+INDEX_NAME = os.getenv("PINECONE_INDEX", "connectwise-index")
+W2V_INFERENCE_DIR = os.getenv("W2V_INFERENCE_DIR", os.path.join(MODELS_DIR, "w2v_connectwise_inference"))
+VECTOR_BACKEND = backend_name()
+
+
+def target_model(args) -> dict:
+    """Model record to migrate to: --inference-dir, else the published version, else the pipeline export."""
+    if args.inference_dir:
+        return files_model_record(args.inference_dir)
+    return read_pointer() or files_model_record(W2V_INFERENCE_DIR)
+
+
+def current_alias() -> dict:
+    """The alias, or one describing today's unversioned set-up (PINECONE_INDEX + pipeline export)."""
+    return read_pointer(ACTIVE_INDEX_POINTER) or {
+        "index": INDEX_NAME, "model": files_model_record(W2V_INFERENCE_DIR), "next": None,
+    }
+
+
+# ---- worker side ----
+
+_EMBEDDER = {}
+
+
+def _init_worker(model_record: dict):
+    _EMBEDDER["embedder"] = load_published_embedder(model_record)
+
+
+def _embed(records):
+    embedder = _EMBEDDER["embedder"]
+    vecs = build_weighted_user_vectors([r["metadata"] for r in records], embedder, VARIABLES)
+    return [
+        {"id": r["id"], "vector": vec.tolist(), "metadata": {**r["metadata"], "model_version": embedder.version}}
+        for r, vec in zip(records, vecs)
+        if vec.any()
+    ]
+
+
+# ---- driver ----
+
+def migrate(client, source, target, model_record, args) -> int:
+    stats = source.describe_index_stats()
+    total = stats["total_vector_count"]
+    progress = tqdm(total=total, desc="Re-embedding", unit="users", smoothing=0.1)
+    skipped = 0
+    pending = deque()
+    ctx = mp.get_context("spawn")
+    with ProcessPoolExecutor(args.workers, mp_context=ctx, initializer=_init_worker, initargs=(model_record,)) as pool, \
+            BatchUpserter(client, target, args.batch_size, args.max_in_flight) as upserter:
+
+        def drain_one():
+            nonlocal skipped
+            batch, future = pending.popleft()
+            docs = future.result()
+            skipped += batch - len(docs)
+            upserter.submit(docs)
+            progress.update(batch)
+
+        for records in client.iter_records(source, args.batch_size):
+            pending.append((len(records), pool.submit(_embed, records)))
+            if len(pending) >= 2 * args.workers:  # bounded: memory stays flat for any index size
+                drain_one()
+        while pending:
+            drain_one()
+    progress.close()
+    rate = progress.n / max(progress.format_dict["elapsed"], 1e-9)
+    print(f"✅ Re-embedded {upserter.upserted} users ({skipped} without usable tokens skipped) at {rate:.0f} users/s.")
+    return upserter.upserted
+
+
+def main(args):
+    client = get_index_client(VECTOR_BACKEND)
+    alias = current_alias()
+    model_record = target_model(args)
+    if model_record["version"] == alias["model"]["version"] and not args.force:
+        print(f"🔹 Index '{alias['index']}' already serves model {model_record['version']}; nothing to migrate.")
+        return
+
+    dim = load_published_embedder(model_record).vector_size
+    new_index_name = args.index or versioned_index_name(INDEX_NAME, model_record["version"])
+    source = client.ensure_index_exists(PINE_API, alias["index"], dim, PINE_ENV, args.max_in_flight)
+    target = client.ensure_index_exists(PINE_API, new_index_name, dim, PINE_ENV, args.max_in_flight)
+
+    # 1-2) announce the new index so API workers dual-write, then let them notice
+    write_pointer({**alias, "next": {"index": new_index_name, "model": model_record}}, ACTIVE_INDEX_POINTER)
+    print(f"🔹 Dual-writing to '{alias['index']}' and '{new_index_name}'; waiting {args.settle:.0f}s for workers.")
+    time.sleep(args.settle)
+
+    # 3) bulk re-embed
+    start = time.perf_counter()
+    migrate(client, source, target, model_record, args)
+    if VECTOR_BACKEND == "local":
+        from src.local_index import persist_index
+        persist_index(target)
+    print(f"✅ Migration to '{new_index_name}' took {time.perf_counter() - start:.1f}s.")
+
+    # 4) atomic switch
+    if args.no_switch:
+        print(f"🔹 Not switching (--no-switch); the API keeps dual-writing until the alias is updated.")
+        return
+    write_pointer({"index": new_index_name, "model": model_record, "next": None}, ACTIVE_INDEX_POINTER)
+    print(f"✅ API now serves '{new_index_name}' with model {model_record['version']} "
+          f"(rollback: restore index '{alias['index']}' in {ACTIVE_INDEX_POINTER}).")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Re-embed all profiles into a new index and switch the API to it.")
+    parser.add_argument("--inference-dir", default=None, help="model export to migrate to (default: published version)")
+    parser.add_argument("--index", default=None, help="target index name (default: <PINECONE_INDEX>-<model version>)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="embedding processes")
+    parser.add_argument("--batch-size", type=int, default=100, help="records per fetch / embed task / upsert")
+    parser.add_argument("--max-in-flight", type=int, default=4, help="concurrent upsert requests")
+    parser.add_argument("--settle", type=float, default=30, help="seconds to wait for API workers to start dual-writing")
+    parser.add_argument("--no-switch", action="store_true", help="migrate but leave the alias on the old index")
+    parser.add_argument("--force", action="store_true", help="migrate even if the model version is unchanged")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(parse_args())
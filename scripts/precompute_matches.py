@@ -0,0 +1,151 @@
+# scripts/precompute_matches.py
+"""
+Offline top-k neighbours for every stored user, served by GET /users/{user_id}/matches.
+
+    python scripts/precompute_matches.py --field-store models/field_store --top-k 20 --workers 8
+
+Vectors come from a field store (any backend) or, without --field-store, from the
+saved local index (VECTOR_BACKEND=local). They are written once as unit float32
+rows to a .npy that every worker process memory-maps; each worker scores its
+slice of users in blocks (float32 matmul + argpartition) and writes straight into
+the shared (N, k) neighbors/scores memmaps. The finished directory replaces the
+previous run in one rename (see src/precomputed.py for the layout).
+--storage float16 stores the scores as float16 (scoring is float32 either way).
+"""
+import os
+
+# one BLAS thread per worker process; parallelism comes from the process pool
+for _var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(_var, "1")
+
+import json
+import time
+import shutil
+import argparse
+import multiprocessing as mp
+from datetime import datetime, timezone
+import numpy as np
+from dotenv import load_dotenv
+from tqdm import tqdm
+from config.variables import VARIABLES
+from src.precomputed import (
+    META_FILE,
+    NEIGHBORS_FILE,
+    SCORES_FILE,
+    SCORE_STORAGE,
+    publish,
+    write_ids_and_metadata,
+)
+from src.topk import QUERY_BLOCK_SIZE, top_k_rows
+
+load_dotenv()
+
+INDEX_NAME = os.getenv("PINECONE_INDEX", "connectwise-index")
+# same default as the API, whatever directory this runs from
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PRECOMPUTED_DIR = os.getenv("PRECOMPUTED_DIR", os.path.join(BASE_DIR, "models", "precomputed"))
+VECTORS_FILE = "vectors.npy"  # scratch copy for the workers, removed before publishing
+
+
+def load_source(args):
+    """(ids, (N, d) float32 vectors, metadata list, source description)."""
+    if args.field_store:
+        from src.field_store import FieldVectorStore
+        store = FieldVectorStore.open(args.field_store)
+        vectors = store.default_vectors(VARIABLES)
+        return store.ids, vectors, list(store.iter_metadata()), f"field_store:{args.field_store}"
+
+    from src.local_index import LocalIndex, index_path
+    index = LocalIndex.load(index_path(INDEX_NAME))
+    return index.ids, index.vectors, index._metadata[: len(index)], f"local_index:{INDEX_NAME}"
+
+
+# ---- worker side ----
+
+_W = {}
+
+
+def _init_worker(out_dir: str):
+    _W["vectors"] = np.load(os.path.join(out_dir, VECTORS_FILE), mmap_mode="r")
+    _W["neighbors"] = np.load(os.path.join(out_dir, NEIGHBORS_FILE), mmap_mode="r+")
+    _W["scores"] = np.load(os.path.join(out_dir, SCORES_FILE), mmap_mode="r+")
+
+
+def _run_slice(bounds):
+    start, stop = bounds
+    vectors, neighbors, scores = _W["vectors"], _W["neighbors"], _W["scores"]
+    k = neighbors.shape[1]
+    for s in range(start, stop, QUERY_BLOCK_SIZE):
+        q_rows = np.arange(s, min(s + QUERY_BLOCK_SIZE, stop))
+        rows, block_scores = top_k_rows(np.asarray(vectors[q_rows]), q_rows, vectors, k)
+        neighbors[q_rows] = rows
+        scores[q_rows] = block_scores
+    neighbors.flush()
+    scores.flush()
+    return stop - start
+
+
+# ---- driver ----
+
+def main(args):
+    start = time.perf_counter()
+    ids, vectors, metadata, source = load_source(args)
+    n = len(ids)
+    print(f"✅ Loaded {n} users from {source} ({time.perf_counter() - start:.2f}s).")
+
+    tmp_dir = args.output + ".tmp"
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit = np.divide(vectors, norms, out=np.zeros((n, vectors.shape[1]), dtype=np.float32), where=norms > 0)
+    np.save(os.path.join(tmp_dir, VECTORS_FILE), unit)
+    del unit
+    np.lib.format.open_memmap(os.path.join(tmp_dir, NEIGHBORS_FILE), mode="w+", dtype=np.int32, shape=(n, args.top_k)).flush()
+    np.lib.format.open_memmap(os.path.join(tmp_dir, SCORES_FILE), mode="w+", dtype=SCORE_STORAGE[args.storage], shape=(n, args.top_k)).flush()
+    write_ids_and_metadata(tmp_dir, ids, metadata)
+
+    # slices are several query blocks long so workers pick up work as they free up
+    step = QUERY_BLOCK_SIZE * args.blocks_per_task
+    slices = [(s, min(s + step, n)) for s in range(0, n, step)]
+    start = time.perf_counter()
+    with tqdm(total=n, desc="Top-k for every user", unit="users") as progress:
+        if args.workers <= 1:
+            _init_worker(tmp_dir)
+            for bounds in slices:
+                progress.update(_run_slice(bounds))
+            _W.clear()
+        else:
+            with mp.get_context("spawn").Pool(args.workers, initializer=_init_worker, initargs=(tmp_dir,)) as pool:
+                for done in pool.imap_unordered(_run_slice, slices):
+                    progress.update(done)
+    elapsed = time.perf_counter() - start
+
+    os.remove(os.path.join(tmp_dir, VECTORS_FILE))
+    with open(os.path.join(tmp_dir, META_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "k": args.top_k,
+            "count": n,
+            "source": source,
+            "storage": args.storage,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }, f)
+    publish(tmp_dir, args.output)
+    print(f"✅ Precomputed top-{args.top_k} for {n} users in {elapsed:.2f}s with {args.workers} worker(s) -> {args.output}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute top-k matches for every stored user.")
+    parser.add_argument("--field-store", default=None, help="directory written by run_pipeline.py --field-store")
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--blocks-per-task", type=int, default=8, help=f"query blocks of {QUERY_BLOCK_SIZE} per task")
+    parser.add_argument("--storage", choices=list(SCORE_STORAGE), default="float32",
+                        help="dtype of the stored scores (float16 halves the score table)")
+    parser.add_argument("--output", default=PRECOMPUTED_DIR)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(parse_args())
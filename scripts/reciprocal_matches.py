@@ -0,0 +1,66 @@
+# scripts/reciprocal_matches.py
+"""
+Reciprocal top-k for every user: only pairs where both sides' needs are met by
+the other's offers, ranked by cosine + RECIPROCAL_WEIGHT * mutual benefit
+(see src/reciprocal.py).
+
+    python scripts/reciprocal_matches.py --field-store models/field_store --top-k 10 --output data/reciprocal_matches.ndjson
+
+Vectors and needs/offers come from a field store (any backend) or, without
+--field-store, from the saved local index (VECTOR_BACKEND=local).
+Output: one JSON line per user {"id", "matches": [{"id", "score"}, ...]}.
+"""
+import os
+import json
+import time
+import argparse
+from dotenv import load_dotenv
+from tqdm import tqdm
+from config.variables import VARIABLES
+from src.reciprocal import RECIPROCAL_WEIGHT, ReciprocalIndex
+
+load_dotenv()
+
+INDEX_NAME = os.getenv("PINECONE_INDEX", "connectwise-index")
+
+
+def load_reciprocal_index(args) -> ReciprocalIndex:
+    if args.field_store:
+        from src.field_store import FieldVectorStore
+        store = FieldVectorStore.open(args.field_store)
+        return ReciprocalIndex.from_profiles(store.ids, store.default_vectors(VARIABLES), list(store.iter_metadata()), weight=args.weight)
+
+    from src.local_index import LocalIndex, index_path
+    index = LocalIndex.load(index_path(INDEX_NAME))
+    return ReciprocalIndex.from_local_index(index, weight=args.weight)
+
+
+def main(args):
+    start = time.perf_counter()
+    rix = load_reciprocal_index(args)
+    print(f"✅ Loaded {len(rix)} users in {rix.n_types} needs/offers types ({time.perf_counter() - start:.2f}s).")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    tmp_path = args.output + ".tmp"
+    start = time.perf_counter()
+    with open(tmp_path, "w", encoding="utf-8") as out, tqdm(total=len(rix), desc="Reciprocal top-k", unit="users") as progress:
+        for rows, best_rows, best_scores in rix.iter_top_k(args.top_k):
+            for row, picked, scores in zip(rows, best_rows, best_scores):
+                matches = [{"id": rix.ids[r], "score": round(float(s), 6)} for r, s in zip(picked, scores) if r >= 0]
+                out.write(json.dumps({"id": rix.ids[row], "matches": matches}, ensure_ascii=False) + "\n")
+            progress.update(len(rows))
+    os.replace(tmp_path, args.output)
+    print(f"✅ Wrote reciprocal matches for {len(rix)} users to {args.output} in {time.perf_counter() - start:.2f}s.")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute reciprocal needs/offers matches for every user.")
+    parser.add_argument("--field-store", default=None, help="directory written by run_pipeline.py --field-store")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--weight", type=float, default=RECIPROCAL_WEIGHT, help="weight of the mutual benefit vs cosine")
+    parser.add_argument("--output", default=os.path.join("data", "reciprocal_matches.ndjson"))
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,92 @@
+# scripts/reweight_users.py
+"""
+Re-weight every stored user without re-embedding.
+
+Reads the per-field vectors written by `run_pipeline.py --field-store DIR`,
+recomputes the combined vectors with new field weights (one einsum per block
+of users) and upserts them into the configured index.
+
+    python scripts/reweight_users.py --field-store models/field_store --weights '{"skills": 1.5, "location": 0.1}'
+
+Weights not given keep their default_weight from config/variables.py.
+"""
+import os
+import json
+import time
+import argparse
+from dotenv import load_dotenv
+from tqdm import tqdm
+from config.variables import VARIABLES
+from src.embeddings import check_weight_overrides, embedding_fields, field_weights
+from src.field_store import FieldVectorStore
+from src.ingest import BatchUpserter
+from src.vector_backend import backend_name, get_index_client
+
+load_dotenv()
+
+PINE_API = os.getenv("PINECONE_API_KEY")
+PINE_ENV = os.getenv("PINECONE_ENV")
+INDEX_NAME = os.getenv("PINECONE_INDEX", "connectwise-index")
+VECTOR_BACKEND = backend_name()
+
+
+def parse_weights(raw: str) -> dict:
+    """--weights is inline JSON or a path to a JSON file: {"<VARIABLES key>": weight}."""
+    if raw is None:
+        return {}
+    if os.path.exists(raw):
+        with open(raw, "r", encoding="utf-8") as f:
+            weights = json.load(f)
+    else:
+        weights = json.loads(raw)
+    try:
+        return check_weight_overrides(VARIABLES, weights)
+    except ValueError as e:
+        raise SystemExit(f"Bad --weights: {e}")
+
+
+def main(args):
+    store = FieldVectorStore.open(args.field_store)
+    overrides = parse_weights(args.weights)
+    keys = [v["key"] for v in embedding_fields(VARIABLES)]
+    weights = store.weights_vector(dict(zip(keys, field_weights(VARIABLES, overrides))))
+    print(f"✅ Opened field store with {len(store)} users; weights: {dict(zip(store.field_keys, weights.tolist()))}")
+
+    if args.dry_run:
+        start = time.perf_counter()
+        n = sum(len(block) for block in store.iter_combined(weights))
+        print(f"✅ Re-weighted {n} users in {time.perf_counter() - start:.2f}s (dry run, nothing upserted).")
+        return
+
+    client = get_index_client(VECTOR_BACKEND)
+    index = client.ensure_index_exists(PINE_API, INDEX_NAME, store.dim, PINE_ENV)
+    progress = tqdm(total=len(store), desc="Upserting re-weighted users", unit="users")
+    metadata = store.iter_metadata()
+    row = 0
+    with BatchUpserter(client, index, args.batch_size, args.max_in_flight, on_done=progress.update) as upserter:
+        for block in store.iter_combined(weights):
+            upserter.submit([
+                {"id": store.ids[row + i], "vector": vec.tolist(), "metadata": next(metadata)}
+                for i, vec in enumerate(block)
+            ])
+            row += len(block)
+    progress.close()
+
+    if VECTOR_BACKEND == "local":
+        from src.local_index import persist_index
+        persist_index(index)
+    print(f"✅ Upserted {upserter.upserted} re-weighted users to {VECTOR_BACKEND} index '{INDEX_NAME}'.")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute user vectors with new field weights.")
+    parser.add_argument("--field-store", required=True, help="directory written by run_pipeline.py --field-store")
+    parser.add_argument("--weights", default=None, help='JSON object or JSON file, e.g. \'{"skills": 1.5}\'')
+    parser.add_argument("--batch-size", type=int, default=100, help="vectors per upsert request")
+    parser.add_argument("--max-in-flight", type=int, default=4, help="concurrent upsert requests")
+    parser.add_argument("--dry-run", action="store_true", help="only time the re-weighting, don't upsert")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(parse_args())
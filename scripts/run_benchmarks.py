@@ -0,0 +1,261 @@
+# scripts/run_benchmarks.py
+"""
+Micro-benchmarks of the embedding and matching hot paths at several population
+sizes, on deterministic synthetic profiles (src/synthetic.py).
+
+    python scripts/run_benchmarks.py                                   # 1k, 10k, 100k users
+    python scripts/run_benchmarks.py --sizes 1000,1000000 --output bench.json
+    python scripts/run_benchmarks.py --baseline bench.json             # exit 1 on regressions
+
+Stages per size: profile generation, text_to_tokens, Word2Vec training,
+embed_text (uncached), build_weighted_user_vector, the batched
+build_weighted_user_vectors, the same from a columnar snapshot (export +
+embedding from dictionary codes), local index build (batched upserts) and
+single-query latency (exact and IVF), and recall@k vs memory of every
+storage mode (scripts/bench_quantization.py's run_config: stages
+storage_<mode>_rerank<depth>, with recall and bytes_per_vector). Results are
+one JSON document; with --baseline, every stage's per-op time is compared
+against an earlier run, and so are the storage stages' recall and bytes per
+vector.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+from argparse import Namespace
+import shutil
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+import numpy as np
+from config.variables import VARIABLES
+from src.embeddings import (
+    W2VEmbedder,
+    build_weighted_user_vector,
+    build_weighted_user_vectors,
+    combine_field_vectors,
+    embedding_fields,
+    field_text,
+    field_weights,
+)
+from src.ingest import chunked, profile_corpus_texts
+from src.local_index import LocalIndex, _normalize_rows
+from src.quantization import STORAGE_MODES
+from src.snapshot import ProfileSnapshot, SnapshotWriter
+from src.synthetic import iter_synthetic_profiles
+from src.utils import text_to_tokens
+from scripts.bench_quantization import run_config
+
+UPSERT_BATCH_SIZE = 100
+EMBED_CHUNK_SIZE = 1000
+
+
+def machine_info() -> dict:
+    import gensim
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "gensim": gensim.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "git_commit": commit,
+    }
+
+
+def record(results, size, stage, ops, seconds, **extra):
+    row = {"size": size, "stage": stage, "ops": ops, "total_s": round(seconds, 4),
+           "per_op_us": round(seconds * 1e6 / max(ops, 1), 3), **extra}
+    results.append(row)
+    print(f"   {stage:28s} {row['per_op_us']:12.2f} us/op  ({ops} ops, {seconds:.2f}s)")
+
+
+def latency(fn, items) -> tuple:
+    times = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        times.append(time.perf_counter() - start)
+    ms = np.asarray(times) * 1000
+    return float(ms.sum() / 1000), {
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(ms, 95)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+    }
+
+
+def bench_size(n, args, results):
+    print(f"🔹 {n} users")
+    rng = np.random.default_rng(args.seed)
+
+    start = time.perf_counter()
+    profiles = list(iter_synthetic_profiles(n, seed=args.seed))
+    record(results, n, "generate_profile", n, time.perf_counter() - start)
+
+    sample = [profiles[i] for i in rng.choice(n, size=min(args.sample, n), replace=False)]
+    texts = [field_text(p[v["key"]]) for p in sample for v in embedding_fields(VARIABLES) if v["key"] in p]
+
+    start = time.perf_counter()
+    for t in texts:
+        text_to_tokens(t)
+    record(results, n, "text_to_tokens", len(texts), time.perf_counter() - start)
+
+    corpus = [t for p in profiles for t in profile_corpus_texts(p, VARIABLES)]
+    embedder = W2VEmbedder(vector_size=args.dim, epochs=args.epochs, workers=args.workers)
+    start = time.perf_counter()
+    embedder.train(corpus)
+    record(results, n, "train_word2vec", len(corpus), time.perf_counter() - start,
+           epochs=args.epochs, vocab=len(embedder.key_to_index))
+
+    start = time.perf_counter()
+    for t in texts:
+        embedder.embed_text(t)
+    record(results, n, "embed_text", len(texts), time.perf_counter() - start)
+
+    embedder.text_cache.clear()
+    start = time.perf_counter()
+    for p in sample:
+        build_weighted_user_vector(p, embedder, VARIABLES)
+    record(results, n, "build_weighted_user_vector", len(sample), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    vectors = np.concatenate([
+        build_weighted_user_vectors(chunk, embedder, VARIABLES) for chunk in chunked(profiles, EMBED_CHUNK_SIZE)
+    ])
+    record(results, n, "build_weighted_user_vectors", n, time.perf_counter() - start)
+
+    snapshot_dir = os.path.join(tempfile.mkdtemp(prefix="bench-snapshot-"), "profiles")
+    try:
+        start = time.perf_counter()
+        with SnapshotWriter(snapshot_dir) as writer:
+            for rows in chunked(range(n), EMBED_CHUNK_SIZE):
+                writer.append([f"user_{j}" for j in rows], [profiles[j] for j in rows])
+        record(results, n, "snapshot_export", n, time.perf_counter() - start)
+
+        snapshot = ProfileSnapshot.open(snapshot_dir)
+        weights = field_weights(VARIABLES)
+        start = time.perf_counter()
+        for _, field_vecs, present in snapshot.iter_embedded(embedder, VARIABLES, EMBED_CHUNK_SIZE):
+            combine_field_vectors(field_vecs, present, weights)
+        record(results, n, "snapshot_user_vectors", n, time.perf_counter() - start)
+    finally:
+        shutil.rmtree(os.path.dirname(snapshot_dir), ignore_errors=True)
+
+    queries = vectors[rng.choice(n, size=min(args.queries, n), replace=False)]
+    for mode in ("exact", "ivf"):
+        index = LocalIndex(args.dim, mode=mode)
+        start = time.perf_counter()
+        for chunk in chunked(range(n), UPSERT_BATCH_SIZE):
+            index.upsert([{"id": f"user_{j}", "values": vectors[j], "metadata": {}} for j in chunk])
+        record(results, n, f"index_build_{mode}", n, time.perf_counter() - start)
+        if mode == "ivf":
+            if index._trainer is not None:
+                index._trainer.join()  # the background training started by the upserts
+            start = time.perf_counter()
+            index.train_ivf()
+            record(results, n, "ivf_train", 1, time.perf_counter() - start)
+        seconds, pct = latency(lambda q: index.query(q, top_k=args.top_k), queries)
+        record(results, n, f"query_{mode}", len(queries), seconds, **pct)
+
+    bench_storage(n, vectors, queries, args, results)
+
+
+def bench_storage(n, vectors, queries, args, results):
+    """Recall@k, RAM per vector and query latency of each storage mode x re-rank depth."""
+    unit, norms = _normalize_rows(vectors.astype(np.float32))
+    ids = [str(i) for i in range(n)]
+    queries, _ = _normalize_rows(queries.astype(np.float32))
+    exact = LocalIndex.from_arrays(ids, unit, norms, [{}] * n)
+    kth_scores = [exact.query(q, top_k=args.top_k, include_metadata=False)["matches"][-1]["score"] for q in queries]
+    config = Namespace(top_k=args.top_k, pq_m=args.pq_m)
+    for storage in args.storage.split(","):
+        for rerank in ([0] if storage == "float32" else [int(r) for r in args.storage_rerank.split(",")]):
+            row = run_config(storage, rerank, ids, unit, norms, queries, kth_scores, config)
+            record(results, n, f"storage_{storage}_rerank{rerank}", len(queries), row["query_ms"] * len(queries) / 1000,
+                   recall=row[f"recall_at_{args.top_k}"], bytes_per_vector=row["bytes_per_vector"],
+                   compression=round(exact.vector_bytes() / max(row["vector_bytes"], 1), 2))
+
+
+def compare(results, baseline_path, tolerance, recall_tolerance) -> list:
+    """
+    Stages whose per-op time or bytes per vector grew by more than `tolerance`
+    (fraction), or whose recall dropped by more than `recall_tolerance`, against the baseline run.
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["size"], r["stage"]): r for r in json.load(f)["results"]}
+    regressions = []
+    for r in results:
+        old = baseline.get((r["size"], r["stage"]))
+        if old is None:
+            continue
+        if old["per_op_us"] > 0 and r["per_op_us"] / old["per_op_us"] > 1 + tolerance:
+            regressions.append({"size": r["size"], "stage": r["stage"], "metric": "per_op_us", "baseline": old["per_op_us"],
+                                "current": r["per_op_us"], "ratio": round(r["per_op_us"] / old["per_op_us"], 3)})
+        if old.get("bytes_per_vector", 0) > 0 and r["bytes_per_vector"] / old["bytes_per_vector"] > 1 + tolerance:
+            regressions.append({"size": r["size"], "stage": r["stage"], "metric": "bytes_per_vector",
+                                "baseline": old["bytes_per_vector"], "current": r["bytes_per_vector"],
+                                "ratio": round(r["bytes_per_vector"] / old["bytes_per_vector"], 3)})
+        if "recall" in old and r["recall"] < old["recall"] - recall_tolerance:
+            regressions.append({"size": r["size"], "stage": r["stage"], "metric": "recall", "baseline": old["recall"],
+                                "current": r["recall"], "ratio": round(r["recall"] / max(old["recall"], 1e-9), 3)})
+    return regressions
+
+
+def main(args):
+    results = []
+    for n in [int(s) for s in args.sizes.split(",")]:
+        bench_size(n, args, results)
+
+    report = {
+        "benchmark": "suite",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "machine": machine_info(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "results": results,
+    }
+    if args.baseline:
+        report["regressions"] = compare(results, args.baseline, args.tolerance, args.recall_tolerance)
+        for r in report["regressions"]:
+            print(f"⚠️ {r['stage']} @ {r['size']}: {r['metric']} {r['baseline']} -> {r['current']} (x{r['ratio']})")
+        if not report["regressions"]:
+            print(f"✅ No stage regressed against {args.baseline}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Wrote {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+    return 1 if report.get("regressions") else 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark tokenization, embedding, training, index build and queries.")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated population sizes")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--dim", type=int, default=100)
+    parser.add_argument("--epochs", type=int, default=5, help="Word2Vec training epochs")
+    parser.add_argument("--workers", type=int, default=3, help="Word2Vec training threads")
+    parser.add_argument("--sample", type=int, default=2000, help="profiles timed one by one (tokenize / embed stages)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--storage", default=",".join(STORAGE_MODES), help="comma-separated storage modes")
+    parser.add_argument("--storage-rerank", default="0,50", help="comma-separated exact re-rank depths (quantized modes)")
+    parser.add_argument("--pq-m", type=int, default=None, help="PQ sub-spaces (default dim // 4)")
+    parser.add_argument("--output", default=None, help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", default=None, help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed per-op slowdown / memory growth vs --baseline")
+    parser.add_argument("--recall-tolerance", type=float, default=0.01, help="allowed recall@k drop vs --baseline")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
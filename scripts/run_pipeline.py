@@ -115,12 +115,18 @@
 # scripts/run_pipeline.py
 import os
 import json
+import argparse
 import numpy as np
 from dotenv import load_dotenv
 from glob import glob
+from tqdm import tqdm
 from config.variables import VARIABLES
-from src.embeddings import W2VEmbedder, build_weighted_user_vector
-from src.pinecone_client import upsert_users, ensure_index_exists
+from src.embeddings import W2VEmbedder, combine_field_vectors, embed_user_fields, embedding_fields, field_weights
+from src.field_store import FieldStoreWriter
+from src.ingest import BatchUpserter, chunked, iter_profiles, profile_corpus_texts, write_corpus_file
+from src.profile_store import PROFILE_STORE_PATH, ProfileStore
+from src.snapshot import ProfileSnapshot
+from src.vector_backend import backend_name, get_index_client
 
 load_dotenv()
 
@@ -128,19 +134,47 @@ PINE_API = os.getenv("PINECONE_API_KEY")
 PINE_ENV = os.getenv("PINECONE_ENV")
 INDEX_NAME = os.getenv("PINECONE_INDEX", "connectwise-index")
 VECTOR_DIM = int(os.getenv("VECTOR_DIM", 100))
+VECTOR_BACKEND = backend_name()
 
-if not PINE_API or not PINE_ENV:
+if VECTOR_BACKEND == "pinecone" and (not PINE_API or not PINE_ENV):
     print("⚠️ Pinecone keys not set. You can still run word2vec training locally.")
 
 DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "mock_users.json")
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "corpus_texts.txt")
 
 # 🔹 NEW: where to save the trained model
 MODELS_DIR = os.path.join(os.path.dirname(__file__), "..", "models")
 os.makedirs(MODELS_DIR, exist_ok=True)
 W2V_MODEL_PATH = os.path.join(MODELS_DIR, "w2v_connectwise.model")
+# vectors-only export the API memory-maps (vectors in w2v_connectwise.kv.vectors.npy)
+W2V_VECTORS_PATH = os.path.join(MODELS_DIR, "w2v_connectwise.kv")
+# gensim-free serving format (vocab.txt + vectors.npy) read by InferenceEmbedder
+W2V_INFERENCE_DIR = os.path.join(MODELS_DIR, "w2v_connectwise_inference")
 
 
-def main():
+def connect_index():
+    """Return (client, index) for the configured backend, or (None, None) if Pinecone isn't configured."""
+    if VECTOR_BACKEND == "pinecone" and not (PINE_API and PINE_ENV):
+        return None, None
+    client = get_index_client(VECTOR_BACKEND)
+    index = client.ensure_index_exists(PINE_API, INDEX_NAME, VECTOR_DIM, PINE_ENV)
+    return client, index
+
+
+def open_field_store(dir_path):
+    keys = [v["key"] for v in embedding_fields(VARIABLES)]
+    return FieldStoreWriter(dir_path, keys, VECTOR_DIM)
+
+
+def open_profile_store(args):
+    """The profile store profiles are written through, or None with --profile-store ''."""
+    path = args.profile_store if args is not None else PROFILE_STORE_PATH
+    return ProfileStore(path, synchronous="NORMAL") if path else None  # bulk load: fsync at checkpoints only
+
+
+def main(args=None):
+    workers = args.workers if args is not None else 3
+
     # -------------------------------
     # 1. Load user data
     # -------------------------------
@@ -155,34 +189,29 @@ def main():
     # -------------------------------
     corpus_texts = []
     for u in users:
-        for v in VARIABLES:
-            if v.get("use_for_embedding", True):
-                key = v["key"]
-                val = u.get(key)
-                if isinstance(val, list):
-                    corpus_texts.append(" ".join(str(x) for x in val))
-                elif isinstance(val, str):
-                    corpus_texts.append(val)
-                elif isinstance(val, (int, float)):
-                    corpus_texts.append(str(val))
+        corpus_texts.extend(profile_corpus_texts(u, VARIABLES))
 
     # -------------------------------
     # 3. Train Word2Vec model
     # -------------------------------
-    embedder = W2VEmbedder(vector_size=VECTOR_DIM, epochs=60)
+    embedder = W2VEmbedder(vector_size=VECTOR_DIM, epochs=60, workers=workers)
     embedder.train(corpus_texts)
     print("✅ Trained Word2Vec on mock data.")
 
     # 🔹 NEW: save the trained model
     embedder.save(W2V_MODEL_PATH)
     print(f"💾 Saved Word2Vec model to {W2V_MODEL_PATH}")
+    embedder.export_vectors(W2V_VECTORS_PATH)
+    embedder.export_inference(W2V_INFERENCE_DIR)
+    print(f"💾 Exported serving vectors to {W2V_VECTORS_PATH} and {W2V_INFERENCE_DIR}")
 
     # -------------------------------
     # 4. Build weighted vectors for mock users
     # -------------------------------
+    field_vecs, present = embed_user_fields(users, embedder, VARIABLES)
+    vecs = combine_field_vectors(field_vecs, present, field_weights(VARIABLES))
     user_vectors = []
-    for i, u in enumerate(users):
-        vec = build_weighted_user_vector(u, embedder, VARIABLES)
+    for i, (u, vec) in enumerate(zip(users, vecs)):
         user_vectors.append({
             "id": f"user_{i+1}",
             "vector": vec.tolist(),
@@ -190,16 +219,146 @@ def main():
         })
     print(f"✅ Built weighted vectors for {len(user_vectors)} users.")
 
+    if args is not None and args.field_store:
+        with open_field_store(args.field_store) as store:
+            store.append([u["id"] for u in user_vectors], field_vecs, present, users)
+        print(f"💾 Wrote per-field vectors to {args.field_store}")
+
+    profile_store = open_profile_store(args)
+    if profile_store is not None:
+        with profile_store:
+            profile_store.put_many((u["id"], u["metadata"]) for u in user_vectors)
+        print(f"💾 Saved {len(user_vectors)} profiles to {profile_store.path}")
+
     # -------------------------------
-    # 5. Pinecone upsert
+    # 5. Index upsert (Pinecone or local)
     # -------------------------------
-    if PINE_API and PINE_ENV:
-        index = ensure_index_exists(PINE_API, PINE_ENV, INDEX_NAME, VECTOR_DIM)
-        upsert_users(index, user_vectors)
-        print(f"✅ Upserted {len(user_vectors)} users to Pinecone index '{INDEX_NAME}'.")
-    else:
+    client, index = connect_index()
+    if index is None:
         print("⚠️ Skipping Pinecone upsert because API key or env not set.")
+        return
+    client.upsert_users(index, user_vectors)
+    if VECTOR_BACKEND == "local":
+        from src.local_index import persist_index
+        persist_index(index)
+    print(f"✅ Upserted {len(user_vectors)} users to {VECTOR_BACKEND} index '{INDEX_NAME}'.")
+
+
+def stream_main(args):
+    """
+    Streaming ingestion: read profiles incrementally (JSON array or NDJSON, the
+    profile store with --from-store, or a columnar snapshot with --from-snapshot,
+    embedded straight from its codes), embed them `chunk_size` at a time and
+    upsert in `batch_size` batches with at most `max_in_flight` concurrent
+    requests. Peak memory is bounded by the chunk size, not the number of users.
+    Profiles read from a file are also written through to the profile store.
+
+    With --train, first writes the tokenized corpus file incrementally from the
+    same input and trains Word2Vec out-of-core from it; otherwise uses the
+    already-trained model at W2V_MODEL_PATH.
+    """
+    source = snapshot = None
+    if args.from_snapshot:
+        snapshot = ProfileSnapshot.open(args.from_snapshot)
+        read_records = snapshot.iter_profiles
+        profile_store = None
+    elif args.from_store:
+        if not args.profile_store:
+            raise SystemExit("--from-store needs a --profile-store.")
+        source = ProfileStore(args.profile_store)
+        read_records = source.iter_profiles
+        profile_store = None  # nothing to write back
+    else:
+        def read_records():
+            # ids are assigned in input order, like the non-streaming pipeline
+            return ((f"user_{i + 1}", p) for i, p in enumerate(iter_profiles(args.input)))
+        profile_store = open_profile_store(args)
+
+    if args.train:
+        n_lines = write_corpus_file(
+            tqdm((p for _, p in read_records()), desc="Writing corpus", unit="users"), args.corpus_file, VARIABLES
+        )
+        print(f"✅ Wrote {n_lines} corpus lines to {args.corpus_file}")
+        embedder = W2VEmbedder(vector_size=VECTOR_DIM, epochs=60, workers=args.workers)
+        embedder.train_corpus_file(args.corpus_file)
+        embedder.save(W2V_MODEL_PATH)
+        embedder.export_vectors(W2V_VECTORS_PATH)
+        embedder.export_inference(W2V_INFERENCE_DIR)
+        print(f"💾 Trained on {args.corpus_file} with {args.workers} workers, saved to {W2V_MODEL_PATH}")
+    elif not os.path.exists(W2V_MODEL_PATH):
+        raise SystemExit(f"Word2Vec model not found at {W2V_MODEL_PATH}. Run with --train or without --stream first.")
+    else:
+        embedder = W2VEmbedder.load(W2V_MODEL_PATH)
+        print(f"✅ Loaded Word2Vec model from {W2V_MODEL_PATH}")
+
+    client, index = connect_index()
+    if index is None:
+        raise SystemExit("⚠️ Pinecone API key or env not set; nothing to upsert into.")
+
+    progress = tqdm(desc="Upserting users", unit="users")
+    store = open_field_store(args.field_store) if args.field_store else None
+    weights = field_weights(VARIABLES)
+    n_seen = 0
+    with BatchUpserter(client, index, args.batch_size, args.max_in_flight, on_done=progress.update) as upserter:
+        for records in chunked(read_records(), args.chunk_size):
+            ids = [uid for uid, _ in records]
+            chunk = [p for _, p in records]
+            if snapshot is not None:
+                field_vecs, present = snapshot.embed_fields(embedder, VARIABLES, n_seen, n_seen + len(records))
+            else:
+                field_vecs, present = embed_user_fields(chunk, embedder, VARIABLES)
+            n_seen += len(records)
+            vecs = combine_field_vectors(field_vecs, present, weights)
+            if store is not None:
+                store.append(ids, field_vecs, present, chunk)
+            if profile_store is not None:
+                profile_store.put_many(records)  # one transaction per chunk
+            upserter.submit([
+                {"id": uid, "vector": vec.tolist(), "metadata": u}
+                for uid, u, vec in zip(ids, chunk, vecs)
+            ])
+    progress.close()
+    if store is not None:
+        store.close()
+        print(f"💾 Wrote per-field vectors for {store.count} users to {args.field_store}")
+    if profile_store is not None:
+        profile_store.close()
+        print(f"💾 Saved {upserter.upserted} profiles to {profile_store.path}")
+    if source is not None:
+        source.close()
+
+    if VECTOR_BACKEND == "local":
+        from src.local_index import persist_index
+        persist_index(index)
+    print(f"✅ Upserted {upserter.upserted} users to {VECTOR_BACKEND} index '{INDEX_NAME}'.")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train Word2Vec and load user vectors into the index.")
+    parser.add_argument("--stream", action="store_true",
+                        help="stream profiles from --input in chunks instead of loading them all at once")
+    parser.add_argument("--input", default=DATA_PATH, help="JSON array or NDJSON file of profiles (--stream)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="profiles embedded per chunk (--stream)")
+    parser.add_argument("--batch-size", type=int, default=100, help="vectors per upsert request (--stream)")
+    parser.add_argument("--max-in-flight", type=int, default=4, help="concurrent upsert requests (--stream)")
+    parser.add_argument("--train", action="store_true",
+                        help="(--stream) write a corpus file from --input and train Word2Vec from it")
+    parser.add_argument("--corpus-file", default=CORPUS_PATH, help="tokenized corpus file used by --train")
+    parser.add_argument("--workers", type=int, default=3, help="Word2Vec training threads")
+    parser.add_argument("--field-store", default=None,
+                        help="also write per-field vectors here (lets scripts/reweight_users.py change weights)")
+    parser.add_argument("--profile-store", default=PROFILE_STORE_PATH,
+                        help="SQLite profile store the profiles are saved to ('' = don't save)")
+    parser.add_argument("--from-store", action="store_true",
+                        help="(--stream) read profiles and their ids from --profile-store instead of --input")
+    parser.add_argument("--from-snapshot", default=None,
+                        help="(--stream) read profiles and their ids from a snapshot (scripts/export_snapshot.py)")
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    if args.stream:
+        stream_main(args)
+    else:
+        main(args)
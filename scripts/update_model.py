@@ -0,0 +1,124 @@
+# scripts/update_model.py
+"""
+Background incremental Word2Vec updates.
+
+Registrations are appended by the API to NEW_PROFILES_LOG. This process watches
+that log and, once --min-new profiles have arrived (or --interval seconds have
+passed with at least one), adds their unseen tokens to the vocabulary, trains a
+few epochs on their sentences only and publishes the result as a new model
+version (src/model_registry.py).
+
+Training moves existing token vectors too, so stored user vectors no longer
+match the new model: the API keeps serving the old one until the index has
+been re-embedded. With --migrate every publish is followed by
+scripts/migrate_index.py (re-embed into a new index, then flip the alias, which
+API workers follow without a restart); otherwise run it yourself.
+
+    python scripts/update_model.py --migrate             # run forever
+    python scripts/update_model.py --once --force        # one update over everything pending
+
+The first update starts from models/w2v_connectwise.model; later ones from the
+currently published version.
+"""
+import os
+import json
+import time
+import argparse
+from dotenv import load_dotenv
+from config.variables import VARIABLES
+from src.embeddings import W2VEmbedder
+from src.ingest import profile_corpus_texts, read_profile_log
+from src.model_registry import MODELS_DIR, publish_model, read_pointer
+
+load_dotenv()
+
+W2V_MODEL_PATH = os.path.join(MODELS_DIR, "w2v_connectwise.model")
+# same default as the API, whatever directory this runs from
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NEW_PROFILES_LOG = os.getenv("NEW_PROFILES_LOG", os.path.join(BASE_DIR, "data", "new_profiles.ndjson"))
+STATE_PATH = os.path.join(MODELS_DIR, "update_model_state.json")
+
+
+def load_state() -> dict:
+    if os.path.exists(STATE_PATH):
+        with open(STATE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"offset": 0}
+
+
+def save_state(state: dict):
+    tmp_path = STATE_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def load_base_model() -> W2VEmbedder:
+    record = read_pointer()
+    path = record["model_path"] if record else W2V_MODEL_PATH
+    embedder = W2VEmbedder.load(path)
+    print(f"✅ Loaded base model {record['version'] if record else path} ({len(embedder.key_to_index)} tokens).")
+    return embedder
+
+
+def migrate(args):
+    """Re-embed every profile with the published model and switch the API over (scripts/migrate_index.py)."""
+    from scripts import migrate_index
+
+    migrate_index.main(migrate_index.parse_args(["--settle", str(args.settle)]))
+
+
+def run_update(embedder: W2VEmbedder, records: list, args) -> bool:
+    texts = [t for r in records for t in profile_corpus_texts(r["profile"], VARIABLES)]
+    unknown = embedder.unknown_tokens(texts)
+    if not unknown and not args.force:
+        print(f"🔹 {len(records)} new profiles, no unseen tokens; nothing to publish.")
+        return False
+
+    start = time.perf_counter()
+    added = embedder.update(texts, epochs=args.epochs)
+    record = publish_model(embedder, keep=args.keep)
+    print(f"✅ Published model {record['version']}: +{added} tokens from {len(records)} profiles "
+          f"in {time.perf_counter() - start:.2f}s (e.g. {sorted(unknown)[:5]}).")
+    if args.migrate:
+        migrate(args)
+    else:
+        print("🔹 Not served until the index is re-embedded: run scripts/migrate_index.py (or pass --migrate).")
+    return True
+
+
+def main(args):
+    embedder = load_base_model()
+    state = load_state()
+    last_update = time.monotonic()
+    while True:
+        records, offset = read_profile_log(args.log, state["offset"])
+        due = len(records) >= args.min_new or (records and time.monotonic() - last_update >= args.interval)
+        if records and (due or args.once):
+            run_update(embedder, records, args)
+            state["offset"] = offset
+            save_state(state)
+            last_update = time.monotonic()
+        if args.once:
+            break
+        time.sleep(args.poll)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Incrementally update Word2Vec with newly registered profiles.")
+    parser.add_argument("--log", default=NEW_PROFILES_LOG, help="NDJSON log of new profiles written by the API")
+    parser.add_argument("--min-new", type=int, default=50, help="update once this many new profiles are pending")
+    parser.add_argument("--interval", type=float, default=3600, help="...or after this many seconds with any pending")
+    parser.add_argument("--poll", type=float, default=30, help="seconds between log checks")
+    parser.add_argument("--epochs", type=int, default=5, help="training epochs over the new sentences")
+    parser.add_argument("--keep", type=int, default=3, help="published versions to keep on disk")
+    parser.add_argument("--force", action="store_true", help="publish even if there are no unseen tokens")
+    parser.add_argument("--migrate", action="store_true",
+                        help="after each publish, re-embed all profiles into a new index and switch the alias to it")
+    parser.add_argument("--settle", type=float, default=30, help="--migrate: seconds to wait for API workers to start dual-writing")
+    parser.add_argument("--once", action="store_true", help="process what is pending and exit")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(parse_args())
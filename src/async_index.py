@@ -0,0 +1,48 @@
+# src/async_index.py
+"""
+Async facade over an index client module (src/pinecone_client or src/local_index).
+
+The underlying clients are blocking. Their calls run on a dedicated
+BoundedExecutor, sized to match the Pinecone connection pool
+(ensure_index_exists(..., pool_threads=N)), so concurrent requests reuse pooled
+HTTP connections and never tie up the event loop or the embedding pool.
+"""
+import asyncio
+
+from src.executors import BoundedExecutor
+
+
+class AsyncIndexClient:
+    def __init__(self, client, index, max_workers: int = 16, max_pending: int = 256):
+        self.client = client
+        self.index = index
+        self.pool = BoundedExecutor("index", max_workers, max_pending)
+
+    async def upsert_users(self, user_vectors):
+        return await self.pool.run(self.client.upsert_users, self.index, user_vectors, verbose=False)
+
+    async def fetch_vectors(self, ids):
+        return await self.pool.run(self.client.fetch_vectors, self.index, ids)
+
+    async def query_similar(self, query_vector, top_k=5, filter=None):
+        return await self.pool.run(self.client.query_similar, self.index, query_vector, top_k, filter=filter)
+
+    async def query_similar_batch(self, query_vectors, top_k=5, filter=None):
+        """
+        One result per query row. Uses the client's batched query when it has one
+        (local index: one matrix multiply), else fans the queries out concurrently.
+        """
+        if hasattr(self.client, "query_similar_batch"):
+            return await self.pool.run(self.client.query_similar_batch, self.index, query_vectors, top_k, filter=filter)
+
+        # at most one in-flight query per pool thread, so a big batch can't trip max_pending
+        limit = asyncio.Semaphore(self.pool.max_workers)
+
+        async def one(q):
+            async with limit:
+                return await self.query_similar(q, top_k, filter)
+
+        return await asyncio.gather(*(one(q) for q in query_vectors))
+
+    def close(self):
+        self.pool.shutdown()
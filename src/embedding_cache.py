@@ -0,0 +1,93 @@
+# src/embedding_cache.py
+"""
+Caches used by the embedder to avoid re-tokenizing / re-embedding the same strings.
+
+- OptionTable: precomputed option -> (vector sum, token count) for closed catalog
+  options (config/catalogs.py), built once when the model loads
+- LRUCache:    bounded cache for free-text values (one_line_bio, location, ...)
+
+Both keep hit/miss counters (see .stats()).
+"""
+import threading
+from collections import OrderedDict
+from typing import List
+
+import numpy as np
+
+
+class LRUCache:
+    """Thread-safe bounded LRU mapping with hit/miss counters."""
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data), "maxsize": self.maxsize}
+
+
+class OptionTable:
+    """
+    Precomputed (vector sum, in-vocab token count) for a fixed list of option strings.
+
+    Because tokens never span option boundaries, the embedding of a multi-select
+    field is sum(option sums) / sum(option counts) — no tokenization at request time.
+    """
+
+    def __init__(self, options: List[str], sums: np.ndarray, counts: np.ndarray):
+        self.sums = sums
+        self.counts = counts
+        self._row = {opt: i for i, opt in enumerate(options)}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def build(cls, options: List[str], embedder) -> "OptionTable":
+        options = list(dict.fromkeys(options))
+        sums, counts = embedder.embed_batch_sums(options)
+        return cls(options, sums, counts)
+
+    def __len__(self):
+        return len(self._row)
+
+    def row(self, option: str):
+        """Row id of `option` in the table, or None if it is not a catalog option."""
+        i = self._row.get(option)
+        if i is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return i
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._row)}
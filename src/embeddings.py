@@ -78,13 +78,172 @@
 #     return user_vector
 # src/embeddings.py
 # src/embeddings.py
-from gensim.models import Word2Vec
+import abc
+import os
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, TYPE_CHECKING
+from config.catalogs import CATALOG_OPTIONS
+from src.embedding_cache import LRUCache, OptionTable
 from src.utils import text_to_tokens
 
+# gensim (and scipy) are only imported on the training / full-model path;
+# serving with InferenceEmbedder needs nothing but NumPy.
+if TYPE_CHECKING:
+    from gensim.models import KeyedVectors, Word2Vec
 
-class W2VEmbedder:
+INFERENCE_VOCAB_FILE = "vocab.txt"
+INFERENCE_VECTORS_FILE = "vectors.npy"
+
+
+def file_version(path: str) -> str:
+    """Cheap identifier of a model file on disk (name, size, mtime) -- no hashing of large files."""
+    st = os.stat(path)
+    return f"{os.path.basename(os.path.normpath(path))}:{st.st_size}:{st.st_mtime_ns}"
+
+
+class BaseEmbedder(abc.ABC):
+    """
+    Token -> vector lookup and averaging shared by every embedder.
+    Subclasses provide `key_to_index` (token -> row) and `vectors` (rows, dim).
+    """
+
+    def __init__(self, vector_size: int = 100, text_cache_size: int = 4096):
+        self.vector_size = vector_size
+        # identifies the vectors in use (set by the loaders); part of match cache keys
+        self.version = None
+        # catalog option -> (sum, count); free text falls back to the LRU cache
+        self.option_table = None
+        self.text_cache = LRUCache(text_cache_size)
+
+    @property
+    @abc.abstractmethod
+    def key_to_index(self) -> Dict[str, int]:
+        """Token -> row of `vectors`."""
+
+    @property
+    @abc.abstractmethod
+    def vectors(self) -> np.ndarray:
+        """(vocab, vector_size) float32 token vectors."""
+
+    def build_option_table(self, options: List[str] = None):
+        """Precompute (vector sum, token count) for every catalog option."""
+        self.option_table = OptionTable.build(options or CATALOG_OPTIONS, self)
+        self.text_cache.clear()
+
+    def cache_stats(self) -> dict:
+        return {
+            "option_table": self.option_table.stats() if self.option_table is not None else None,
+            "text_cache": self.text_cache.stats(),
+        }
+
+    def embed_text(self, text: str) -> np.ndarray:
+        """
+        Embed a single text as the mean of its token vectors.
+        """
+        tokens = text_to_tokens(text)
+        if not tokens or self.vectors is None:
+            return np.zeros(self.vector_size, dtype=float)
+
+        ids = self.tokens_to_ids(tokens)
+        if not ids:
+            return np.zeros(self.vector_size, dtype=float)
+
+        return np.mean(self.vectors[ids], axis=0)
+
+    def unknown_tokens(self, texts: List[str]) -> set:
+        """Tokens of `texts` that are missing from the vocabulary (they embed to zero)."""
+        vocab = self.key_to_index
+        return {tok for t in texts if t for tok in text_to_tokens(t) if tok not in vocab}
+
+    def tokens_to_ids(self, tokens: List[str]) -> List[int]:
+        """Map tokens to vocab row ids, dropping out-of-vocabulary tokens."""
+        key_to_index = self.key_to_index
+        ids = []
+        for t in tokens:
+            i = key_to_index.get(t)
+            if i is not None:
+                ids.append(i)
+        return ids
+
+    def embed_batch_sums(self, texts: List[str]):
+        """
+        Sum of in-vocab token vectors and in-vocab token count for each text.
+        Returns (sums: (n, dim) float32, counts: (n,) int64).
+
+        Tokens are mapped to row ids once, gathered from the vector matrix in a
+        single fancy-index and reduced per text with np.add.reduceat.
+        """
+        n = len(texts)
+        sums = np.zeros((n, self.vector_size), dtype=np.float32)
+        counts = np.zeros(n, dtype=np.int64)
+        if n == 0 or self.vectors is None:
+            return sums, counts
+
+        flat_ids = []
+        for i, text in enumerate(texts):
+            ids = self.tokens_to_ids(text_to_tokens(text))
+            counts[i] = len(ids)
+            flat_ids.extend(ids)
+        if not flat_ids:
+            return sums, counts
+
+        gathered = self.vectors[np.asarray(flat_ids, dtype=np.int64)]
+        # reduceat misbehaves on empty segments, so only reduce the non-empty ones;
+        # their starts are strictly increasing and cover `gathered` exactly
+        nonempty = counts > 0
+        starts = (np.cumsum(counts) - counts)[nonempty]
+        sums[nonempty] = np.add.reduceat(gathered, starts, axis=0)
+        return sums, counts
+
+    def _text_sum(self, text: str):
+        """(sum, count) for a free-text string, memoised in the LRU cache."""
+        hit = self.text_cache.get(text)
+        if hit is not None:
+            return hit
+        sums, counts = self.embed_batch_sums([text])
+        value = (sums[0], int(counts[0]))
+        self.text_cache.put(text, value)
+        return value
+
+    def field_sum(self, val: Any):
+        """
+        (vector sum, in-vocab token count) for one profile field value.
+        Catalog options come from the precomputed table, anything else from the LRU cache.
+        """
+        items = val if isinstance(val, list) else [val]
+        total = np.zeros(self.vector_size, dtype=np.float32)
+        count = 0
+        for item in items:
+            item = str(item)
+            row = self.option_table.row(item) if self.option_table is not None else None
+            if row is not None:
+                total += self.option_table.sums[row]
+                count += int(self.option_table.counts[row])
+            else:
+                item_sum, item_count = self._text_sum(item)
+                total += item_sum
+                count += item_count
+        return total, count
+
+    def embed_field(self, val: Any) -> np.ndarray:
+        """Same result as embed_text(field_text(val)), served from the caches."""
+        total, count = self.field_sum(val)
+        if count == 0:
+            return np.zeros(self.vector_size, dtype=float)
+        return total / count
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed many texts at once. Row i matches embed_text(texts[i]).
+        Returns an (n, vector_size) float32 array.
+        """
+        sums, counts = self.embed_batch_sums(texts)
+        nonempty = counts > 0
+        sums[nonempty] /= counts[nonempty, None]
+        return sums
+
+
+class W2VEmbedder(BaseEmbedder):
     def __init__(
         self,
         vector_size: int = 100,
@@ -92,25 +251,27 @@ class W2VEmbedder:
         min_count: int = 1,
         epochs: int = 50,
         seed: int = 42,
-        model: Word2Vec = None
+        model: "Word2Vec" = None,
+        text_cache_size: int = 4096,
+        workers: int = 3,
     ):
-        self.vector_size = vector_size
+        super().__init__(vector_size=vector_size, text_cache_size=text_cache_size)
         self.window = window
         self.min_count = min_count
         self.epochs = epochs
         self.seed = seed
+        self.workers = workers  # gensim training threads
         self.model = model  # can be loaded from disk
+        self._wv = None  # standalone KeyedVectors (see load_vectors)
 
     def train(self, list_of_texts: List[str]):
         """
         Train a Word2Vec model on a list of texts.
         Each text is tokenized via text_to_tokens.
         """
-        sentences = [
-            text_to_tokens(t)
-            for t in list_of_texts
-            if t and len(text_to_tokens(t)) > 0
-        ]
+        from gensim.models import Word2Vec
+
+        sentences = [text_to_tokens(t) for t in list_of_texts if t]
         sentences = [s for s in sentences if s]  # filter empty
         if not sentences:
             raise ValueError("No tokens to train on.")
@@ -121,7 +282,51 @@ class W2VEmbedder:
             min_count=self.min_count,
             epochs=self.epochs,
             seed=self.seed,
+            workers=self.workers,
+        )
+        self.build_option_table()
+
+    def train_corpus_file(self, corpus_path: str):
+        """
+        Train from a pre-tokenized corpus file (one sentence per line, tokens
+        separated by spaces -- see src.ingest.write_corpus_file).
+
+        gensim streams the file itself (corpus_file mode), each worker reading its
+        own slice, so the corpus never has to fit in RAM.
+        """
+        from gensim.models import Word2Vec
+
+        if not os.path.exists(corpus_path) or os.path.getsize(corpus_path) == 0:
+            raise ValueError(f"No tokens to train on in {corpus_path}.")
+        self.model = Word2Vec(
+            corpus_file=corpus_path,
+            vector_size=self.vector_size,
+            window=self.window,
+            min_count=self.min_count,
+            epochs=self.epochs,
+            seed=self.seed,
+            workers=self.workers,
         )
+        self.build_option_table()
+
+    def update(self, list_of_texts: List[str], epochs: int = 5) -> int:
+        """
+        Incremental update: add the texts' unseen tokens to the vocabulary
+        (build_vocab(update=True)) and train a few epochs on these texts only,
+        instead of retraining on the whole corpus. Returns the number of new tokens.
+        Needs the full model (load / train), not just exported vectors.
+        """
+        if self.model is None:
+            raise ValueError("Incremental updates need the full Word2Vec model (W2VEmbedder.load).")
+        sentences = [text_to_tokens(t) for t in list_of_texts if t]
+        sentences = [s for s in sentences if s]
+        if not sentences:
+            return 0
+        vocab_before = len(self.model.wv)
+        self.model.build_vocab(sentences, update=True)
+        self.model.train(sentences, total_examples=len(sentences), epochs=epochs)
+        self.build_option_table()  # also drops cached text vectors
+        return len(self.model.wv) - vocab_before
 
     def save(self, path: str):
         """Save the underlying Word2Vec model to disk."""
@@ -132,32 +337,114 @@ class W2VEmbedder:
     @classmethod
     def load(cls, path: str):
         """Load a Word2Vec model from disk and wrap it in W2VEmbedder."""
+        from gensim.models import Word2Vec
+
         model = Word2Vec.load(path)
         vector_size = model.vector_size
-        return cls(vector_size=vector_size, model=model)
+        embedder = cls(vector_size=vector_size, model=model)
+        embedder.version = file_version(path)
+        embedder.build_option_table()
+        return embedder
 
-    def embed_text(self, text: str) -> np.ndarray:
+    @property
+    def wv(self) -> "KeyedVectors":
+        """Token vectors: the trained model's, or standalone ones from load_vectors."""
+        if self.model is not None:
+            return self.model.wv
+        return self._wv
+
+    @property
+    def key_to_index(self) -> Dict[str, int]:
+        return self.wv.key_to_index
+
+    @property
+    def vectors(self) -> np.ndarray:
+        wv = self.wv
+        return wv.vectors if wv is not None else None
+
+    def export_vectors(self, path: str):
         """
-        Embed a single text as the mean of its token vectors.
+        Save only the KeyedVectors (no training state) for serving.
+        The vector matrix goes to a separate <path>.vectors.npy so it can be memory-mapped.
         """
-        tokens = text_to_tokens(text)
-        if not tokens or self.model is None:
-            return np.zeros(self.vector_size, dtype=float)
+        if self.model is None:
+            raise ValueError("No model to export.")
+        self.model.wv.save(path, separately=["vectors"])
 
-        vecs = []
-        for t in tokens:
-            if t in self.model.wv:
-                vecs.append(self.model.wv[t])
+    def export_inference(self, dir_path: str):
+        """
+        Write the compact, gensim-free serving format read by InferenceEmbedder:
+        <dir>/vocab.txt (one token per line, in row order) + <dir>/vectors.npy (float32).
+        """
+        if self.wv is None:
+            raise ValueError("No model to export.")
+        os.makedirs(dir_path, exist_ok=True)
+        with open(os.path.join(dir_path, INFERENCE_VOCAB_FILE), "w", encoding="utf-8") as f:
+            for token in self.wv.index_to_key:
+                f.write(f"{token}\n")
+        np.save(os.path.join(dir_path, INFERENCE_VECTORS_FILE), np.asarray(self.wv.vectors, dtype=np.float32))
+
+    @classmethod
+    def load_vectors(cls, path: str, mmap: str = "r"):
+        """
+        Load KeyedVectors written by export_vectors. With mmap="r" the vector
+        matrix is mapped read-only, so every API worker on a host shares one
+        page-cache copy instead of unpickling its own.
+        """
+        from gensim.models import KeyedVectors
+
+        wv = KeyedVectors.load(path, mmap=mmap)
+        embedder = cls(vector_size=wv.vector_size)
+        embedder._wv = wv
+        embedder.version = file_version(path)
+        embedder.build_option_table()
+        return embedder
 
-        if not vecs:
-            return np.zeros(self.vector_size, dtype=float)
 
-        return np.mean(vecs, axis=0)
+class InferenceEmbedder(BaseEmbedder):
+    """
+    Serving-only embedder: token -> vector lookup and averaging with NumPy alone.
+    Reads the directory written by W2VEmbedder.export_inference; the matrix is
+    memory-mapped by default so API workers share one copy.
+    """
+
+    def __init__(self, vocab: List[str], vectors: np.ndarray, text_cache_size: int = 4096):
+        super().__init__(vector_size=vectors.shape[1], text_cache_size=text_cache_size)
+        self._vectors = vectors
+        self._key_to_index = {token: i for i, token in enumerate(vocab)}
+
+    @property
+    def key_to_index(self) -> Dict[str, int]:
+        return self._key_to_index
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors
+
+    @classmethod
+    def load(cls, dir_path: str, mmap: bool = True):
+        with open(os.path.join(dir_path, INFERENCE_VOCAB_FILE), "r", encoding="utf-8") as f:
+            vocab = [line.rstrip("\n") for line in f]
+        vectors = np.load(os.path.join(dir_path, INFERENCE_VECTORS_FILE), mmap_mode="r" if mmap else None)
+        if len(vocab) != vectors.shape[0]:
+            raise ValueError(f"Vocab size {len(vocab)} does not match vectors {vectors.shape} in {dir_path}.")
+        embedder = cls(vocab, vectors)
+        embedder.version = file_version(os.path.join(dir_path, INFERENCE_VECTORS_FILE))
+        embedder.build_option_table()
+        return embedder
+
+
+def field_text(val: Any) -> str:
+    """Convert a profile field value into the text that gets embedded."""
+    # Convert lists into a single string (e.g., skills, interests)
+    if isinstance(val, list):
+        return " ".join(str(x) for x in val)
+    return str(val)
 
 
 def build_weighted_user_vector(
     user_data: Dict[str, Any],
-    embedder: W2VEmbedder,
+    embedder: BaseEmbedder,
     variables: List[Dict[str, Any]],
 ) -> np.ndarray:
     """
@@ -180,13 +467,7 @@ def build_weighted_user_vector(
         if val is None:
             continue
 
-        # Convert lists into a single string (e.g., skills, interests)
-        if isinstance(val, list):
-            text = " ".join(str(x) for x in val)
-        else:
-            text = str(val)
-
-        vec = embedder.embed_text(text)
+        vec = embedder.embed_field(val)
         if vec is not None:
             weight = v.get("default_weight", 1.0)
             all_vecs.append(vec * weight)
@@ -197,3 +478,95 @@ def build_weighted_user_vector(
 
     user_vector = np.sum(all_vecs, axis=0) / np.sum(all_weights)
     return user_vector
+
+
+def embedding_fields(variables: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The variables that take part in the embedding, in config order."""
+    return [v for v in variables if v.get("use_for_embedding", True)]
+
+
+def embed_user_fields(
+    users: List[Dict[str, Any]],
+    embedder: BaseEmbedder,
+    variables: List[Dict[str, Any]],
+):
+    """
+    Per-field vectors for many users, before weighting.
+    Returns (field_vecs: (n_users, n_fields, dim) float32, present: (n_users, n_fields) bool),
+    fields ordered as embedding_fields(variables). `present` is False where the
+    profile has no value (those fields don't count towards the weight total).
+    """
+    fields = embedding_fields(variables)
+    n, f = len(users), len(fields)
+    texts = []
+    present = np.zeros((n, f), dtype=bool)
+    for i, u in enumerate(users):
+        for j, v in enumerate(fields):
+            val = u.get(v["key"])
+            if val is None:
+                texts.append("")
+                continue
+            texts.append(field_text(val))
+            present[i, j] = True
+
+    field_vecs = embedder.embed_batch(texts).reshape(n, f, embedder.vector_size)
+    return field_vecs, present
+
+
+def field_weights(variables: List[Dict[str, Any]], overrides: Dict[str, float] = None) -> np.ndarray:
+    """(n_fields,) weights in embedding_fields order: default_weight unless overridden by key."""
+    overrides = overrides or {}
+    return np.asarray(
+        [overrides.get(v["key"], v.get("default_weight", 1.0)) for v in embedding_fields(variables)],
+        dtype=np.float32,
+    )
+
+
+def check_weight_overrides(variables: List[Dict[str, Any]], overrides: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Validate a {VARIABLES key: weight} override (e.g. from a request) and return it as floats.
+    Raises ValueError on unknown keys, negative weights, or weights that sum to zero.
+    """
+    known = {v["key"] for v in embedding_fields(variables)}
+    unknown = set(overrides) - known
+    if unknown:
+        raise ValueError(f"Unknown field(s) in weights: {sorted(unknown)}")
+    try:
+        cleaned = {k: float(w) for k, w in overrides.items()}
+    except (TypeError, ValueError):
+        raise ValueError("Weights must be numbers.")
+    if any(w < 0 or not np.isfinite(w) for w in cleaned.values()):
+        raise ValueError("Weights must be finite and >= 0.")
+    if not field_weights(variables, cleaned).any():
+        raise ValueError("At least one field weight must be > 0.")
+    return cleaned
+
+
+def combine_field_vectors(field_vecs: np.ndarray, present: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    Weighted average over the field axis, one einsum for all users:
+    (n, f, d) field vectors + (n, f) presence + (f,) weights -> (n, d).
+    """
+    w = present * weights  # (n, f)
+    user_vectors = np.einsum("uf,ufd->ud", w, field_vecs, dtype=np.float32)
+    totals = w.sum(axis=1)
+    has_fields = totals > 0
+    user_vectors[has_fields] /= totals[has_fields, None]
+    return user_vectors
+
+
+def build_weighted_user_vectors(
+    users: List[Dict[str, Any]],
+    embedder: BaseEmbedder,
+    variables: List[Dict[str, Any]],
+) -> np.ndarray:
+    """
+    Batched build_weighted_user_vector: returns an (n_users, dim) float32 array.
+
+    All field texts of all users are embedded in one embed_batch call, then
+    combined per user with a single weighted einsum over the field axis.
+    """
+    if not users or not embedding_fields(variables):
+        return np.zeros((len(users), embedder.vector_size), dtype=np.float32)
+    field_vecs, present = embed_user_fields(users, embedder, variables)
+    return combine_field_vectors(field_vecs, present, field_weights(variables))
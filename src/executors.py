@@ -0,0 +1,41 @@
+# src/executors.py
+"""
+Size-bounded thread pools for the async API handlers.
+
+Each pipeline stage (embedding, index calls) gets its own pool, so a burst
+on one stage can't starve the other. A pool has a fixed number of threads plus
+a cap on queued work. Past that cap, run() raises Overloaded at once instead
+of letting the queue (and tail latency) grow.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Overloaded(Exception):
+    """Raised when a BoundedExecutor already has `max_pending` jobs queued or running."""
+
+
+class BoundedExecutor:
+    def __init__(self, name: str, max_workers: int, max_pending: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pending = 0  # only touched from the event loop thread
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+    async def run(self, fn, *args, **kwargs):
+        if self.pending >= self.max_pending:
+            raise Overloaded(f"{self.name} executor is saturated ({self.pending} jobs pending).")
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            self.pending -= 1
+
+    def stats(self) -> dict:
+        return {"max_workers": self.max_workers, "max_pending": self.max_pending, "pending": self.pending}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,173 @@
+# src/field_store.py
+"""
+Per-field vector store: the unweighted field vectors of every user, kept next
+to the combined vector in the index, so match weights can change without
+re-embedding anyone.
+
+On disk (one directory):
+    fields.npy      (n_users, n_fields, dim) float32, memory-mapped on read
+    present.npy     (n_users, n_fields) bool, False where the profile had no value
+    ids.txt         one user id per line, row order
+    metadata.ndjson index metadata per row (optional, used when re-upserting)
+    meta.json       field keys, dim, row count
+
+Re-weighting everyone is then combine(weights): one einsum per block of rows.
+"""
+import json
+import os
+import struct
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+
+from src.embeddings import combine_field_vectors, embedding_fields, field_weights
+
+FIELDS_FILE = "fields.npy"
+PRESENT_FILE = "present.npy"
+IDS_FILE = "ids.txt"
+METADATA_FILE = "metadata.ndjson"
+META_FILE = "meta.json"
+
+# fixed .npy header size, so the row count can be patched in after streaming writes
+_NPY_HEADER_LEN = 128
+# rows combined per einsum in FieldVectorStore.combine (bounds temporary memory)
+COMBINE_BLOCK_ROWS = 65536
+
+
+def _npy_header(shape, dtype) -> bytes:
+    header = repr({"descr": np.dtype(dtype).str, "fortran_order": False, "shape": tuple(shape)})
+    body_len = _NPY_HEADER_LEN - 10  # magic(6) + version(2) + header length(2)
+    header = header.ljust(body_len - 1) + "\n"
+    if len(header) != body_len:
+        raise ValueError(f"Shape {shape} too large for a {_NPY_HEADER_LEN}-byte .npy header.")
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", body_len) + header.encode("latin1")
+
+
+class FieldStoreWriter:
+    """Append-only writer; rows can be streamed in chunks (see run_pipeline.py)."""
+
+    def __init__(self, dir_path: str, field_keys: List[str], dim: int):
+        os.makedirs(dir_path, exist_ok=True)
+        self.dir_path = dir_path
+        self.field_keys = list(field_keys)
+        self.dim = dim
+        self.count = 0
+        self._fields = open(os.path.join(dir_path, FIELDS_FILE), "wb")
+        self._present = open(os.path.join(dir_path, PRESENT_FILE), "wb")
+        self._ids = open(os.path.join(dir_path, IDS_FILE), "w", encoding="utf-8")
+        self._metadata = open(os.path.join(dir_path, METADATA_FILE), "w", encoding="utf-8")
+        # placeholder headers, rewritten with the real row count on close()
+        self._fields.write(_npy_header((0, len(self.field_keys), dim), np.float32))
+        self._present.write(_npy_header((0, len(self.field_keys)), np.bool_))
+
+    def append(self, ids: List[str], field_vecs: np.ndarray, present: np.ndarray, metadata: List[Dict[str, Any]] = None):
+        n = len(ids)
+        if field_vecs.shape != (n, len(self.field_keys), self.dim) or present.shape != (n, len(self.field_keys)):
+            raise ValueError(f"Expected ({n}, {len(self.field_keys)}, {self.dim}) field vectors, got {field_vecs.shape}.")
+        self._fields.write(np.ascontiguousarray(field_vecs, dtype=np.float32).tobytes())
+        self._present.write(np.ascontiguousarray(present, dtype=np.bool_).tobytes())
+        for i, uid in enumerate(ids):
+            self._ids.write(f"{uid}\n")
+            self._metadata.write(json.dumps(metadata[i] if metadata else {}, ensure_ascii=False, default=str))
+            self._metadata.write("\n")
+        self.count += n
+
+    def close(self):
+        f = len(self.field_keys)
+        for fh, shape, dtype in (
+            (self._fields, (self.count, f, self.dim), np.float32),
+            (self._present, (self.count, f), np.bool_),
+        ):
+            fh.seek(0)
+            fh.write(_npy_header(shape, dtype))
+            fh.close()
+        self._ids.close()
+        self._metadata.close()
+        with open(os.path.join(self.dir_path, META_FILE), "w", encoding="utf-8") as fh:
+            json.dump({"fields": self.field_keys, "dim": self.dim, "count": self.count}, fh)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class FieldVectorStore:
+    """Read side: memory-mapped field vectors plus an id -> row index."""
+
+    def __init__(self, dir_path: str, field_keys: List[str], fields: np.ndarray, present: np.ndarray, ids: List[str]):
+        self.dir_path = dir_path
+        self.field_keys = field_keys
+        self.fields = fields
+        self.present = present
+        self.ids = ids
+        self.row_of = {uid: i for i, uid in enumerate(ids)}
+
+    @classmethod
+    def open(cls, dir_path: str, mmap: bool = True) -> "FieldVectorStore":
+        with open(os.path.join(dir_path, META_FILE), "r", encoding="utf-8") as fh:
+            meta = json.load(fh)
+        mode = "r" if mmap else None
+        fields = np.load(os.path.join(dir_path, FIELDS_FILE), mmap_mode=mode)
+        present = np.load(os.path.join(dir_path, PRESENT_FILE), mmap_mode=mode)
+        with open(os.path.join(dir_path, IDS_FILE), "r", encoding="utf-8") as fh:
+            ids = [line.rstrip("\n") for line in fh]
+        if not (len(ids) == fields.shape[0] == present.shape[0] == meta["count"]):
+            raise ValueError(f"Field store at {dir_path} is inconsistent (ids/rows/meta disagree).")
+        return cls(dir_path, meta["fields"], fields, present, ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def dim(self) -> int:
+        return self.fields.shape[2]
+
+    def weights_vector(self, weights: Dict[str, float]) -> np.ndarray:
+        """(n_fields,) weights in this store's field order; missing keys get 0."""
+        return np.asarray([weights.get(k, 0.0) for k in self.field_keys], dtype=np.float32)
+
+    def combine(self, weights: np.ndarray, rows: np.ndarray = None) -> np.ndarray:
+        """Weighted user vectors (n, dim) for `rows` (all rows if None)."""
+        if rows is not None:
+            rows = np.asarray(rows, dtype=np.int64)
+            return combine_field_vectors(self.fields[rows], self.present[rows], weights)
+        return np.concatenate(list(self.iter_combined(weights))) if len(self) else np.zeros((0, self.dim), np.float32)
+
+    def default_vectors(self, variables: List[Dict[str, Any]]) -> np.ndarray:
+        """Every user's vector combined with the variables' default weights (what the index holds)."""
+        keys = [v["key"] for v in embedding_fields(variables)]
+        return self.combine(self.weights_vector(dict(zip(keys, field_weights(variables).tolist()))))
+
+    def rescore(self, query: np.ndarray, ids: List[str], weights: np.ndarray):
+        """
+        Cosine scores of `query` against the users in `ids`, combined with `weights`.
+        Returns (ids found in the store, scores); ids not in the store are left out.
+        """
+        found = [uid for uid in ids if uid in self.row_of]
+        if not found:
+            return [], np.zeros(0, dtype=np.float32)
+        vecs = self.combine(weights, [self.row_of[uid] for uid in found])
+        norms = np.linalg.norm(vecs, axis=1) * np.linalg.norm(query)
+        scores = vecs @ query.astype(np.float32)
+        np.divide(scores, norms, out=scores, where=norms > 0)
+        return found, scores
+
+    def iter_combined(self, weights: np.ndarray, block_rows: int = COMBINE_BLOCK_ROWS) -> Iterator[np.ndarray]:
+        """Weighted user vectors block by block, so millions of rows never sit in RAM at once."""
+        for start in range(0, len(self), block_rows):
+            stop = start + block_rows
+            yield combine_field_vectors(self.fields[start:stop], self.present[start:stop], weights)
+
+    def iter_metadata(self) -> Iterator[Dict[str, Any]]:
+        """One metadata dict per row; {} for every row when metadata.ndjson wasn't written."""
+        path = os.path.join(self.dir_path, METADATA_FILE)
+        if not os.path.exists(path):
+            for _ in range(len(self)):
+                yield {}
+            return
+        with open(path, "r", encoding="utf-8") as fh:
+            for line in fh:
+                yield json.loads(line)
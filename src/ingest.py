@@ -0,0 +1,233 @@
+# src/ingest.py
+"""
+Streaming helpers for bulk ingestion (scripts/run_pipeline.py --stream).
+
+- iter_profiles: read a JSON array or NDJSON file one profile at a time
+- chunked:       group any iterable into fixed-size lists
+- BatchUpserter: split vectors into index-sized batches and upsert them on a
+                 thread pool with a bounded number of in-flight requests
+- profile_corpus_texts / write_corpus_file: Word2Vec training corpus built
+                 incrementally from a profile stream
+- append_profile_log / read_profile_log: NDJSON log of newly registered
+                 profiles, consumed by scripts/update_model.py
+"""
+import json
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List
+
+from src.utils import text_to_tokens
+
+READ_BLOCK_SIZE = 1 << 16
+# what may follow an array element
+_ELEMENT_END = " \t\r\n,]"
+
+
+def _iter_json_array(f, block_size: int = READ_BLOCK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Incrementally decode the elements of a top-level JSON array (as strict as json.load)."""
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    state = "start"  # start -> first (value or "]") -> separator ("," or "]") -> value -> separator ...
+    eof = False
+
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n":
+            pos += 1
+
+        if pos < len(buf):
+            ch = buf[pos]
+            if state == "start":
+                if ch != "[":
+                    raise ValueError("Expected a JSON array.")
+                state, pos = "first", pos + 1
+                continue
+            if state == "separator":
+                if ch == "]":
+                    return
+                if ch != ",":
+                    raise ValueError(f"Malformed JSON array: expected ',' or ']', got {ch!r}.")
+                state, pos = "value", pos + 1
+                continue
+            if ch == "]" and state == "first":
+                return
+            if ch in ",]":
+                raise ValueError(f"Malformed JSON array: expected a value, got {ch!r}.")
+
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise ValueError(f"Malformed JSON array: {e}") from None
+            else:
+                # a number cut by the block edge decodes as a shorter one
+                # ("1.5" read as "1" + ".5"): wait until something follows it
+                partial = end == len(buf) or (
+                    buf[end] not in _ELEMENT_END and isinstance(obj, (int, float)) and not isinstance(obj, bool)
+                )
+                if eof or not partial:
+                    yield obj
+                    state, pos = "separator", end
+                    continue
+
+        if eof:
+            raise ValueError("Unexpected end of JSON array.")
+        block = f.read(block_size)
+        if not block:
+            eof = True
+        # keep only the unread tail so memory stays bounded by one element
+        buf = buf[pos:] + block
+        pos = 0
+
+
+def iter_profiles(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yield profiles from `path` without loading the whole file.
+    Accepts a JSON array (like data/mock_users.json) or NDJSON (one profile per line).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        first = ""
+        while True:
+            ch = f.read(1)
+            if not ch or not ch.isspace():
+                first = ch
+                break
+        f.seek(0)
+
+        if first == "[":
+            yield from _iter_json_array(f)
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def profile_corpus_texts(user: Dict[str, Any], variables: List[Dict[str, Any]]) -> Iterator[str]:
+    """The texts of one profile that go into the Word2Vec training corpus."""
+    for v in variables:
+        if v.get("use_for_embedding", True):
+            val = user.get(v["key"])
+            if isinstance(val, list):
+                yield " ".join(str(x) for x in val)
+            elif isinstance(val, str):
+                yield val
+            elif isinstance(val, (int, float)):
+                yield str(val)
+
+
+def write_corpus_file(profiles: Iterable[Dict[str, Any]], path: str, variables: List[Dict[str, Any]]) -> int:
+    """
+    Tokenize profiles into a LineSentence-format corpus file (one sentence per
+    line, space-separated tokens), writing as it goes. Returns the number of lines.
+    Written to <path>.tmp and renamed, so a crash never leaves a half corpus behind.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    n_lines = 0
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for u in profiles:
+            for text in profile_corpus_texts(u, variables):
+                tokens = text_to_tokens(text)
+                if tokens:
+                    f.write(" ".join(tokens))
+                    f.write("\n")
+                    n_lines += 1
+    os.replace(tmp_path, path)
+    return n_lines
+
+
+_LOG_LOCK = threading.Lock()
+
+
+def append_profile_log(path: str, user_id: str, profile: Dict[str, Any]):
+    """Append one registered profile as a single NDJSON line (O_APPEND, so several workers can share the file)."""
+    line = json.dumps({"id": user_id, "profile": profile}, ensure_ascii=False, default=str) + "\n"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with _LOG_LOCK, open(path, "a", encoding="utf-8") as f:
+        f.write(line)
+
+
+def read_profile_log(path: str, offset: int = 0):
+    """
+    Complete records appended after byte `offset`.
+    Returns (records, new_offset); a trailing partial line is left for the next read.
+    """
+    if not os.path.exists(path):
+        return [], offset
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    records = [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+    return records, offset + end
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Group an iterable into lists of at most `size` items."""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class BatchUpserter:
+    """
+    Upsert user vectors in batches of `batch_size` with at most `max_in_flight`
+    concurrent requests; submit() blocks once that limit is reached, so memory
+    never holds more than max_in_flight batches waiting on the network.
+
+    client: an index client module (src/pinecone_client or src/local_index)
+    """
+
+    def __init__(self, client, index, batch_size: int = 100, max_in_flight: int = 4, on_done=None):
+        self.client = client
+        self.index = index
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.on_done = on_done  # called with the batch size after each successful upsert
+        self.upserted = 0
+        self._pending = deque()
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight)
+
+    def _upsert(self, batch):
+        self.client.upsert_users(self.index, batch, verbose=False)
+        return len(batch)
+
+    def _reap_one(self):
+        n = self._pending.popleft().result()  # re-raises upsert errors
+        self.upserted += n
+        if self.on_done is not None:
+            self.on_done(n)
+
+    def submit(self, user_vectors: List[Dict[str, Any]]):
+        for batch in chunked(user_vectors, self.batch_size):
+            while len(self._pending) >= self.max_in_flight:
+                self._reap_one()
+            self._pending.append(self._executor.submit(self._upsert, batch))
+
+    def close(self):
+        """Wait for every in-flight batch."""
+        try:
+            while self._pending:
+                self._reap_one()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            for fut in self._pending:
+                fut.cancel()
+            self._executor.shutdown(wait=True)
+            return False
+        self.close()
+        return False
@@ -0,0 +1,518 @@
+# src/local_index.py
+"""
+In-process vector index with the same contract as src/pinecone_client.py
+(ensure_index_exists / upsert_users / query_similar).
+
+Vectors live in one contiguous float32 matrix (unit-normalised rows) with an
+id <-> row map, so a cosine query is a single matrix-vector product.
+Two search modes:
+- "exact": brute-force cosine over every row
+- "ivf":   inverted file (spherical k-means coarse quantizer); only the
+           `nprobe` closest clusters are scored
+Metadata filters (src/metadata_filter.py) are resolved to row ids through an
+inverted index first, so only the matching rows are scored.
+
+IVF centroids are trained when an index is loaded and retrained on a
+background thread as it grows (upsert never waits for k-means); until the
+first training finishes, ivf-mode queries are exact.
+
+storage="float16" / "int8" / "pq" keeps compressed codes in RAM instead of the
+float32 matrix (src/quantization.py); scores are then approximate unless
+`rerank` > 0, which re-scores that many top candidates against the exact rows.
+"""
+import json
+import os
+import threading
+import numpy as np
+
+from src.metadata_filter import InvertedIndex
+from src.quantization import QuantizedVectors, make_codec
+from src.topk import QUERY_BLOCK_SIZE, block_top_k
+
+LOCAL_INDEX_DIR = os.getenv(
+    "LOCAL_INDEX_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "models", "indexes"),
+)
+LOCAL_INDEX_MODE = os.getenv("LOCAL_INDEX_MODE", "exact")
+LOCAL_INDEX_NPROBE = int(os.getenv("LOCAL_INDEX_NPROBE", 8))
+LOCAL_INDEX_STORAGE = os.getenv("LOCAL_INDEX_STORAGE", "float32")
+LOCAL_INDEX_RERANK = int(os.getenv("LOCAL_INDEX_RERANK", 0))
+LOCAL_INDEX_PQ_M = int(os.getenv("LOCAL_INDEX_PQ_M", 0)) or None
+
+# below this many vectors IVF is pointless, queries stay exact
+IVF_MIN_TRAIN_SIZE = 1024
+
+
+def _normalize_rows(mat: np.ndarray):
+    norms = np.linalg.norm(mat, axis=1)
+    safe = np.where(norms > 0, norms, 1.0)
+    return mat / safe[:, None], norms
+
+
+def _spherical_kmeans(data: np.ndarray, k: int, n_iter: int = 10, seed: int = 42) -> np.ndarray:
+    """Cosine k-means on unit vectors; returns (k, dim) unit centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+    for _ in range(n_iter):
+        assign = np.argmax(data @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, data)
+        counts = np.bincount(assign, minlength=k)
+        empty = counts == 0
+        # re-seed empty clusters with random points
+        if empty.any():
+            sums[empty] = data[rng.choice(len(data), size=int(empty.sum()), replace=False)]
+        centroids, _ = _normalize_rows(sums)
+    return centroids.astype(np.float32)
+
+
+class LocalIndex:
+    """
+    Minimal Pinecone-Index lookalike: upsert(vectors=[...]) and
+    query(vector=..., top_k=...) return the same shapes as the Pinecone client.
+    """
+
+    def __init__(
+        self, dimension: int, mode: str = "exact", nlist: int = None, nprobe: int = 8, name: str = None,
+        storage: str = "float32", rerank: int = 0, pq_m: int = None,
+    ):
+        if mode not in ("exact", "ivf"):
+            raise ValueError(f"Unknown local index mode '{mode}'.")
+        self.name = name
+        self.dimension = dimension
+        self.mode = mode
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.storage = storage
+        self.rerank = rerank
+
+        # unit rows: a float32 matrix, or codes + exact rows on disk (_store)
+        self._store = None
+        if storage == "float32":
+            self._vectors = np.zeros((16, dimension), dtype=np.float32)
+        else:
+            self._store = QuantizedVectors(dimension, make_codec(storage, dimension, pq_m), LOCAL_INDEX_DIR)
+            self._vectors = None
+        self._norms = np.zeros(16, dtype=np.float32)
+        self._count = 0
+        self._ids = []
+        self._id_to_row = {}
+        self._metadata = []
+        self._inverted = InvertedIndex()
+
+        # IVF state
+        self._centroids = None
+        self._assign = np.zeros(16, dtype=np.int32)
+        self._trained_on = 0
+        self._list_order = None
+        self._list_bounds = None
+        self._trainer = None
+        self._dirty = None
+        # writers (and IVF rebuilds) may run on several threads
+        self._lock = threading.RLock()
+
+    # ----------------- storage -----------------
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """View of the stored unit vectors, shape (n, dim) (memory-mapped exact rows for quantized storage)."""
+        if self._store is not None:
+            return self._store.exact_rows(self._count)
+        return self._vectors[: self._count]
+
+    def _unit_rows(self, rows) -> np.ndarray:
+        return self._vectors[rows] if self._store is None else self._store.exact(rows)
+
+    def vector_bytes(self) -> int:
+        """RAM held by the stored vectors (codes + codec tables for quantized storage)."""
+        if self._store is not None:
+            return self._store.nbytes(self._count)
+        return self.vectors.nbytes
+
+    @property
+    def ids(self):
+        return self._ids
+
+    def _grow(self, needed: int):
+        capacity = len(self._norms)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        if self._store is not None:
+            self._store.grow(capacity)
+        else:
+            vectors = np.zeros((capacity, self.dimension), dtype=np.float32)
+            vectors[: self._count] = self._vectors[: self._count]
+            self._vectors = vectors
+        norms = np.zeros(capacity, dtype=np.float32)
+        norms[: self._count] = self._norms[: self._count]
+        assign = np.zeros(capacity, dtype=np.int32)
+        assign[: self._count] = self._assign[: self._count]
+        self._norms, self._assign = norms, assign
+
+    def upsert(self, vectors):
+        """
+        vectors: list of dicts {"id": str, "values": [...], "metadata": {...}}
+        Existing ids are overwritten in place.
+        """
+        if not vectors:
+            return {"upserted_count": 0}
+
+        values = np.asarray([v["values"] for v in vectors], dtype=np.float32)
+        if values.ndim != 2 or values.shape[1] != self.dimension:
+            raise ValueError(f"Vector dimension mismatch: expected {self.dimension}, got {values.shape[-1]}.")
+        unit, norms = _normalize_rows(values)
+
+        with self._lock:
+            return self._upsert_rows(vectors, unit, norms)
+
+    def _upsert_rows(self, vectors, unit, norms):
+        rows = np.empty(len(vectors), dtype=np.int64)
+        for i, v in enumerate(vectors):
+            row = self._id_to_row.get(v["id"])
+            if row is None:
+                row = self._count
+                self._grow(row + 1)
+                self._id_to_row[v["id"]] = row
+                self._ids.append(v["id"])
+                self._metadata.append(v.get("metadata") or {})
+                self._count += 1
+            else:
+                self._inverted.remove(row, self._metadata[row])
+                self._metadata[row] = v.get("metadata") or {}
+            self._inverted.add(row, self._metadata[row])
+            rows[i] = row
+
+        self._set_unit(rows, unit)
+        self._norms[rows] = norms
+        if self._centroids is not None:
+            self._assign[rows] = np.argmax(unit @ self._centroids.T, axis=1)
+            self._list_order = None
+        if self._dirty is not None:
+            self._dirty.update(rows.tolist())
+        self._maybe_start_training()
+        return {"upserted_count": len(vectors)}
+
+    def _set_unit(self, rows: np.ndarray, unit: np.ndarray):
+        if self._store is not None:
+            self._store.set(rows, unit.astype(np.float32, copy=False))
+        else:
+            self._vectors[rows] = unit
+
+    # ----------------- IVF -----------------
+
+    def _needs_training(self) -> bool:
+        n = self._count
+        # train at IVF_MIN_TRAIN_SIZE, retrain once the population has doubled since
+        return self.mode == "ivf" and n >= IVF_MIN_TRAIN_SIZE and (self._centroids is None or n >= 2 * self._trained_on)
+
+    def _maybe_start_training(self):
+        """Call with the lock held after rows were added: trains on a background thread if due."""
+        if self._needs_training() and (self._trainer is None or not self._trainer.is_alive()):
+            self._trainer = threading.Thread(target=self.train_ivf, name=f"ivf-train-{self.name}", daemon=True)
+            self._trainer.start()
+
+    def train_ivf(self):
+        """
+        (Re)train the IVF coarse quantizer. k-means runs on a snapshot of the
+        rows without holding the lock, so queries (exact until the first
+        centroids exist) and upserts carry on meanwhile; only installing the
+        centroids and assigning the rows written during training locks.
+        """
+        with self._lock:
+            n = self._count
+            if n < IVF_MIN_TRAIN_SIZE:
+                return
+            data = self.vectors  # a view: rows below n only change in place, and those get re-assigned
+            self._dirty = set()  # rows overwritten while training
+        data = np.asarray(data)
+        k = self.nlist or max(1, int(np.sqrt(n)))
+        centroids = _spherical_kmeans(data, min(k, n))
+        assign = np.argmax(data @ centroids.T, axis=1)
+        with self._lock:
+            late = np.union1d(np.fromiter(self._dirty, dtype=np.int64), np.arange(n, self._count))
+            self._dirty = None
+            self._assign[:n] = assign
+            if len(late):
+                self._assign[late] = np.argmax(self._unit_rows(late) @ centroids.T, axis=1)
+            self._centroids = centroids
+            self._trained_on = n
+            self._list_order = None
+
+    def _ivf_ready(self) -> bool:
+        """Centroids exist (building the inverted lists if stale); until then queries are exact."""
+        if self._centroids is None:
+            return False
+        if self._list_order is None:
+            assign = self._assign[: self._count]
+            self._list_order = np.argsort(assign, kind="stable")
+            self._list_bounds = np.searchsorted(
+                assign[self._list_order], np.arange(len(self._centroids) + 1)
+            )
+        return True
+
+    def _ivf_candidates(self, q: np.ndarray) -> np.ndarray:
+        nprobe = min(self.nprobe, len(self._centroids))
+        probe = np.argpartition(-(self._centroids @ q), nprobe - 1)[:nprobe]
+        bounds = self._list_bounds
+        return np.concatenate([self._list_order[bounds[c]: bounds[c + 1]] for c in probe])
+
+    # ----------------- search -----------------
+
+    def _scores(self, Q: np.ndarray, rows: np.ndarray = None) -> np.ndarray:
+        """(b, m) scores of unit queries against `rows` (all rows if None); approximate for quantized storage."""
+        if self._store is not None:
+            return self._store.scores(Q, self._count, rows)
+        mat = self.vectors if rows is None else self._vectors[rows]
+        return Q @ mat.T
+
+    def _select(self, Q: np.ndarray, scores: np.ndarray, rows: np.ndarray, k: int):
+        """
+        Best k (rows, scores) per query from a (b, m) score block over `rows`
+        (all rows if None), best first. With quantized storage and rerank > 0
+        the top `rerank` candidates are re-scored against the exact vectors.
+        """
+        exact = self._store is not None and self.rerank > 0
+        shortlist = min(max(k, self.rerank), scores.shape[1]) if exact else k
+        best, best_scores = block_top_k(np.arange(scores.shape[1]) if rows is None else rows, scores, shortlist)
+        if exact:
+            candidates = self._store.exact(best.ravel()).reshape(best.shape + (self.dimension,))
+            best_scores = np.einsum("bsd,bd->bs", candidates, Q)
+            if shortlist > k:
+                best, best_scores = block_top_k(best, best_scores, k)
+        order = np.argsort(-best_scores, axis=1)
+        return np.take_along_axis(best, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+    def _top_rows(self, q: np.ndarray, top_k: int, rows: np.ndarray = None):
+        """Return (rows, scores) of the best `top_k` among `rows` (all rows if None)."""
+        k = min(top_k, self._count if rows is None else len(rows))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        Q = q[None, :]
+        picked, scores = self._select(Q, self._scores(Q, rows), rows, k)
+        return picked[0], scores[0]
+
+    def filter_rows(self, filter: dict) -> np.ndarray:
+        """Sorted row ids whose metadata matches a Pinecone-style filter."""
+        with self._lock:
+            return self._inverted.evaluate(filter, self._count)
+
+    def query(
+        self, vector, top_k: int = 5, include_values: bool = False, include_metadata: bool = True,
+        filter: dict = None, **kwargs,
+    ):
+        q = np.asarray(vector, dtype=np.float32).reshape(-1)
+        if q.shape[0] != self.dimension:
+            raise ValueError(f"Query dimension mismatch: expected {self.dimension}, got {q.shape[0]}.")
+        q_norm = np.linalg.norm(q)
+        if q_norm == 0 or self._count == 0:
+            return {"matches": []}
+        q = q / q_norm
+
+        with self._lock:
+            rows = None if filter is None else self._inverted.evaluate(filter, self._count)
+            if self.mode == "ivf" and self._ivf_ready():
+                candidates = self._ivf_candidates(q)
+                if rows is None:
+                    rows = candidates
+                elif len(rows) > len(candidates):
+                    # broad filter: keep the probed clusters' rows that pass it;
+                    # a selective one is cheaper to score exactly
+                    rows = np.intersect1d(candidates, rows)
+            picked, scores = self._top_rows(q, top_k, rows)
+            return {"matches": [self._match(r, s, include_values, include_metadata) for r, s in zip(picked, scores)]}
+
+    def query_batch(
+        self, vectors, top_k: int = 5, include_values: bool = False, include_metadata: bool = True, filter: dict = None,
+    ):
+        """
+        Query many vectors at once; returns one Pinecone-shaped result per row.
+        Exact mode scores a whole block of queries with a single matrix multiply
+        (against only the filtered rows when `filter` is given).
+        """
+        Q = np.asarray(vectors, dtype=np.float32)
+        if Q.ndim != 2 or Q.shape[1] != self.dimension:
+            raise ValueError(f"Query dimension mismatch: expected (n, {self.dimension}), got {Q.shape}.")
+        if self.mode == "ivf":
+            return [self.query(q, top_k, include_values, include_metadata, filter=filter) for q in Q]
+
+        Q, q_norms = _normalize_rows(Q)
+        results = [{"matches": []} for _ in range(len(Q))]
+        with self._lock:
+            rows = None if filter is None else self._inverted.evaluate(filter, self._count)
+            # float32: gather the filtered rows once, not per block
+            mat = None
+            if self._store is None:
+                mat = self.vectors if rows is None else self._vectors[rows]
+            k = min(top_k, self._count if rows is None else len(rows))
+            if k <= 0:
+                return results
+            for start in range(0, len(Q), QUERY_BLOCK_SIZE):
+                Qb = Q[start: start + QUERY_BLOCK_SIZE]
+                scores = Qb @ mat.T if mat is not None else self._scores(Qb, rows)
+                best, best_scores = self._select(Qb, scores, rows, k)
+                for i in range(len(best)):
+                    if q_norms[start + i] == 0:
+                        continue  # zero query: no meaningful matches, same as query()
+                    results[start + i] = {"matches": [
+                        self._match(r, sc, include_values, include_metadata) for r, sc in zip(best[i], best_scores[i])
+                    ]}
+        return results
+
+    def _match(self, row, score, include_values, include_metadata):
+        match = {"id": self._ids[row], "score": float(score)}
+        if include_values:
+            match["values"] = (self._unit_rows(row) * self._norms[row]).tolist()
+        if include_metadata:
+            match["metadata"] = self._metadata[row]
+        return match
+
+    def fetch(self, ids):
+        """Pinecone-shaped {"vectors": {id: {"id", "values", "metadata"}}}; unknown ids are left out."""
+        with self._lock:
+            vectors = {}
+            for uid in ids:
+                row = self._id_to_row.get(uid)
+                if row is not None:
+                    vectors[uid] = {
+                        "id": uid,
+                        "values": (self._unit_rows(row) * self._norms[row]).tolist(),
+                        "metadata": self._metadata[row],
+                    }
+            return {"vectors": vectors}
+
+    def describe_index_stats(self):
+        return {"dimension": self.dimension, "total_vector_count": self._count}
+
+    # ----------------- persistence -----------------
+
+    def save(self, path: str):
+        """Write vectors to <path>.npz and ids/metadata to <path>.json."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._lock:
+            np.savez(path + ".npz", vectors=self.vectors, norms=self._norms[: self._count])
+            with open(path + ".json", "w", encoding="utf-8") as f:
+                json.dump({"dimension": self.dimension, "ids": self._ids, "metadata": self._metadata}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str, **kwargs):
+        with open(path + ".json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = np.load(path + ".npz")
+        return cls.from_arrays(meta["ids"], arrays["vectors"], arrays["norms"], meta["metadata"], meta["dimension"], **kwargs)
+
+    @classmethod
+    def from_arrays(cls, ids, unit, norms, metadata, dimension: int = None, **kwargs):
+        """Bulk-build an index from unit rows + their norms (no per-record dicts)."""
+        index = cls(dimension or unit.shape[1], **kwargs)
+        n = len(ids)
+        index._grow(n)
+        if n:
+            index._set_unit(np.arange(n), unit)
+        index._norms[:n] = norms
+        index._ids = list(ids)
+        index._metadata = list(metadata)
+        index._id_to_row = {uid: i for i, uid in enumerate(index._ids)}
+        index._count = n
+        for row, md in enumerate(index._metadata):
+            index._inverted.add(row, md)
+        if index._needs_training():
+            index.train_ivf()  # at load time, before any query sees the index
+        return index
+
+
+# ----------------- pinecone_client-compatible API -----------------
+
+_INDEXES = {}
+
+
+def index_path(index_name: str) -> str:
+    return os.path.join(LOCAL_INDEX_DIR, index_name)
+
+
+def ensure_index_exists(api_key: str, index_name: str, vector_dim: int, region: str, pool_threads: int = 1):
+    """
+    Same signature as pinecone_client.ensure_index_exists; api_key/region/pool_threads are ignored.
+    Reuses the in-process index of that name, or loads it from LOCAL_INDEX_DIR if saved.
+    """
+    index = _INDEXES.get(index_name)
+    if index is not None:
+        return index
+
+    path = index_path(index_name)
+    kwargs = {
+        "mode": LOCAL_INDEX_MODE, "nprobe": LOCAL_INDEX_NPROBE, "name": index_name,
+        "storage": LOCAL_INDEX_STORAGE, "rerank": LOCAL_INDEX_RERANK, "pq_m": LOCAL_INDEX_PQ_M,
+    }
+    if os.path.exists(path + ".npz"):
+        index = LocalIndex.load(path, **kwargs)
+        if index.dimension != vector_dim:
+            raise ValueError(f"Local index '{index_name}' has dimension {index.dimension}, expected {vector_dim}.")
+        print(f"Local index '{index_name}' loaded ({len(index)} vectors).")
+    else:
+        print(f"🔹 Creating local index '{index_name}'...")
+        index = LocalIndex(vector_dim, **kwargs)
+
+    _INDEXES[index_name] = index
+    return index
+
+
+def persist_index(index: LocalIndex):
+    """Save a local index under LOCAL_INDEX_DIR so the API can load it on start-up."""
+    index.save(index_path(index.name))
+
+
+def upsert_users(index, user_vectors, verbose=True):
+    """
+    user_vectors: list of dicts { "id": "user_001", "vector": [...], "metadata": {...} }
+    verbose: print a line per call (turned off for batched bulk loads)
+    """
+    vectors_to_upsert = [
+        {"id": u["id"], "values": u["vector"], "metadata": u.get("metadata", {})}
+        for u in user_vectors
+    ]
+
+    index.upsert(vectors=vectors_to_upsert)
+    if verbose:
+        print(f"✅ Upserted {len(vectors_to_upsert)} vectors to local index.")
+
+
+def iter_records(index, batch_size=100):
+    """Yield every stored record as lists of {"id", "metadata"}, in row order."""
+    with index._lock:
+        ids = list(index.ids)
+    for start in range(0, len(ids), batch_size):
+        res = index.fetch(ids[start: start + batch_size])["vectors"]
+        yield [{"id": uid, "metadata": v["metadata"]} for uid, v in res.items()]
+
+
+def fetch_vectors(index, ids):
+    """{id: vector} for the ids that exist in the index."""
+    res = index.fetch(ids)
+    return {uid: np.asarray(v["values"], dtype=np.float32) for uid, v in res["vectors"].items()}
+
+
+def query_similar_batch(index, query_vectors, top_k=5, filter=None):
+    """
+    One result per row of `query_vectors` (n, dim), scored with a single
+    matrix multiply per block instead of n separate queries.
+    """
+    return index.query_batch(query_vectors, top_k=top_k, include_values=False, include_metadata=True, filter=filter)
+
+
+def query_similar(index, query_vector, top_k=5, filter=None):
+    """
+    Returns results shaped like a Pinecone query response.
+    filter: Pinecone-style metadata filter (see src/metadata_filter.py), or None
+    """
+    return index.query(
+        vector=query_vector,
+        top_k=top_k,
+        include_values=False,
+        include_metadata=True,
+        filter=filter,
+    )
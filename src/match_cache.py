@@ -0,0 +1,116 @@
+# src/match_cache.py
+"""
+Cache for /match-users results.
+
+Key:   sha256 over the canonical JSON of the embedding-relevant profile fields
+       (config.variables.VARIABLES), top_k and the model version (+ any extra
+       query options), so the same profile on a page refresh is a hit.
+Evict: LRU, per-entry TTL and a total memory cap.
+Writes: record_write() is called on every upsert. An entry created before a
+       write is served for at most `max_staleness` seconds after that write, so a
+       freshly registered user is never hidden for longer than that bound.
+"""
+import bisect
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+
+def cache_key(profile: Dict[str, Any], variables: List[Dict[str, Any]], top_k: int, model_version: str, extra=None) -> str:
+    fields = {
+        v["key"]: profile.get(v["key"])
+        for v in variables
+        if v.get("use_for_embedding", True) and profile.get(v["key"]) is not None
+    }
+    canonical = json.dumps(
+        {"fields": fields, "top_k": top_k, "model": model_version, "extra": extra},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class MatchCache:
+    def __init__(self, maxsize: int = 10000, max_bytes: int = 64 * 1024 * 1024, ttl: float = 60.0, max_staleness: float = 1.0):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_staleness = max_staleness
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self._data = OrderedDict()  # key -> (created_at, size, value)
+        self._writes = []  # monotonic times of recent upserts, ascending
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def _drop(self, key):
+        _, size, _ = self._data.pop(key)
+        self.bytes -= size
+
+    def _is_stale(self, created_at: float, now: float) -> bool:
+        if now - created_at >= self.ttl:
+            return True
+        # first write after this entry was cached
+        i = bisect.bisect_right(self._writes, created_at)
+        return i < len(self._writes) and now - self._writes[i] >= self.max_staleness
+
+    def get(self, key: str):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or self._is_stale(entry[0], now):
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key: str, value: Any):
+        if self.maxsize <= 0:
+            return
+        size = len(json.dumps(value, default=str))  # rough footprint of the cached result
+        if size > self.max_bytes:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (now, size, value)
+            self.bytes += size
+            while len(self._data) > self.maxsize or self.bytes > self.max_bytes:
+                self._drop(next(iter(self._data)))
+
+    def record_write(self):
+        """Call after every upsert; older entries go stale `max_staleness` seconds later."""
+        now = time.monotonic()
+        with self._lock:
+            self._writes.append(now)
+            # writes older than the TTL can't affect any live entry
+            cutoff = bisect.bisect_left(self._writes, now - self.ttl)
+            if cutoff:
+                del self._writes[:cutoff]
+            if self.max_staleness <= 0:
+                self._data.clear()
+                self.bytes = 0
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._data),
+            "bytes": self.bytes,
+            "maxsize": self.maxsize,
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,172 @@
+# src/metadata_filter.py
+"""
+Metadata filters for the match endpoints, in Pinecone's filter syntax so the
+same expression goes to Pinecone unchanged:
+
+    {"location": "Delhi India"}                                   # shorthand for $eq
+    {"languages_spoken": {"$in": ["Hindi", "English"]}}
+    {"$and": [{"needs": {"$eq": "Mentor"}}, {"offers": {"$nin": ["Funding"]}}]}
+
+Operators: $eq, $ne, $in, $nin, $and, $or. On list fields (needs, offers, ...)
+$eq/$in match if any element matches, $ne/$nin if none does; a user without
+the field matches $ne/$nin.
+
+The local index evaluates filters with an InvertedIndex: (field, value) ->
+sorted array of row ids, so a selective filter is a few array intersections
+and only the surviving rows are scored.
+"""
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+from config.variables import FILTERABLE_FIELDS
+
+FIELD_OPERATORS = ("$eq", "$ne", "$in", "$nin")
+LOGICAL_OPERATORS = ("$and", "$or")
+
+
+def _values(val: Any) -> List[str]:
+    """Metadata value -> the strings it is indexed under."""
+    if val is None:
+        return []
+    if isinstance(val, (list, tuple, set)):
+        return [str(x) for x in val if x is not None]
+    return [str(val)]
+
+
+def _is_scalar(val: Any) -> bool:
+    """What Pinecone accepts for $eq/$ne (and the shorthand): a string, number or boolean."""
+    return isinstance(val, (str, int, float, bool))
+
+
+def validate_filter(expr: Dict[str, Any], fields: Iterable[str] = FILTERABLE_FIELDS) -> Dict[str, Any]:
+    """
+    Check a filter expression and return it unchanged.
+    Raises ValueError on unknown fields/operators or malformed operands.
+    """
+    fields = set(fields)
+    if not isinstance(expr, dict) or not expr:
+        raise ValueError("A filter must be a non-empty object.")
+    for key, cond in expr.items():
+        if key in LOGICAL_OPERATORS:
+            if not isinstance(cond, list) or not cond:
+                raise ValueError(f"{key} takes a non-empty list of filters.")
+            for sub in cond:
+                validate_filter(sub, fields)
+            continue
+        if key.startswith("$"):
+            raise ValueError(f"Unknown filter operator '{key}'.")
+        if key not in fields:
+            raise ValueError(f"Field '{key}' is not filterable (allowed: {sorted(fields)}).")
+        if not isinstance(cond, dict):
+            # shorthand for $eq: {"field": value}
+            if not _is_scalar(cond):
+                raise ValueError(f"'{key}' takes a single string, number or boolean (use $in for several values).")
+            continue
+        if not cond:
+            raise ValueError(f"Empty condition for '{key}'.")
+        for op, operand in cond.items():
+            if op not in FIELD_OPERATORS:
+                raise ValueError(f"Unknown operator '{op}' for '{key}'.")
+            if op in ("$in", "$nin") and not isinstance(operand, list):
+                raise ValueError(f"{op} on '{key}' takes a list.")
+            if op in ("$eq", "$ne") and not _is_scalar(operand):
+                raise ValueError(f"{op} on '{key}' takes a single string, number or boolean.")
+    return expr
+
+
+def matches_filter(metadata: Dict[str, Any], expr: Dict[str, Any]) -> bool:
+    """Evaluate a filter against one metadata dict (reference semantics for InvertedIndex)."""
+    for key, cond in expr.items():
+        if key == "$and":
+            ok = all(matches_filter(metadata, sub) for sub in cond)
+        elif key == "$or":
+            ok = any(matches_filter(metadata, sub) for sub in cond)
+        else:
+            have = set(_values(metadata.get(key)))
+            cond = cond if isinstance(cond, dict) else {"$eq": cond}
+            ok = True
+            for op, operand in cond.items():
+                wanted = set(_values(operand))
+                hit = bool(have & wanted)
+                ok = ok and (hit if op in ("$eq", "$in") else not hit)
+        if not ok:
+            return False
+    return True
+
+
+class InvertedIndex:
+    """
+    (field, value) -> row ids, for the local vector index.
+
+    Postings are kept as Python sets while rows are written and turned into
+    sorted int64 arrays lazily on the first query after a change.
+    """
+
+    def __init__(self, fields: Iterable[str] = FILTERABLE_FIELDS):
+        self.fields = list(fields)
+        self._postings: Dict[str, Dict[str, set]] = {f: {} for f in self.fields}
+        self._arrays: Dict[str, Dict[str, np.ndarray]] = {f: {} for f in self.fields}
+
+    def add(self, row: int, metadata: Dict[str, Any]):
+        for field in self.fields:
+            postings = self._postings[field]
+            for value in _values((metadata or {}).get(field)):
+                postings.setdefault(value, set()).add(row)
+                self._arrays[field].pop(value, None)
+
+    def remove(self, row: int, metadata: Dict[str, Any]):
+        """Un-index a row; `metadata` is what it was added with."""
+        for field in self.fields:
+            postings = self._postings[field]
+            for value in _values((metadata or {}).get(field)):
+                rows = postings.get(value)
+                if rows is not None:
+                    rows.discard(row)
+                    if not rows:
+                        del postings[value]
+                self._arrays[field].pop(value, None)
+
+    def rows(self, field: str, value: Any) -> np.ndarray:
+        """Sorted row ids whose `field` is (or contains) `value`."""
+        value = str(value)
+        cached = self._arrays[field].get(value)
+        if cached is None:
+            cached = np.fromiter(sorted(self._postings[field].get(value, ())), dtype=np.int64)
+            self._arrays[field][value] = cached
+        return cached
+
+    def _any_of(self, field: str, values: List[Any]) -> np.ndarray:
+        arrays = [self.rows(field, v) for v in values]
+        if not arrays:
+            return np.empty(0, dtype=np.int64)
+        return arrays[0] if len(arrays) == 1 else np.unique(np.concatenate(arrays))
+
+    def evaluate(self, expr: Dict[str, Any], n_rows: int) -> np.ndarray:
+        """Sorted row ids (< n_rows) matching the filter; conditions are ANDed like Pinecone."""
+        result = None
+        for key, cond in expr.items():
+            if key == "$and":
+                rows = None
+                for sub in cond:
+                    sub_rows = self.evaluate(sub, n_rows)
+                    rows = sub_rows if rows is None else np.intersect1d(rows, sub_rows, assume_unique=True)
+            elif key == "$or":
+                rows = np.unique(np.concatenate([self.evaluate(sub, n_rows) for sub in cond]))
+            else:
+                rows = self._field_rows(key, cond if isinstance(cond, dict) else {"$eq": cond}, n_rows)
+            result = rows if result is None else np.intersect1d(result, rows, assume_unique=True)
+            if not len(result):
+                break
+        return result
+
+    def _field_rows(self, field: str, cond: Dict[str, Any], n_rows: int) -> np.ndarray:
+        rows = None
+        for op, operand in cond.items():
+            if op in ("$eq", "$in"):
+                op_rows = self._any_of(field, operand if op == "$in" else [operand])
+            else:  # $ne / $nin: everything except the rows holding any of the values
+                excluded = self._any_of(field, operand if op == "$nin" else [operand])
+                op_rows = np.setdiff1d(np.arange(n_rows, dtype=np.int64), excluded, assume_unique=True)
+            rows = op_rows if rows is None else np.intersect1d(rows, op_rows, assume_unique=True)
+        return rows
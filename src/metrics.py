@@ -0,0 +1,205 @@
+# src/metrics.py
+"""
+Minimal in-process metrics, exposed by the API at /metrics in the Prometheus
+text format.
+
+    MATCH_LATENCY = histogram("match_latency_seconds", "...", ["weights"])
+    with MATCH_LATENCY.time(weights="custom"):
+        ...
+    ERRORS = counter("errors_total", "...", ["kind"])
+    ERRORS.inc(kind="index")
+
+Updates are a lock + a couple of list/dict operations (~1 us), cheap enough to
+leave on in production. Values that already live elsewhere (cache hit counts,
+pool depth) are read only at scrape time via set_function().
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple, Union
+
+# seconds; covers a cache hit (~0.1 ms) up to a slow remote query
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        try:
+            if len(labels) == len(self.labelnames):
+                return tuple([str(labels[n]) for n in self.labelnames])
+        except KeyError:
+            pass
+        raise ValueError(f"{self.name} expects labels {self.labelnames}, got {sorted(labels)}.")
+
+
+class _Value(_Metric):
+    """One float per label combination; optionally computed at scrape time by set_function()."""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._fn = None
+
+    def set_function(self, fn: Callable[[], Union[float, Dict[Tuple[str, ...], float]]]):
+        """fn() -> a number (no labels) or {label values tuple: number}; called on every render."""
+        self._fn = fn
+
+    def _add(self, amount: float, labels: Dict[str, str]):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def snapshot(self) -> Dict[Tuple[str, ...], float]:
+        if self._fn is not None:
+            values = self._fn()
+            return values if isinstance(values, dict) else {(): values}
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for key, value in sorted(self.snapshot().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Counter(_Value):
+    """Monotonic count; by Prometheus convention the name ends in _total."""
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("Counters only go up.")
+        self._add(amount, labels)
+
+
+class Gauge(_Value):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        self._add(amount, labels)
+
+    def dec(self, amount: float = 1, **labels):
+        self._add(-amount, labels)
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram with optional labels (one series per label combination)."""
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List] = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            series[i] += 1
+            series[-1] += value
+
+    def time(self, **labels) -> "_Timer":
+        """with hist.time(**labels): ... observes the block's duration, even if it raises."""
+        return _Timer(self, labels)
+
+    def snapshot(self) -> Dict[Tuple[str, ...], dict]:
+        """{labels: {"count", "sum", "buckets": [(le, cumulative count), ...]}}"""
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        out = {}
+        for key, counts in series.items():
+            cumulative, running = [], 0
+            for le, c in zip(self.buckets + (float("inf"),), counts[:-1]):
+                running += c
+                cumulative.append((le, running))
+            out[key] = {"count": running, "sum": counts[-1], "buckets": cumulative}
+        return out
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for key, s in sorted(self.snapshot().items()):
+            for le, count in s["buckets"]:
+                le_label = 'le="+Inf"' if le == float("inf") else f'le="{le}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le_label)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {s['sum']}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {s['count']}")
+        return lines
+
+
+class _Timer:
+    # a plain class: cheaper than a @contextmanager generator on every request stage
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered.")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def histogram(name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    """Create a Histogram and register it on the default REGISTRY."""
+    return REGISTRY.register(Histogram(name, help, labelnames, buckets))
+
+
+def counter(name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, help, labelnames))
+
+
+def gauge(name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, help, labelnames))
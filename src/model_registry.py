@@ -0,0 +1,115 @@
+# src/model_registry.py
+"""
+Versioned Word2Vec models, published atomically to running API workers.
+
+Layout under MODEL_VERSIONS_DIR:
+    <version>/w2v.model       full model (what the next incremental update starts from)
+    <version>/inference/      vocab.txt + vectors.npy served by InferenceEmbedder
+and a pointer file (MODEL_POINTER) naming the current version:
+    {"version": "...", "model_path": "...", "inference_dir": "...", "published_at": "..."}
+
+publish_model() writes the new version's files first and then swaps the pointer
+with os.replace, so a reader sees either the old or the new version, never a
+half-written one. API workers poll the pointer (read_pointer) and hot-swap
+their embedder when the version changes.
+
+Blue/green index migration (scripts/migrate_index.py) adds an alias file,
+ACTIVE_INDEX_POINTER, that pins the index and the model serving it:
+    {"index": "...", "model": {model record}, "next": {"index": ..., "model": ...} | null}
+While "next" is set the API dual-writes registrations to both indexes; the
+switch is one write_pointer of the alias. When the alias exists the API
+follows it instead of MODEL_POINTER, so a new model never queries vectors
+from the old embedding space.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+from datetime import datetime, timezone
+from typing import Optional
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), "..", "models")
+MODEL_VERSIONS_DIR = os.getenv("MODEL_VERSIONS_DIR", os.path.join(MODELS_DIR, "w2v_versions"))
+MODEL_POINTER = os.getenv("MODEL_POINTER", os.path.join(MODELS_DIR, "w2v_current.json"))
+ACTIVE_INDEX_POINTER = os.getenv("ACTIVE_INDEX_POINTER", os.path.join(MODELS_DIR, "active_index.json"))
+
+MODEL_FILE = "w2v.model"
+INFERENCE_DIR = "inference"
+
+
+def new_version() -> str:
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+
+
+def read_pointer(pointer_path: str = MODEL_POINTER) -> Optional[dict]:
+    """The current version record, or None if nothing was published yet."""
+    try:
+        with open(pointer_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_pointer(record: dict, pointer_path: str = MODEL_POINTER):
+    tmp_path = f"{pointer_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(record, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, pointer_path)
+
+
+def publish_model(embedder, versions_dir: str = MODEL_VERSIONS_DIR, pointer_path: str = MODEL_POINTER, keep: int = 3) -> dict:
+    """
+    Save a W2VEmbedder as a new version and make it current. Keeps the newest
+    `keep` versions (workers still mapping an older one keep their open files).
+    """
+    version = new_version()
+    version_dir = os.path.join(versions_dir, version)
+    tmp_dir = version_dir + ".tmp"
+    os.makedirs(tmp_dir)
+    embedder.save(os.path.join(tmp_dir, MODEL_FILE))
+    embedder.export_inference(os.path.join(tmp_dir, INFERENCE_DIR))
+    os.rename(tmp_dir, version_dir)
+
+    record = {
+        "version": version,
+        "model_path": os.path.abspath(os.path.join(version_dir, MODEL_FILE)),
+        "inference_dir": os.path.abspath(os.path.join(version_dir, INFERENCE_DIR)),
+        "vocab_size": len(embedder.key_to_index),
+        "published_at": datetime.now(timezone.utc).isoformat(),
+    }
+    write_pointer(record, pointer_path)
+
+    versions = sorted(d for d in os.listdir(versions_dir) if not d.endswith(".tmp"))
+    for old in versions[:-keep] if keep > 0 else []:
+        shutil.rmtree(os.path.join(versions_dir, old), ignore_errors=True)
+    return record
+
+
+def load_published_embedder(record: dict):
+    """InferenceEmbedder for a pointer record, versioned by the record (not file mtimes)."""
+    from src.embeddings import InferenceEmbedder
+
+    embedder = InferenceEmbedder.load(record["inference_dir"])
+    embedder.version = record["version"]
+    return embedder
+
+
+def files_model_record(inference_dir: str) -> dict:
+    """Model record for the unversioned export written by run_pipeline.py."""
+    from src.embeddings import INFERENCE_VECTORS_FILE, file_version
+
+    return {
+        "version": file_version(os.path.join(inference_dir, INFERENCE_VECTORS_FILE)),
+        "inference_dir": os.path.abspath(inference_dir),
+    }
+
+
+def versioned_index_name(base: str, model_version: str) -> str:
+    """Index name tagged with a model version; Pinecone allows lowercase letters, digits and '-' (max 45)."""
+    slug = re.sub(r"[^a-z0-9]+", "-", model_version.lower()).strip("-")
+    if len(base) + 1 + len(slug) > 45:
+        slug = hashlib.sha1(model_version.encode("utf-8")).hexdigest()[:12]
+    return f"{base}-{slug}"
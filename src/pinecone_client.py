@@ -1,9 +1,12 @@
 import os
+import numpy as np
 from pinecone import Pinecone, ServerlessSpec
 
-def ensure_index_exists(api_key: str, index_name: str, vector_dim: int, region: str):
+def ensure_index_exists(api_key: str, index_name: str, vector_dim: int, region: str, pool_threads: int = 1):
     """
     Ensure Pinecone index exists (Pinecone v3 compatible).
+    pool_threads: size of the client's HTTP connection / thread pool
+                  (raise it when the index is called from many threads)
     """
     pc = Pinecone(api_key=api_key)
 
@@ -26,13 +29,14 @@ def ensure_index_exists(api_key: str, index_name: str, vector_dim: int, region:
         print(f"Index '{index_name}' already exists.")
 
     # Connect to index
-    index = pc.Index(index_name)
+    index = pc.Index(index_name, pool_threads=pool_threads)
     return index
 
 
-def upsert_users(index, user_vectors):
+def upsert_users(index, user_vectors, verbose=True):
     """
     user_vectors: list of dicts { "id": "user_001", "vector": [...], "metadata": {...} }
+    verbose: print a line per call (turned off for batched bulk loads)
     """
     vectors_to_upsert = [
         {"id": u["id"], "values": u["vector"], "metadata": u.get("metadata", {})}
@@ -40,17 +44,38 @@ def upsert_users(index, user_vectors):
     ]
 
     index.upsert(vectors=vectors_to_upsert)
-    print(f"✅ Upserted {len(vectors_to_upsert)} vectors to Pinecone.")
+    if verbose:
+        print(f"✅ Upserted {len(vectors_to_upsert)} vectors to Pinecone.")
 
 
-def query_similar(index, query_vector, top_k=5):
+def query_similar(index, query_vector, top_k=5, filter=None):
     """
     Returns Pinecone query results.
+    filter: Pinecone metadata filter, e.g. {"location": {"$eq": "Delhi India"}}
     """
+    kwargs = {"filter": filter} if filter else {}
     res = index.query(
         vector=query_vector.tolist(),
         top_k=top_k,
         include_values=False,
-        include_metadata=True
+        include_metadata=True,
+        **kwargs
     )
     return res
+
+
+def iter_records(index, batch_size=100):
+    """
+    Yield every stored record as lists of {"id", "metadata"} (serverless list + fetch).
+    """
+    for ids in index.list(limit=batch_size):
+        res = index.fetch(ids=list(ids))
+        yield [{"id": uid, "metadata": dict(v.metadata or {})} for uid, v in res.vectors.items()]
+
+
+def fetch_vectors(index, ids):
+    """
+    {id: vector} for the ids that exist in the index.
+    """
+    res = index.fetch(ids=list(ids))
+    return {uid: np.asarray(v.values, dtype=np.float32) for uid, v in res.vectors.items()}
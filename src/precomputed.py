@@ -0,0 +1,110 @@
+# src/precomputed.py
+"""
+Precomputed top-k matches for every stored user (scripts/precompute_matches.py),
+served by GET /users/{user_id}/matches.
+
+On disk (one directory, swapped in whole when a run finishes):
+    neighbors.npy         (N, k) int32 row numbers of each user's matches, -1 = none
+    scores.npy            (N, k) cosine scores, best first: float32, or float16 (storage="float16")
+    ids.txt               one user id per line, row order
+    metadata.ndjson       index metadata per row
+    metadata_offsets.npy  (N + 1,) int64 byte offsets into metadata.ndjson
+    meta.json             k, count, source, storage, created_at
+
+Reads are O(1): id -> row via a dict, then one row of each memory-mapped array
+and one positioned read of the metadata file. float16 scores halve the
+score table (6 instead of 8 bytes per stored match); they're good to about 3
+decimals, and the order of a user's matches is the one computed in float32.
+"""
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+NEIGHBORS_FILE = "neighbors.npy"
+SCORES_FILE = "scores.npy"
+IDS_FILE = "ids.txt"
+METADATA_FILE = "metadata.ndjson"
+OFFSETS_FILE = "metadata_offsets.npy"
+META_FILE = "meta.json"
+# dtypes scores.npy can be written in
+SCORE_STORAGE = {"float32": np.float32, "float16": np.float16}
+
+def write_ids_and_metadata(dir_path: str, ids: List[str], metadata):
+    """ids.txt + metadata.ndjson with a byte-offset table for O(1) row reads."""
+    offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+    with open(os.path.join(dir_path, IDS_FILE), "w", encoding="utf-8") as f:
+        for uid in ids:
+            f.write(f"{uid}\n")
+    with open(os.path.join(dir_path, METADATA_FILE), "wb") as f:
+        for i, md in enumerate(metadata):
+            f.write(json.dumps(md or {}, ensure_ascii=False, default=str).encode("utf-8") + b"\n")
+            offsets[i + 1] = f.tell()
+    np.save(os.path.join(dir_path, OFFSETS_FILE), offsets)
+
+
+def publish(tmp_dir: str, dir_path: str):
+    """Swap a finished output directory into place (readers reopen on their next start/reload)."""
+    old = dir_path + ".old"
+    if os.path.exists(old):
+        shutil.rmtree(old)
+    if os.path.exists(dir_path):
+        os.rename(dir_path, old)
+    os.rename(tmp_dir, dir_path)
+    if os.path.exists(old):
+        shutil.rmtree(old)
+
+
+class PrecomputedMatches:
+    def __init__(self, dir_path: str, meta: dict, neighbors: np.ndarray, scores: np.ndarray,
+                 ids: List[str], offsets: np.ndarray):
+        self.dir_path = dir_path
+        self.meta = meta
+        self.k = meta["k"]
+        self.neighbors = neighbors
+        self.scores = scores
+        self.ids = ids
+        self.row_of = {uid: i for i, uid in enumerate(ids)}
+        self.offsets = offsets
+        self._metadata_fd = os.open(os.path.join(dir_path, METADATA_FILE), os.O_RDONLY)
+
+    @classmethod
+    def open(cls, dir_path: str) -> "PrecomputedMatches":
+        with open(os.path.join(dir_path, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        neighbors = np.load(os.path.join(dir_path, NEIGHBORS_FILE), mmap_mode="r")
+        scores = np.load(os.path.join(dir_path, SCORES_FILE), mmap_mode="r")
+        offsets = np.load(os.path.join(dir_path, OFFSETS_FILE), mmap_mode="r")
+        with open(os.path.join(dir_path, IDS_FILE), "r", encoding="utf-8") as f:
+            ids = [line.rstrip("\n") for line in f]
+        if not (len(ids) == neighbors.shape[0] == scores.shape[0] == len(offsets) - 1 == meta["count"]):
+            raise ValueError(f"Precomputed matches at {dir_path} are inconsistent (ids/rows/meta disagree).")
+        return cls(dir_path, meta, neighbors, scores, ids, offsets)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, user_id: str):
+        return user_id in self.row_of
+
+    def metadata(self, row: int) -> Dict[str, Any]:
+        start, stop = int(self.offsets[row]), int(self.offsets[row + 1])
+        return json.loads(os.pread(self._metadata_fd, stop - start, start))
+
+    def get(self, user_id: str, top_k: int = None) -> Optional[List[dict]]:
+        """Matches of a stored user, shaped like format_matches(); None if the user isn't in this run."""
+        row = self.row_of.get(user_id)
+        if row is None:
+            return None
+        top_k = self.k if top_k is None else min(top_k, self.k)
+        matches = []
+        for r, s in zip(self.neighbors[row, :top_k].tolist(), self.scores[row, :top_k].tolist()):
+            if r < 0:
+                break
+            matches.append({"id": self.ids[r], "score": s, "metadata": self.metadata(r)})
+        return matches
+
+    def close(self):
+        os.close(self._metadata_fd)
@@ -0,0 +1,145 @@
+# src/profile_store.py
+"""
+Durable profile store: one SQLite table in WAL mode, keyed by user id.
+
+    store = ProfileStore("data/profiles.db")
+    store.put("user_1", profile)
+    store.put_many(zip(ids, profiles))          # one transaction (one fsync) per call
+    store.get("user_1")                          # O(log n) B-tree lookup, no directory scan
+    for user_id, profile in store.iter_profiles():   # ordered by write sequence
+        ...
+
+Replaces the one-JSON-file-per-user layout of profiles/ (where two people with
+the same name overwrote each other). Every write gets a new sequence number,
+so scans come back in write order and latest() is the last profile saved.
+WAL mode lets readers run alongside a writer, and several processes (API
+workers, chat.py, the pipeline) can share one file.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# shared by chat.py, the API and scripts/run_pipeline.py
+PROFILE_STORE_PATH = os.getenv(
+    "PROFILE_STORE_PATH", os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "data", "profiles.db"))
+)
+# rows fetched per round-trip by iter_profiles()
+SCAN_BATCH_SIZE = 1000
+# how long a writer waits for another process's transaction before giving up (ms)
+BUSY_TIMEOUT_MS = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    seq        INTEGER PRIMARY KEY AUTOINCREMENT,
+    id         TEXT NOT NULL UNIQUE,
+    profile    TEXT NOT NULL,
+    saved_at   TEXT,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+class ProfileStore:
+    """
+    Thread-safe (one connection behind a lock). `synchronous` is the SQLite
+    PRAGMA: "FULL" fsyncs the WAL on every commit, "NORMAL" only at checkpoints
+    (a power cut may lose the last commits, but never corrupts the file).
+    """
+
+    def __init__(self, path: str, synchronous: str = "FULL"):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute(f"PRAGMA synchronous = {synchronous}")
+            self._conn.execute(_SCHEMA)
+
+    @staticmethod
+    def _row(user_id: str, profile: Dict[str, Any], saved_at: str = None) -> tuple:
+        return user_id, json.dumps(profile, ensure_ascii=False, default=str), saved_at, time.time()
+
+    def put(self, user_id: str, profile: Dict[str, Any], saved_at: str = None):
+        """Insert or replace one profile; it moves to the end of the scan order."""
+        self.put_many([(user_id, profile)], saved_at=saved_at)
+
+    def put_many(self, records: Iterable[Tuple[str, Dict[str, Any]]], saved_at: str = None) -> int:
+        """(user_id, profile) pairs in one transaction; returns how many were written."""
+        rows = [self._row(uid, profile, saved_at) for uid, profile in records]
+        if not rows:
+            return 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # REPLACE deletes the old row, so a rewritten profile gets a new seq
+                self._conn.executemany("REPLACE INTO profiles (id, profile, saved_at, updated_at) VALUES (?, ?, ?, ?)", rows)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return len(rows)
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT profile FROM profiles WHERE id = ?", (user_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """{id: profile} for the ids that exist."""
+        out = {}
+        for start in range(0, len(user_ids), 500):  # stay under SQLite's bound-parameter limit
+            chunk = user_ids[start: start + 500]
+            marks = ",".join("?" * len(chunk))
+            with self._lock:
+                rows = self._conn.execute(f"SELECT id, profile FROM profiles WHERE id IN ({marks})", chunk).fetchall()
+            out.update((uid, json.loads(p)) for uid, p in rows)
+        return out
+
+    def __contains__(self, user_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM profiles WHERE id = ?", (user_id,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+
+    def latest(self) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """(id, profile) of the most recently written profile."""
+        with self._lock:
+            row = self._conn.execute("SELECT id, profile FROM profiles ORDER BY seq DESC LIMIT 1").fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def iter_profiles(self, batch_size: int = SCAN_BATCH_SIZE) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        (id, profile) in write order, `batch_size` rows per query (keyset
+        pagination on seq: each batch is an index range scan, and the lock is
+        not held while the caller works). Profiles written during the scan
+        show up at its end.
+        """
+        last = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT seq, id, profile FROM profiles WHERE seq > ? ORDER BY seq LIMIT ?", (last, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for seq, uid, profile in rows:
+                yield uid, json.loads(profile)
+            last = rows[-1][0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
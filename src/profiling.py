@@ -0,0 +1,108 @@
+# src/profiling.py
+"""
+Opt-in sampling profiler for individual slow requests.
+
+While a request is profiled, a background thread snapshots the Python stack
+of every thread (sys._current_frames) every few milliseconds and counts the
+collapsed stacks. If the request turned out slower than `slow_ms`, the counts
+are written in the folded format ("thread;outer;...;inner count" per line),
+which flamegraph.pl and speedscope read directly.
+
+All busy threads are sampled (event loop, embedding pool, index pool), so work
+for concurrent requests shows up too. Only one request is profiled at a time;
+requests that don't get the sampler pay nothing.
+"""
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+# innermost frames of threads that are parked (idle pool workers, event loop in select)
+IDLE_FRAMES = (
+    "_worker (thread.py)",
+    "Condition.wait (threading.py)",
+    "EpollSelector.select (selectors.py)",
+    "KqueueSelector.select (selectors.py)",
+)
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({os.path.basename(code.co_filename)})"
+
+
+def collapse(frame, thread_name: str) -> str:
+    """'thread;outermost;...;innermost' for one stack."""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.append(thread_name)
+    return ";".join(reversed(names)).replace("\n", " ")
+
+
+class StackSampler(threading.Thread):
+    def __init__(self, interval: float):
+        super().__init__(name="stack-sampler", daemon=True)
+        self.interval = interval
+        self.counts = Counter()
+        self.samples = 0
+        self._done = threading.Event()
+
+    def run(self):
+        me = threading.get_ident()
+        while not self._done.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != me and _frame_name(frame) not in IDLE_FRAMES:
+                    self.counts[collapse(frame, names.get(ident, str(ident)))] += 1
+            self.samples += 1
+
+    def stop(self) -> Counter:
+        self._done.set()
+        self.join()
+        return self.counts
+
+
+class RequestProfiler:
+    """
+    start() picks requests to sample (a `sample_rate` fraction, or forced);
+    finish() stops the sampler and saves the profile when the request was slow
+    (always when forced). Files go to `out_dir`.
+    """
+
+    def __init__(self, sample_rate: float, slow_ms: float, out_dir: str, interval_ms: float = 5.0):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.out_dir = out_dir
+        self.interval = interval_ms / 1000
+        self._busy = threading.Lock()
+
+    def start(self, forced: bool = False) -> Optional[StackSampler]:
+        if not forced and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            return None
+        if not self._busy.acquire(blocking=False):
+            return None  # another request is being profiled
+        sampler = StackSampler(self.interval)
+        sampler.start()
+        return sampler
+
+    def finish(self, sampler: StackSampler, label: str, seconds: float, forced: bool = False) -> Optional[str]:
+        """Path of the written profile, or None if the request wasn't slow enough."""
+        try:
+            counts = sampler.stop()
+        finally:
+            self._busy.release()
+        if not counts or (not forced and seconds * 1000 < self.slow_ms):
+            return None
+        os.makedirs(self.out_dir, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", label).strip("_") or "request"
+        path = os.path.join(self.out_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{slug}-{seconds * 1000:.0f}ms.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in counts.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
@@ -0,0 +1,249 @@
+# src/quantization.py
+"""
+Compressed storage for unit vectors (LocalIndex storage modes).
+
+Codecs (bytes per vector at dim=100, vs 400 for float32):
+- "float16": half precision                                      200 B
+- "int8":    per-dimension scale, codes in [-127, 127]            100 B
+- "pq":      product quantization, m sub-spaces x 256 centroids,
+             scored with asymmetric distance tables (ADC)         m B (25 by default)
+
+QuantizedVectors keeps only the codes in RAM. The exact float32 rows go to a
+disk-backed scratch file (memory-mapped, so the OS pages them in on demand):
+they are what an exact re-rank of the top candidates reads, what fetch()
+returns and what the index saves, so compression never compounds.
+"""
+import os
+import tempfile
+import numpy as np
+
+# rows needed before int8 / pq codecs are trained (queries stay exact until then)
+QUANT_MIN_TRAIN_SIZE = 1024
+# at most this many rows are sampled to train a codec (PQ k-means converges on far fewer)
+QUANT_TRAIN_SAMPLE = 65536
+PQ_TRAIN_SAMPLE = 16384
+# rows decoded / scored per step (bounds temporary float32 copies)
+SCORE_BLOCK_SIZE = 65536
+PQ_CENTROIDS = 256
+
+STORAGE_MODES = ("float32", "float16", "int8", "pq")
+
+
+def _kmeans(data: np.ndarray, k: int, n_iter: int = 10, seed: int = 42) -> np.ndarray:
+    """Euclidean k-means; returns (k, dim) float32 centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), size=k, replace=False)].astype(np.float32)
+    for _ in range(n_iter):
+        assign = _nearest(data, centroids)
+        # per-column bincount: much faster than np.add.at for low-dimensional sub-spaces
+        sums = np.stack([np.bincount(assign, weights=data[:, d], minlength=k) for d in range(data.shape[1])], axis=1)
+        counts = np.bincount(assign, minlength=k)
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = data[rng.choice(len(data), size=int(empty.sum()), replace=False)]
+            counts[empty] = 1
+        centroids = (sums / counts[:, None]).astype(np.float32)
+    return centroids
+
+
+def _nearest(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    # argmin ||x - c||^2 == argmin (||c||^2 - 2 x.c)
+    return np.argmin((centroids ** 2).sum(axis=1) - 2 * data @ centroids.T, axis=1)
+
+
+class Float16Codec:
+    name = "float16"
+    needs_training = False
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self.code_shape = (dimension,)
+        self.code_dtype = np.float16
+
+    def fit(self, data: np.ndarray):
+        pass
+
+    def encode(self, data: np.ndarray) -> np.ndarray:
+        return data.astype(np.float16)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32)
+
+    def scores(self, Q: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        return Q @ self.decode(codes).T
+
+    @property
+    def nbytes(self) -> int:
+        return 0
+
+
+class Int8Codec:
+    """x ~= code * scale, one scale per dimension (max |x_d| / 127 over the training rows)."""
+    name = "int8"
+    needs_training = True
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self.code_shape = (dimension,)
+        self.code_dtype = np.int8
+        self.scale = np.full(dimension, 1 / 127, dtype=np.float32)
+
+    def fit(self, data: np.ndarray):
+        peak = np.abs(data).max(axis=0)
+        self.scale = (np.where(peak > 0, peak, 1.0) / 127).astype(np.float32)
+
+    def encode(self, data: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(data / self.scale), -127, 127).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) * self.scale
+
+    def scores(self, Q: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        # fold the scale into the queries; codes are only widened, never rescaled
+        return (Q * self.scale) @ codes.astype(np.float32).T
+
+    @property
+    def nbytes(self) -> int:
+        return self.scale.nbytes
+
+
+class PQCodec:
+    """
+    Product quantization: the dimensions are split into m sub-spaces, each
+    coded by its nearest of 256 k-means centroids (one uint8 per sub-space).
+    A query is scored against codes with a (m, 256) table of sub-space dot
+    products (asymmetric distance computation): no vector is ever decoded.
+    """
+    name = "pq"
+    needs_training = True
+
+    def __init__(self, dimension: int, m: int = None):
+        m = m or max(1, dimension // 4)
+        if not 1 <= m <= dimension:
+            raise ValueError(f"PQ needs 1 <= m <= {dimension} sub-spaces, got {m}.")
+        self.dimension = dimension
+        self.m = m
+        self.code_shape = (m,)
+        self.code_dtype = np.uint8
+        self.subspaces = [(s[0], s[-1] + 1) for s in np.array_split(np.arange(dimension), m)]
+        self.centroids = None  # list of (ksub, sub_dim)
+
+    def fit(self, data: np.ndarray):
+        if len(data) > PQ_TRAIN_SAMPLE:
+            data = data[np.random.default_rng(42).choice(len(data), size=PQ_TRAIN_SAMPLE, replace=False)]
+        ksub = min(PQ_CENTROIDS, len(data))
+        self.centroids = [_kmeans(np.ascontiguousarray(data[:, a:b]), ksub) for a, b in self.subspaces]
+
+    def encode(self, data: np.ndarray) -> np.ndarray:
+        codes = np.empty((len(data), self.m), dtype=np.uint8)
+        for j, (a, b) in enumerate(self.subspaces):
+            codes[:, j] = _nearest(np.ascontiguousarray(data[:, a:b]), self.centroids[j])
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return np.concatenate([self.centroids[j][codes[:, j]] for j in range(self.m)], axis=1)
+
+    def tables(self, Q: np.ndarray) -> np.ndarray:
+        """(b, m, ksub) dot products of each query's sub-vectors with the centroids."""
+        return np.stack([Q[:, a:b] @ self.centroids[j].T for j, (a, b) in enumerate(self.subspaces)], axis=1)
+
+    def scores(self, Q: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        tables = self.tables(Q)
+        scores = np.zeros((len(Q), len(codes)), dtype=np.float32)
+        for j in range(self.m):
+            scores += tables[:, j, :][:, codes[:, j]]
+        return scores
+
+    @property
+    def nbytes(self) -> int:
+        return sum(c.nbytes for c in self.centroids or [])
+
+
+def make_codec(storage: str, dimension: int, pq_m: int = None):
+    if storage == "float16":
+        return Float16Codec(dimension)
+    if storage == "int8":
+        return Int8Codec(dimension)
+    if storage == "pq":
+        return PQCodec(dimension, pq_m)
+    raise ValueError(f"Unknown storage mode '{storage}' (expected one of {', '.join(STORAGE_MODES)}).")
+
+
+class QuantizedVectors:
+    """
+    Row store of unit vectors: codes in RAM, exact float32 rows in a scratch
+    file under `scratch_dir` (deleted when the store is). Rows are written by
+    the owning index with set(); the codec is trained once QUANT_MIN_TRAIN_SIZE
+    rows exist and retrained (all codes rewritten) when the row count doubles.
+    """
+
+    def __init__(self, dimension: int, codec, scratch_dir: str = None):
+        self.dimension = dimension
+        self.codec = codec
+        self._capacity = 0
+        self._filled = 0  # highest written row + 1
+        self._trained_on = 0
+        self._codes = np.zeros((0,) + codec.code_shape, dtype=codec.code_dtype)
+        if scratch_dir:
+            os.makedirs(scratch_dir, exist_ok=True)
+        self._file = tempfile.TemporaryFile(prefix="exact-", suffix=".f32", dir=scratch_dir)
+        self._exact = None
+        self.grow(16)
+
+    @property
+    def trained(self) -> bool:
+        return not self.codec.needs_training or self._trained_on > 0
+
+    def grow(self, capacity: int):
+        if capacity <= self._capacity:
+            return
+        self._file.truncate(capacity * self.dimension * 4)
+        self._exact = np.memmap(self._file, dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+        codes = np.zeros((capacity,) + self.codec.code_shape, dtype=self.codec.code_dtype)
+        codes[: self._filled] = self._codes[: self._filled]
+        self._codes = codes
+        self._capacity = capacity
+
+    def set(self, rows: np.ndarray, unit: np.ndarray):
+        self._exact[rows] = unit
+        self._filled = max(self._filled, int(rows.max()) + 1)
+        if not self.codec.needs_training:
+            self._codes[rows] = self.codec.encode(unit)
+        elif self._filled >= max(QUANT_MIN_TRAIN_SIZE, 2 * self._trained_on):
+            self._train()
+        elif self.trained:
+            self._codes[rows] = self.codec.encode(unit)
+
+    def _train(self):
+        n = self._filled
+        rng = np.random.default_rng(42)
+        sample = np.sort(rng.choice(n, size=min(n, QUANT_TRAIN_SAMPLE), replace=False))
+        self.codec.fit(np.asarray(self._exact[sample]))
+        for start in range(0, n, SCORE_BLOCK_SIZE):
+            stop = min(start + SCORE_BLOCK_SIZE, n)
+            self._codes[start:stop] = self.codec.encode(np.asarray(self._exact[start:stop]))
+        self._trained_on = n
+
+    def exact(self, rows) -> np.ndarray:
+        """Exact float32 unit rows (read from the scratch file)."""
+        return np.asarray(self._exact[rows])
+
+    def exact_rows(self, n: int) -> np.ndarray:
+        """Memory-mapped view of the first n exact float32 unit rows (nothing is read until used)."""
+        return self._exact[:n]
+
+    def scores(self, Q: np.ndarray, n: int, rows: np.ndarray = None) -> np.ndarray:
+        """(b, len(rows)) approximate dot products of unit queries Q with rows (first n if None)."""
+        if not self.trained:
+            mat = self.exact_rows(n) if rows is None else self._exact[rows]
+            return Q @ np.asarray(mat).T
+        codes = self._codes[:n] if rows is None else self._codes[rows]
+        return np.concatenate(
+            [self.codec.scores(Q, codes[s: s + SCORE_BLOCK_SIZE]) for s in range(0, len(codes), SCORE_BLOCK_SIZE)]
+            or [np.empty((len(Q), 0), dtype=np.float32)],
+            axis=1,
+        )
+
+    def nbytes(self, n: int) -> int:
+        """RAM held for n rows: codes plus codec tables (the exact rows live on disk)."""
+        return self._codes[:n].nbytes + self.codec.nbytes
@@ -0,0 +1,227 @@
+# src/reciprocal.py
+"""
+Reciprocal (two-sided) needs/offers matching.
+
+benefit(a <- b) = how well b's offers cover a's needs, in [0, 1]:
+    sum over a's needs n and b's offers o of C[n, o], divided by a's number
+    of needs and capped at 1, where C is config.catalogs.NEED_OFFER_COMPATIBILITY.
+mutual(a, b)    = min(benefit(a <- b), benefit(b <- a)); > 0 only if both sides gain.
+score(a, b)     = cosine(a, b) + RECIPROCAL_WEIGHT * mutual(a, b), over mutual pairs only.
+
+Needs and offers are stored as bitmasks. Users with the same (needs, offers)
+masks form a "type", and compatibility is worked out between types (at most
+2^|needs| * 2^|offers| types, a few hundred in practice). The all-users pass
+takes a block of users at a time and scores them only against the rows of
+compatible types, in candidate blocks, so memory stays bounded and no N x N
+matrix is ever built.
+"""
+import os
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from config.catalogs import NEED_OFFER_COMPATIBILITY, NEED_OPTIONS, OFFER_OPTIONS
+from src.topk import CANDIDATE_BLOCK_SIZE, QUERY_BLOCK_SIZE, finish_top_k, merge_top_k
+
+RECIPROCAL_WEIGHT = float(os.getenv("RECIPROCAL_WEIGHT", 0.5))
+
+
+def compatibility_matrix(
+    compat: Dict[str, Dict[str, float]] = NEED_OFFER_COMPATIBILITY,
+    needs: Sequence[str] = NEED_OPTIONS,
+    offers: Sequence[str] = OFFER_OPTIONS,
+) -> np.ndarray:
+    """(n_needs, n_offers) float32 matrix C[need, offer]."""
+    C = np.zeros((len(needs), len(offers)), dtype=np.float32)
+    offer_pos = {o: j for j, o in enumerate(offers)}
+    for i, need in enumerate(needs):
+        for offer, value in compat.get(need, {}).items():
+            C[i, offer_pos[offer]] = value
+    return C
+
+
+def encode_options(values_per_user: Sequence[Any], options: Sequence[str]) -> np.ndarray:
+    """One bitmask per user (bit j = options[j]); values may be a string or a list, unknown ones are ignored."""
+    if len(options) > 63:
+        raise ValueError("At most 63 options fit in a bitmask.")
+    pos = {o: j for j, o in enumerate(options)}
+    masks = np.zeros(len(values_per_user), dtype=np.int64)
+    for i, values in enumerate(values_per_user):
+        if values is None:
+            continue
+        for v in [values] if isinstance(values, str) else values:
+            j = pos.get(v)
+            if j is not None:
+                masks[i] |= 1 << j
+    return masks
+
+
+def _bits(masks: np.ndarray, n: int) -> np.ndarray:
+    """(m,) bitmasks -> (m, n) float32 indicator matrix."""
+    return ((np.asarray(masks, dtype=np.int64)[:, None] >> np.arange(n)) & 1).astype(np.float32)
+
+
+def benefit_matrix(need_masks: np.ndarray, offer_masks: np.ndarray, C: np.ndarray) -> np.ndarray:
+    """(len(need_masks), len(offer_masks)) benefit each needing side gets from each offering side."""
+    need_bits = _bits(need_masks, C.shape[0])
+    gains = (need_bits @ C) @ _bits(offer_masks, C.shape[1]).T
+    counts = need_bits.sum(axis=1, keepdims=True)
+    np.divide(gains, counts, out=gains, where=counts > 0)
+    return np.minimum(gains, 1.0, out=gains)
+
+
+def mutual_benefit(needs_a, offers_a, needs_b, offers_b, C: np.ndarray) -> np.ndarray:
+    """(len(a), len(b)) min of the two directions; 0 unless both sides benefit."""
+    return np.minimum(benefit_matrix(needs_a, offers_b, C), benefit_matrix(needs_b, offers_a, C).T)
+
+
+def reciprocal_filter(needs: Any, offers: Any, C: np.ndarray = None) -> Dict[str, Any]:
+    """
+    Metadata filter (src/metadata_filter.py syntax) that keeps only users who can
+    be mutual matches: they offer something we need and need something we offer.
+    None if no one can be.
+    """
+    C = compatibility_matrix() if C is None else C
+    need_bits = _bits(encode_options([needs], NEED_OPTIONS), C.shape[0])[0] > 0
+    offer_bits = _bits(encode_options([offers], OFFER_OPTIONS), C.shape[1])[0] > 0
+    useful_offers = [o for j, o in enumerate(OFFER_OPTIONS) if C[need_bits, j].any()]
+    served_needs = [n for i, n in enumerate(NEED_OPTIONS) if C[i, offer_bits].any()]
+    if not useful_offers or not served_needs:
+        return None
+    return {"$and": [{"offers": {"$in": useful_offers}}, {"needs": {"$in": served_needs}}]}
+
+
+def rescore_matches(profile: Dict[str, Any], matches: List[dict], weight: float = RECIPROCAL_WEIGHT, C: np.ndarray = None) -> List[dict]:
+    """
+    Keep the mutual matches among `matches` (format_matches output, with metadata),
+    add weight * mutual benefit to each score and re-sort.
+    """
+    if not matches:
+        return []
+    C = compatibility_matrix() if C is None else C
+    meta = [m.get("metadata") or {} for m in matches]
+    mutual = mutual_benefit(
+        encode_options([profile.get("needs")], NEED_OPTIONS),
+        encode_options([profile.get("offers")], OFFER_OPTIONS),
+        encode_options([m.get("needs") for m in meta], NEED_OPTIONS),
+        encode_options([m.get("offers") for m in meta], OFFER_OPTIONS),
+        C,
+    )[0]
+    kept = []
+    for m, value in zip(matches, mutual.tolist()):
+        if value > 0:
+            kept.append({**m, "score": m["score"] + weight * value, "mutual_benefit": value})
+    kept.sort(key=lambda m: m["score"], reverse=True)
+    return kept
+
+
+class ReciprocalIndex:
+    """
+    All-users reciprocal top-k over unit vectors + needs/offers bitmasks.
+
+        rix = ReciprocalIndex.from_local_index(index)
+        for rows, best_rows, best_scores in rix.iter_top_k(10): ...
+    """
+
+    def __init__(self, ids: List[str], vectors: np.ndarray, need_masks: np.ndarray, offer_masks: np.ndarray,
+                 C: np.ndarray = None, weight: float = RECIPROCAL_WEIGHT):
+        self.ids = list(ids)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.vectors = np.divide(vectors, norms, out=np.zeros_like(vectors, dtype=np.float32), where=norms > 0)
+        self.C = compatibility_matrix() if C is None else C
+        self.weight = weight
+
+        # group users by (needs, offers) type; compatibility is computed per type
+        keys = (np.asarray(need_masks, dtype=np.int64) << 32) | np.asarray(offer_masks, dtype=np.int64)
+        type_keys, self.type_of = np.unique(keys, return_inverse=True)
+        self.type_needs = type_keys >> 32
+        self.type_offers = type_keys & 0xFFFFFFFF
+        self._order = np.argsort(self.type_of, kind="stable")
+        self._bounds = np.searchsorted(self.type_of[self._order], np.arange(len(type_keys) + 1))
+
+    @classmethod
+    def from_profiles(cls, ids, vectors, metadata: List[Dict[str, Any]], **kwargs) -> "ReciprocalIndex":
+        needs = encode_options([m.get("needs") for m in metadata], NEED_OPTIONS)
+        offers = encode_options([m.get("offers") for m in metadata], OFFER_OPTIONS)
+        return cls(ids, vectors, needs, offers, **kwargs)
+
+    @classmethod
+    def from_local_index(cls, index, **kwargs) -> "ReciprocalIndex":
+        return cls.from_profiles(index.ids, index.vectors, index._metadata[: len(index)], **kwargs)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def n_types(self) -> int:
+        return len(self.type_needs)
+
+    def type_rows(self, t: int) -> np.ndarray:
+        return self._order[self._bounds[t]: self._bounds[t + 1]]
+
+    def _type_mutual(self, need_masks, offer_masks) -> np.ndarray:
+        """(len(masks), n_types) mutual benefit of each given user against every type."""
+        return mutual_benefit(need_masks, offer_masks, self.type_needs, self.type_offers, self.C)
+
+    def _candidate_blocks(self, types: np.ndarray):
+        """(rows, types, sizes) blocks of at most CANDIDATE_BLOCK_SIZE rows, cut on type boundaries."""
+        rows, block_types, sizes, n = [], [], [], 0
+        for t in types:
+            type_rows = self.type_rows(t)
+            for start in range(0, len(type_rows), CANDIDATE_BLOCK_SIZE):
+                part = type_rows[start: start + CANDIDATE_BLOCK_SIZE]
+                if n and n + len(part) > CANDIDATE_BLOCK_SIZE:
+                    yield np.concatenate(rows), np.asarray(block_types), np.asarray(sizes)
+                    rows, block_types, sizes, n = [], [], [], 0
+                rows.append(part)
+                block_types.append(t)
+                sizes.append(len(part))
+                n += len(part)
+        if n:
+            yield np.concatenate(rows), np.asarray(block_types), np.asarray(sizes)
+
+    def _score(self, Q: np.ndarray, q_rows, q_mutual: np.ndarray, k: int):
+        """
+        Top-k (rows, scores) of each query row among the users of compatible types.
+        q_mutual: (b, n_types) mutual benefit of each query against each type.
+        """
+        # per-type score bonus; -inf drops one-sided pairs
+        bonus = np.where(q_mutual > 0, self.weight * q_mutual, -np.inf).astype(np.float32)
+        types = np.nonzero((q_mutual > 0).any(axis=0))[0]
+        kk = k + 1 if q_rows is not None else k  # room to drop the query itself
+        b = len(Q)
+        best_rows = np.empty((b, 0), dtype=np.int64)
+        best_scores = np.empty((b, 0), dtype=np.float32)
+        for rows, block_types, sizes in self._candidate_blocks(types):
+            scores = Q @ self.vectors[rows].T
+            # candidate rows are grouped by type, so the bonus is a repeat, not a gather
+            scores += np.repeat(bonus[:, block_types], sizes, axis=1)
+            best_rows, best_scores = merge_top_k(best_rows, best_scores, rows, scores, kk)
+        # fewer compatible users than k: padded with -1 / -inf
+        best_rows, best_scores = finish_top_k(best_rows, best_scores, k, q_rows)
+        best_rows = np.where(np.isfinite(best_scores), best_rows, -1)
+        return best_rows, best_scores
+
+    def iter_top_k(self, k: int) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Yields (query rows (b,), best rows (b, k), scores (b, k)) for every user,
+        one query block at a time; missing matches are row -1 / score -inf.
+        Query rows are taken in type order, so a block spans few types and
+        only their compatible types are scored.
+        """
+        for start in range(0, len(self), QUERY_BLOCK_SIZE):
+            q_rows = self._order[start: start + QUERY_BLOCK_SIZE]
+            q_types, inverse = np.unique(self.type_of[q_rows], return_inverse=True)
+            q_mutual = self._type_mutual(self.type_needs[q_types], self.type_offers[q_types])[inverse]
+            best_rows, best_scores = self._score(self.vectors[q_rows], q_rows, q_mutual, k)
+            yield q_rows, best_rows, best_scores
+
+    def query(self, vector: np.ndarray, needs: Any, offers: Any, k: int = 10) -> List[dict]:
+        """Reciprocal top-k for one (possibly new) profile."""
+        q = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+        norm = np.linalg.norm(q)
+        if norm == 0:
+            return []
+        q_mutual = self._type_mutual(encode_options([needs], NEED_OPTIONS), encode_options([offers], OFFER_OPTIONS))
+        rows, scores = self._score(q / norm, None, q_mutual, k)
+        return [{"id": self.ids[r], "score": float(s)} for r, s in zip(rows[0], scores[0]) if r >= 0]
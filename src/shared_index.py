@@ -0,0 +1,315 @@
+# src/shared_index.py
+"""
+Vector index shared by every process on a host (VECTOR_BACKEND=shared), so
+all uvicorn workers query one copy and see each other's registrations.
+
+Files under SHARED_INDEX_DIR/<index name>:
+    .header    int64 [magic, dimension, capacity, count, generation]
+    .vectors   float32 (capacity, dim) unit rows      } mmap'd by every process
+    .norms     float32 (capacity,)                    } (one copy in the page cache)
+    .log       NDJSON {"row", "id", "metadata"}, one line per write
+    .lock      flock'd by the writer
+
+Single writer: upsert() takes an exclusive flock, catches up with the whole
+log (so lines left by a writer that died before bumping the header are never
+given away again), writes the rows into the mmap, appends their log lines and
+only then bumps the count and generation.
+Readers never lock across processes: each query compares the header
+generation with the last one it saw and, if it moved, reads the new log lines
+(ids, row numbers, filter fields) before scoring. A write is visible to the
+other workers on their next query (in the API, once the write buffer has
+flushed it: WRITE_BUFFER_MAX_AGE at most).
+
+Each process keeps only the id <-> row map, the filter postings and the
+offset of every row's log line; metadata is read back from the log for the
+rows a query returns. Overwriting an existing id rewrites its row in place,
+so a query racing that write may score a half-written vector once.
+
+Scoring, filters and IVF are LocalIndex's. POSIX only (fcntl).
+"""
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from src.local_index import (
+    LOCAL_INDEX_DIR,
+    LOCAL_INDEX_MODE,
+    LOCAL_INDEX_NPROBE,
+    LocalIndex,
+    _normalize_rows,
+    fetch_vectors,
+    index_path,
+    iter_records,
+    query_similar,
+    query_similar_batch,
+    upsert_users,
+)
+
+SHARED_INDEX_DIR = os.getenv("SHARED_INDEX_DIR", os.path.join(LOCAL_INDEX_DIR, "shared"))
+
+MAGIC = 0x5348_4944_5831  # "SHIDX1"
+MAGIC_, DIM, CAPACITY, COUNT, GENERATION = range(5)
+INITIAL_CAPACITY = 1024
+# rows written per log append when seeding from a saved local index
+SEED_BATCH_SIZE = 5000
+
+
+class _LogMetadata:
+    """List-like view of row metadata, read back from the write log on access."""
+
+    def __init__(self, index: "SharedIndex"):
+        self.index = index
+
+    def __len__(self):
+        return len(self.index._offsets)
+
+    def __getitem__(self, row):
+        offset, length = self.index._offsets[row]
+        return json.loads(os.pread(self.index._log_fd, length, offset))["metadata"]
+
+
+class SharedIndex(LocalIndex):
+    def __init__(self, path: str, dimension: int, mode: str = "exact", nprobe: int = 8, name: str = None, seed_path: str = None):
+        super().__init__(dimension, mode=mode, nprobe=nprobe, name=name)
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock_fd = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        with self._writer():
+            if not os.path.exists(path + ".header"):
+                self._create(seed_path)
+        self._header = np.memmap(path + ".header", dtype=np.int64, mode="r+", shape=(5,))
+        if self._header[MAGIC_] != MAGIC:
+            raise ValueError(f"{path}.header is not a shared index header.")
+        if self._header[DIM] != dimension:
+            raise ValueError(f"Shared index '{name}' has dimension {self._header[DIM]}, expected {dimension}.")
+
+        self._log_fd = os.open(path + ".log", os.O_RDWR | os.O_APPEND)
+        self._log_pos = 0
+        self._offsets = []  # row -> (offset, length) of its latest log line
+        self._metadata = _LogMetadata(self)
+        self._seen = -1
+        self._map(int(self._header[CAPACITY]))
+        with self._lock, self._writer():
+            self._recover()
+
+    # ----------------- files -----------------
+
+    @contextmanager
+    def _writer(self):
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _create(self, seed_path: str = None):
+        """First process to open the index: size the files (optionally fill them from a saved LocalIndex), then publish the header."""
+        seed = LocalIndex.load(seed_path) if seed_path and os.path.exists(seed_path + ".npz") else None
+        n = len(seed) if seed is not None else 0
+        capacity = max(INITIAL_CAPACITY, 1 << (n - 1).bit_length() if n else 0)
+        self._resize_files(capacity)
+        with open(self.path + ".log", "wb") as log:
+            if seed is not None:
+                vectors = np.memmap(self.path + ".vectors", dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+                norms = np.memmap(self.path + ".norms", dtype=np.float32, mode="r+", shape=(capacity,))
+                vectors[:n] = seed.vectors
+                norms[:n] = seed._norms[:n]
+                vectors.flush()
+                norms.flush()
+                for start in range(0, n, SEED_BATCH_SIZE):
+                    log.write(b"".join(
+                        self._log_line(row, seed.ids[row], seed._metadata[row]) for row in range(start, min(start + SEED_BATCH_SIZE, n))
+                    ))
+        # the header appears last (atomically), so nobody opens a half-built index
+        tmp = self.path + ".header.tmp"
+        np.array([MAGIC, self.dimension, capacity, n, 1], dtype=np.int64).tofile(tmp)
+        os.replace(tmp, self.path + ".header")
+        if seed is not None:
+            print(f"✅ Seeded shared index '{self.name}' from {seed_path} ({n} vectors).")
+
+    def _resize_files(self, capacity: int):
+        for suffix, row_bytes in ((".vectors", 4 * self.dimension), (".norms", 4)):
+            with open(self.path + suffix, "ab") as f:
+                f.truncate(capacity * row_bytes)
+
+    def _map(self, capacity: int):
+        """(Re)map the shared arrays; views handed out earlier stay valid."""
+        self._vectors = np.memmap(self.path + ".vectors", dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+        self._norms = np.memmap(self.path + ".norms", dtype=np.float32, mode="r+", shape=(capacity,))
+        if len(self._assign) < capacity:
+            assign = np.zeros(capacity, dtype=np.int32)
+            assign[: len(self._assign)] = self._assign
+            self._assign = assign
+
+    @staticmethod
+    def _log_line(row: int, user_id: str, metadata: dict) -> bytes:
+        return (json.dumps({"row": row, "id": user_id, "metadata": metadata or {}}, ensure_ascii=False) + "\n").encode("utf-8")
+
+    # ----------------- readers -----------------
+
+    def refresh(self, force: bool = False):
+        """
+        Apply other processes' writes since the last call (a header read when
+        there are none). force=True reads the log to its end even when the
+        generation hasn't moved.
+        """
+        generation = int(self._header[GENERATION])
+        if generation == self._seen and not force:
+            return
+        with self._lock:
+            if generation == self._seen and not force:
+                return
+            if self._header[CAPACITY] > len(self._norms):
+                self._map(int(self._header[CAPACITY]))
+            size = os.fstat(self._log_fd).st_size
+            data = os.pread(self._log_fd, size - self._log_pos, self._log_pos)
+            end = data.rfind(b"\n") + 1  # a writer may be mid-append: stop at the last full line
+            first_new = self._count
+            for line in data[:end].splitlines(keepends=True):
+                self._apply(json.loads(line), self._log_pos, len(line))
+                self._log_pos += len(line)
+            if self._centroids is not None and self._count > first_new:
+                self._assign[first_new: self._count] = np.argmax(self._vectors[first_new: self._count] @ self._centroids.T, axis=1)
+                self._list_order = None
+            self._seen = generation
+            self._maybe_start_training()
+
+    def _apply(self, record: dict, offset: int, length: int):
+        row, user_id = record["row"], record["id"]
+        if row >= len(self._norms):  # a writer grew the files after refresh() read the capacity
+            self._map(int(self._header[CAPACITY]))
+        if row < len(self._offsets):
+            self._inverted.remove(row, self._metadata[row])
+            self._offsets[row] = (offset, length)
+            if self._dirty is not None:
+                self._dirty.add(row)
+            if self._centroids is not None:
+                self._assign[row] = np.argmax(self._centroids @ self._vectors[row])
+                self._list_order = None
+        else:
+            self._offsets.append((offset, length))
+            self._ids.append(user_id)
+            self._id_to_row[user_id] = row
+            self._count = row + 1
+        self._inverted.add(row, record["metadata"])
+
+    def __len__(self):
+        self.refresh()
+        return self._count
+
+    @property
+    def ids(self):
+        self.refresh()
+        return self._ids
+
+    def query(self, vector, top_k: int = 5, **kwargs):
+        self.refresh()
+        return super().query(vector, top_k, **kwargs)
+
+    def query_batch(self, vectors, top_k: int = 5, **kwargs):
+        self.refresh()
+        return super().query_batch(vectors, top_k, **kwargs)
+
+    def fetch(self, ids):
+        self.refresh()
+        return super().fetch(ids)
+
+    def filter_rows(self, filter: dict) -> np.ndarray:
+        self.refresh()
+        return super().filter_rows(filter)
+
+    # ----------------- writer -----------------
+
+    def upsert(self, vectors):
+        """Same contract as LocalIndex.upsert; visible to every process once it returns."""
+        if not vectors:
+            return {"upserted_count": 0}
+        values = np.asarray([v["values"] for v in vectors], dtype=np.float32)
+        if values.ndim != 2 or values.shape[1] != self.dimension:
+            raise ValueError(f"Vector dimension mismatch: expected {self.dimension}, got {values.shape[-1]}.")
+        unit, norms = _normalize_rows(values)
+
+        with self._lock, self._writer():
+            self._recover()
+            count = self._count
+            rows, new_rows = np.empty(len(vectors), dtype=np.int64), {}
+            for i, v in enumerate(vectors):
+                row = self._id_to_row.get(v["id"], new_rows.get(v["id"]))
+                if row is None:
+                    row = new_rows[v["id"]] = count
+                    count += 1
+                rows[i] = row
+
+            capacity = int(self._header[CAPACITY])
+            if count > capacity:
+                while capacity < count:
+                    capacity *= 2
+                self._resize_files(capacity)
+                self._header[CAPACITY] = capacity
+                self._map(capacity)
+
+            # rows first, then the log, then the generation: a reader that sees a log line sees its row
+            self._vectors[rows] = unit
+            self._norms[rows] = norms
+            os.write(self._log_fd, b"".join(
+                self._log_line(int(row), v["id"], v.get("metadata")) for row, v in zip(rows, vectors)
+            ))
+            self._header[COUNT] = count
+            self._header[GENERATION] += 1
+            self.refresh()
+        return {"upserted_count": len(vectors)}
+
+    def _recover(self):
+        """
+        Writer side, under the flock: catch up with the whole log, including
+        lines a writer appended before dying (its rows are already written, but
+        COUNT/GENERATION were never bumped), so new rows are allocated after
+        them. A torn last line from such a writer is cut off, and the header is
+        brought in line with the log.
+        """
+        self.refresh(force=True)
+        if os.fstat(self._log_fd).st_size > self._log_pos:
+            os.ftruncate(self._log_fd, self._log_pos)
+        if self._header[COUNT] != self._count:
+            self._header[COUNT] = self._count
+            self._header[GENERATION] += 1
+            self._seen = int(self._header[GENERATION])
+
+    def save(self, path: str):
+        self.refresh()
+        super().save(path)
+
+    def close(self):
+        os.close(self._log_fd)
+        os.close(self._lock_fd)
+
+
+# ----------------- pinecone_client-compatible API -----------------
+# upsert_users / query_similar / query_similar_batch / fetch_vectors / iter_records
+# are local_index's: they only call the index's methods.
+
+_INDEXES = {}
+_OPEN_LOCK = threading.Lock()
+
+
+def ensure_index_exists(api_key: str, index_name: str, vector_dim: int, region: str, pool_threads: int = 1):
+    """
+    Same signature as pinecone_client.ensure_index_exists; api_key/region/pool_threads are ignored.
+    Maps SHARED_INDEX_DIR/<index_name>, creating it on first use (seeded from the
+    local index saved under LOCAL_INDEX_DIR, if there is one).
+    """
+    with _OPEN_LOCK:
+        index = _INDEXES.get(index_name)
+        if index is None:
+            index = SharedIndex(
+                os.path.join(SHARED_INDEX_DIR, index_name), vector_dim, mode=LOCAL_INDEX_MODE,
+                nprobe=LOCAL_INDEX_NPROBE, name=index_name, seed_path=index_path(index_name),
+            )
+            print(f"Shared index '{index_name}' mapped ({len(index)} vectors).")
+            _INDEXES[index_name] = index
+        return index
+
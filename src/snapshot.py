@@ -0,0 +1,426 @@
+# src/snapshot.py
+"""
+Columnar, dictionary-encoded profile snapshots for batch jobs
+(scripts/export_snapshot.py writes them).
+
+One directory, one set of files per profile field (config/catalogs.QUESTIONS):
+    <key>.codes.npy     select: (N,) int32 dictionary codes, -1 = missing
+                        multiselect: (M,) int32 codes of all rows, back to back
+    <key>.offsets.npy   multiselect: (N + 1,) int64 row starts in <key>.codes.npy
+                        text: (N + 1,) int64 row starts in <key>.utf8.npy (bytes)
+                        list of texts (past_projects): (N + 1,) int64 row starts in <key>.items.npy
+    <key>.items.npy     list of texts: (I + 1,) int64 item starts in <key>.utf8.npy (bytes)
+    <key>.utf8.npy      text / list of texts: uint8 UTF-8 blob
+    <key>.npy           number: (N,) float64, NaN = missing
+    present.npy         (N, n_columns) bool, False where the profile had no value
+    _extra.*            everything else, as a JSON text column
+    ids.txt             one user id per line, row order
+    meta.json           columns (key, kind, dictionary), count, created_at
+
+Dictionaries start with the chat.py catalog of the field, so an option always
+has the same code; values outside the catalog are appended as they are seen.
+Values of an unexpected type (say a string in a number field), numbers the
+float64 column can't give back as they were (whole floats like 3.0, which
+would decode as 3, ints beyond 2**53, inf/NaN) and keys that are not
+questions go to _extra unchanged, so decode() returns the original
+profiles (keys whose value was null are dropped). Every array is a plain .npy
+file and opens memory-mapped.
+
+embed_fields() goes from codes straight to per-option vector sums (one
+embedding per dictionary entry, like the embedder's option table), then
+gathers and segment sums: catalog values are never tokenized per row.
+"""
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from config.catalogs import QUESTIONS
+from src.embeddings import embedding_fields, field_text
+from src.field_store import _npy_header
+from src.precomputed import publish
+
+META_FILE = "meta.json"
+IDS_FILE = "ids.txt"
+PRESENT_FILE = "present.npy"
+EXTRA_COLUMN = "_extra"
+# rows decoded / embedded per step by the iter_* helpers
+SNAPSHOT_BLOCK_ROWS = 65536
+
+KINDS = {
+    "select": "category",
+    "multiselect": "multi",
+    "searchable_multiselect": "multi",
+    "number": "number",
+    "text": "text",
+    "structured_projects": "text_list",
+}
+
+
+def snapshot_columns(questions: List[Dict[str, Any]] = QUESTIONS) -> List[Dict[str, Any]]:
+    """[{"key", "kind", "dictionary"}] for the question flow; dictionaries seeded from the catalogs."""
+    columns = []
+    for q in questions:
+        kind = KINDS.get(q["type"], "text")
+        column = {"key": q["key"], "kind": kind}
+        if kind in ("category", "multi"):
+            column["dictionary"] = list(dict.fromkeys(q.get("options", [])))
+        columns.append(column)
+    columns.append({"key": EXTRA_COLUMN, "kind": "text"})
+    return columns
+
+
+def number_text(value: float) -> str:
+    """The text a stored number embeds as: field_text() of the value written (whole numbers were ints)."""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _segment_sums(values: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Sum of consecutive segments of `values` (lengths per segment, zeros allowed)."""
+    out = np.zeros((len(lengths),) + values.shape[1:], dtype=values.dtype)
+    nonempty = lengths > 0
+    if nonempty.any():
+        # reduceat misbehaves on empty segments: reduce only the non-empty ones
+        starts = (np.cumsum(lengths) - lengths)[nonempty]
+        out[nonempty] = np.add.reduceat(values, starts, axis=0)
+    return out
+
+
+# ---- writing ----
+
+class _NpyAppender:
+    """A 1-D .npy file written in pieces; the length in the header is patched on close()."""
+
+    def __init__(self, path: str, dtype):
+        self.dtype = np.dtype(dtype)
+        self.count = 0
+        self._f = open(path, "wb")
+        self._f.write(_npy_header((0,), self.dtype))
+
+    def append(self, values):
+        arr = np.ascontiguousarray(values, dtype=self.dtype)
+        self._f.write(arr.tobytes())
+        self.count += len(arr)
+
+    def close(self):
+        self._f.seek(0)
+        self._f.write(_npy_header((self.count,), self.dtype))
+        self._f.close()
+
+
+class _ColumnWriter:
+    def __init__(self, dir_path: str, column: Dict[str, Any]):
+        self.key = column["key"]
+        self.kind = column["kind"]
+        self.dictionary = list(column.get("dictionary", []))
+        self._code_of = {v: i for i, v in enumerate(self.dictionary)}
+        path = os.path.join(dir_path, self.key)
+        self._files = []
+        if self.kind == "number":
+            self.values = self._open(f"{path}.npy", np.float64)
+        if self.kind in ("category", "multi"):
+            self.codes = self._open(f"{path}.codes.npy", np.int32)
+        if self.kind in ("multi", "text", "text_list"):
+            self.offsets = self._open(f"{path}.offsets.npy", np.int64)
+            self.offsets.append([0])
+        if self.kind in ("text", "text_list"):
+            self.blob = self._open(f"{path}.utf8.npy", np.uint8)
+        if self.kind == "text_list":
+            self.items = self._open(f"{path}.items.npy", np.int64)
+            self.items.append([0])
+
+    def _open(self, path: str, dtype) -> _NpyAppender:
+        appender = _NpyAppender(path, dtype)
+        self._files.append(appender)
+        return appender
+
+    def accepts(self, value) -> bool:
+        if self.kind == "number":
+            if isinstance(value, bool):
+                return False
+            if isinstance(value, int):
+                return abs(value) <= 2 ** 53
+            # a whole float would come back as an int (and embed as "3", not "3.0")
+            return isinstance(value, float) and np.isfinite(value) and not value.is_integer()
+        if self.kind in ("category", "text"):
+            return isinstance(value, str)
+        return isinstance(value, list) and all(isinstance(v, str) for v in value)
+
+    def _code(self, value: str) -> int:
+        code = self._code_of.get(value)
+        if code is None:
+            code = self._code_of[value] = len(self.dictionary)
+            self.dictionary.append(value)
+        return code
+
+    def _append_bytes(self, texts: List[str], ends: _NpyAppender):
+        data = [t.encode("utf-8") for t in texts]
+        ends.append(self.blob.count + np.cumsum([len(d) for d in data], dtype=np.int64))
+        self.blob.append(np.frombuffer(b"".join(data), dtype=np.uint8))
+
+    def append(self, values: List[Any]):
+        """One value per row, None where missing."""
+        if self.kind == "number":
+            self.values.append([np.nan if v is None else v for v in values])
+        elif self.kind == "category":
+            self.codes.append([-1 if v is None else self._code(v) for v in values])
+        elif self.kind == "multi":
+            codes = [self._code(x) for v in values for x in v or []]
+            self.offsets.append(self.codes.count + np.cumsum([len(v or []) for v in values], dtype=np.int64))
+            self.codes.append(codes)
+        elif self.kind == "text":
+            self._append_bytes([v or "" for v in values], self.offsets)
+        else:
+            self.offsets.append(self.items.count - 1 + np.cumsum([len(v or []) for v in values], dtype=np.int64))
+            self._append_bytes([x for v in values for x in v or []], self.items)
+
+    def close(self):
+        for f in self._files:
+            f.close()
+
+    def meta(self) -> Dict[str, Any]:
+        meta = {"key": self.key, "kind": self.kind}
+        if self.kind in ("category", "multi"):
+            meta["dictionary"] = self.dictionary
+        return meta
+
+
+class SnapshotWriter:
+    """
+    Streams (ids, profiles) chunks into a snapshot. Written to <dir>.tmp and
+    swapped in on close(), so readers never see a half-written snapshot.
+    """
+
+    def __init__(self, dir_path: str, questions: List[Dict[str, Any]] = QUESTIONS):
+        self.dir_path = dir_path
+        self.tmp_dir = dir_path + ".tmp"
+        if os.path.exists(self.tmp_dir):
+            shutil.rmtree(self.tmp_dir)
+        os.makedirs(self.tmp_dir)
+        self.columns = [_ColumnWriter(self.tmp_dir, c) for c in snapshot_columns(questions)]
+        self._known = {c.key for c in self.columns}
+        self.count = 0
+        self._ids = open(os.path.join(self.tmp_dir, IDS_FILE), "w", encoding="utf-8")
+        self._present = open(os.path.join(self.tmp_dir, PRESENT_FILE), "wb")
+        self._present.write(_npy_header((0, len(self.columns)), np.bool_))
+
+    def append(self, ids: List[str], profiles: List[Dict[str, Any]]):
+        n = len(profiles)
+        present = np.zeros((n, len(self.columns)), dtype=bool)
+        extras = [{k: v for k, v in p.items() if k not in self._known and v is not None} for p in profiles]
+        for j, col in enumerate(self.columns[:-1]):
+            values = []
+            for i, p in enumerate(profiles):
+                v = p.get(col.key)
+                if v is not None and not col.accepts(v):
+                    extras[i][col.key] = v
+                    v = None
+                present[i, j] = v is not None
+                values.append(v)
+            col.append(values)
+        present[:, -1] = [bool(e) for e in extras]
+        self.columns[-1].append([json.dumps(e, ensure_ascii=False, default=str) if e else None for e in extras])
+        self._present.write(present.tobytes())
+        for uid in ids:
+            self._ids.write(f"{uid}\n")
+        self.count += n
+
+    def close(self):
+        for col in self.columns:
+            col.close()
+        self._ids.close()
+        self._present.seek(0)
+        self._present.write(_npy_header((self.count, len(self.columns)), np.bool_))
+        self._present.close()
+        meta = {
+            "count": self.count,
+            "columns": [c.meta() for c in self.columns],
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        with open(os.path.join(self.tmp_dir, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        publish(self.tmp_dir, self.dir_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        return False
+
+
+# ---- reading ----
+
+class _Column:
+    def __init__(self, dir_path: str, meta: Dict[str, Any], index: int):
+        self.key = meta["key"]
+        self.kind = meta["kind"]
+        self.index = index  # column of present.npy
+        self.dictionary = meta.get("dictionary")
+        path = os.path.join(dir_path, self.key)
+
+        def load(suffix):
+            return np.load(f"{path}{suffix}", mmap_mode="r")
+
+        self.values = load(".npy") if self.kind == "number" else None
+        self.codes = load(".codes.npy") if self.kind in ("category", "multi") else None
+        self.offsets = load(".offsets.npy") if self.kind in ("multi", "text", "text_list") else None
+        self.items = load(".items.npy") if self.kind == "text_list" else None
+        self.blob = load(".utf8.npy") if self.kind in ("text", "text_list") else None
+
+    def _strings(self, starts: np.ndarray) -> List[str]:
+        """Strings between consecutive byte offsets."""
+        base = int(starts[0])
+        data = self.blob[base: int(starts[-1])].tobytes()
+        bounds = (np.asarray(starts) - base).tolist()
+        return [data[a:b].decode("utf-8") for a, b in zip(bounds, bounds[1:])]
+
+    def decode(self, start: int, stop: int) -> List[Any]:
+        """Python values of rows start..stop (missing rows decode to their empty value)."""
+        if self.kind == "number":
+            return [None if np.isnan(v) else number_value(v) for v in self.values[start:stop].tolist()]
+        if self.kind == "category":
+            return [self.dictionary[c] if c >= 0 else None for c in self.codes[start:stop].tolist()]
+        if self.kind == "multi":
+            bounds = self.offsets[start: stop + 1].tolist()
+            codes = self.codes[bounds[0]: bounds[-1]].tolist()
+            base = bounds[0]
+            return [[self.dictionary[c] for c in codes[a - base: b - base]] for a, b in zip(bounds, bounds[1:])]
+        if self.kind == "text":
+            return self._strings(self.offsets[start: stop + 1])
+        bounds = self.offsets[start: stop + 1].tolist()
+        items = self._strings(self.items[bounds[0]: bounds[-1] + 1])
+        base = bounds[0]
+        return [items[a - base: b - base] for a, b in zip(bounds, bounds[1:])]
+
+
+def number_value(value: float):
+    """Stored float back to the value written: whole numbers were ints (see _ColumnWriter.accepts)."""
+    return int(value) if float(value).is_integer() else value
+
+
+class ProfileSnapshot:
+    """Read side: memory-mapped columns plus an id -> row index."""
+
+    def __init__(self, dir_path: str, meta: Dict[str, Any], ids: List[str], present: np.ndarray):
+        self.dir_path = dir_path
+        self.meta = meta
+        self.ids = ids
+        self.row_of = {uid: i for i, uid in enumerate(ids)}
+        self.present = present
+        self.columns = {c["key"]: _Column(dir_path, c, j) for j, c in enumerate(meta["columns"])}
+        self._tables = {}  # column key -> (embedder, per-entry vector sums, token counts)
+
+    @classmethod
+    def open(cls, dir_path: str) -> "ProfileSnapshot":
+        with open(os.path.join(dir_path, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(os.path.join(dir_path, IDS_FILE), "r", encoding="utf-8") as f:
+            ids = [line.rstrip("\n") for line in f]
+        present = np.load(os.path.join(dir_path, PRESENT_FILE), mmap_mode="r")
+        if not (len(ids) == present.shape[0] == meta["count"]):
+            raise ValueError(f"Snapshot at {dir_path} is inconsistent (ids/rows/meta disagree).")
+        return cls(dir_path, meta, ids, present)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def decode(self, start: int = 0, stop: int = None) -> List[Dict[str, Any]]:
+        """Profiles of rows start..stop, as they were written."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        profiles = [{} for _ in range(start, stop)]
+        present = np.asarray(self.present[start:stop])
+        for col in self.columns.values():
+            has = present[:, col.index]
+            if not has.any():
+                continue
+            for i, v in enumerate(col.decode(start, stop)):
+                if not has[i]:
+                    continue
+                if col.key == EXTRA_COLUMN:
+                    profiles[i].update(json.loads(v))
+                else:
+                    profiles[i][col.key] = v
+        return profiles
+
+    def profile(self, user_id: str) -> Dict[str, Any]:
+        row = self.row_of[user_id]
+        return self.decode(row, row + 1)[0]
+
+    def iter_profiles(self, block_rows: int = SNAPSHOT_BLOCK_ROWS) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for start in range(0, len(self), block_rows):
+            yield from zip(self.ids[start: start + block_rows], self.decode(start, start + block_rows))
+
+    # ---- embedding straight from the columns ----
+
+    def _dictionary_sums(self, col: _Column, embedder):
+        cached = self._tables.get(col.key)
+        if cached is None or cached[0] is not embedder:
+            cached = (embedder,) + embedder.embed_batch_sums(col.dictionary)
+            self._tables[col.key] = cached
+        return cached[1], cached[2]
+
+    def _field_sums(self, col: _Column, embedder, start: int, stop: int, has: np.ndarray):
+        """(n, dim) in-vocab token vector sums and (n,) token counts of one column for rows start..stop."""
+        if col.kind == "category":
+            sums, counts = self._dictionary_sums(col, embedder)
+            codes = np.asarray(col.codes[start:stop])
+            codes = np.where(has, codes, 0)
+            return sums[codes] * has[:, None], counts[codes] * has
+        if col.kind == "multi":
+            sums, counts = self._dictionary_sums(col, embedder)
+            bounds = np.asarray(col.offsets[start: stop + 1])
+            codes = np.asarray(col.codes[bounds[0]: bounds[-1]])
+            lengths = np.diff(bounds)
+            return _segment_sums(sums[codes], lengths), _segment_sums(counts[codes], lengths)
+        if col.kind == "number":
+            values = np.asarray(col.values[start:stop])
+            uniq, inverse = np.unique(np.where(has, values, 0), return_inverse=True)
+            sums, counts = embedder.embed_batch_sums([number_text(v) for v in uniq.tolist()])
+            return sums[inverse] * has[:, None], counts[inverse] * has
+        # free text (location, bio, ...): decoded and tokenized as usual
+        return embedder.embed_batch_sums([field_text(v) if h else "" for v, h in zip(col.decode(start, stop), has)])
+
+    def embed_fields(self, embedder, variables: List[Dict[str, Any]], start: int = 0, stop: int = None):
+        """
+        Same as embed_user_fields(decode(start, stop), ...): (n, n_fields, dim)
+        float32 field vectors and (n, n_fields) presence, fields ordered as
+        embedding_fields(variables).
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        fields = embedding_fields(variables)
+        n = stop - start
+        field_vecs = np.zeros((n, len(fields), embedder.vector_size), dtype=np.float32)
+        present = np.zeros((n, len(fields)), dtype=bool)
+        block_present = np.asarray(self.present[start:stop])
+        for j, v in enumerate(fields):
+            col = self.columns.get(v["key"])
+            if col is None:
+                continue
+            has = block_present[:, col.index]
+            sums, counts = self._field_sums(col, embedder, start, stop, has)
+            nonempty = counts > 0
+            field_vecs[nonempty, j] = sums[nonempty] / counts[nonempty, None]
+            present[:, j] = has
+
+        # values kept verbatim in _extra (wrong type, unknown key) take the generic path
+        extra = self.columns[EXTRA_COLUMN]
+        rows = np.flatnonzero(block_present[:, extra.index])
+        keys = {v["key"]: j for j, v in enumerate(fields)}
+        for i in rows.tolist():
+            for key, val in json.loads(extra.decode(start + i, start + i + 1)[0]).items():
+                j = keys.get(key)
+                if j is not None:
+                    field_vecs[i, j] = embedder.embed_batch([field_text(val)])[0]
+                    present[i, j] = True
+        return field_vecs, present
+
+    def iter_embedded(self, embedder, variables: List[Dict[str, Any]], block_rows: int = SNAPSHOT_BLOCK_ROWS):
+        """(ids, field_vecs, present) block by block."""
+        for start in range(0, len(self), block_rows):
+            stop = min(start + block_rows, len(self))
+            yield (self.ids[start:stop],) + self.embed_fields(embedder, variables, start, stop)
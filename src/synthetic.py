@@ -0,0 +1,185 @@
+# src/synthetic.py
+"""
+Deterministic synthetic profiles for load tests and benchmarks.
+
+Every field of config/catalogs.QUESTIONS is filled the way chat.py would
+(select -> one option, multiselect -> several, numbers within min/max,
+projects as "Title | Role | summary"). Options are drawn with Zipf-like
+popularity and each domain has its own skill / industry / role preferences,
+so the profiles cluster like real ones instead of being uniform noise.
+
+Profile i depends only on (seed, i): any slice can be generated on its own,
+in any order or process, and is identical on every run.
+"""
+import random
+import zlib
+from itertools import accumulate
+from typing import Any, Dict, Iterator, List
+
+from config.catalogs import (
+    DOMAIN_OPTIONS,
+    HOBBY_CATALOG,
+    INDUSTRY_OPTIONS,
+    LANGUAGE_OPTIONS,
+    PREFERRED_ROLES,
+    QUESTIONS,
+    SKILL_CATALOG,
+)
+
+FIRST_NAMES = [
+    "Aarav", "Ananya", "Rohan", "Priya", "Vikram", "Sneha", "Arjun", "Kavya", "Ishaan", "Meera",
+    "Aditya", "Diya", "Kabir", "Saanvi", "Rahul", "Nisha", "Karan", "Pooja", "Sameer", "Riya",
+    "Alex", "Maria", "John", "Sofia", "Liam", "Emma", "Noah", "Olivia", "Lucas", "Mia",
+]
+LAST_NAMES = [
+    "Sharma", "Verma", "Gupta", "Singh", "Patel", "Reddy", "Iyer", "Nair", "Mehta", "Joshi",
+    "Bhatt", "Kapoor", "Das", "Rao", "Chopra", "Smith", "Garcia", "Müller", "Rossi", "Kim",
+]
+LOCATIONS = [
+    "Delhi India", "Mumbai India", "Bengaluru India", "Hyderabad India", "Pune India", "Chennai India",
+    "Dehradun India", "Kolkata India", "Jaipur India", "Ahmedabad India", "London UK", "Berlin Germany",
+    "San Francisco USA", "New York USA", "Singapore", "Dubai UAE", "Toronto Canada", "Sydney Australia",
+]
+PROJECT_TITLES = [
+    "Crop Yield Predictor", "Campus Marketplace", "Clinic Scheduler", "Fraud Detection Pipeline",
+    "Open Data Portal", "Chat Support Bot", "Inventory Tracker", "Portfolio Website", "Fitness Tracker App",
+    "Recommendation Engine", "IoT Air Monitor", "Payments Dashboard",
+]
+BIO_TEMPLATES = [
+    "{role} in {domain} who loves {skill}",
+    "{domain} {role} building with {skill}",
+    "Curious {role} exploring {skill} and {hobby}",
+    "{skill} enthusiast working across {domain}",
+]
+# share of profiles that leave an optional field empty
+OPTIONAL_SKIP_RATE = 0.15
+
+
+def _zipf_weights(n: int, s: float = 1.1) -> List[float]:
+    return [1.0 / (rank + 1) ** s for rank in range(n)]
+
+
+class _Popularity:
+    """Cumulative Zipf weights over a fixed (seeded) ordering of the options."""
+
+    def __init__(self, options: List[str], seed: int):
+        self.options = list(options)
+        random.Random(seed).shuffle(self.options)
+        self.cum_weights = list(accumulate(_zipf_weights(len(self.options))))
+
+    def one(self, rng: random.Random) -> str:
+        return rng.choices(self.options, cum_weights=self.cum_weights)[0]
+
+    def some(self, rng: random.Random, k: int) -> List[str]:
+        picked = []
+        for _ in range(4 * k):  # rejection sampling without replacement; a few retries are plenty
+            if len(picked) == k:
+                break
+            item = self.one(rng)
+            if item not in picked:
+                picked.append(item)
+        return picked
+
+
+class ProfileGenerator:
+    """generate(i) -> the i-th profile of this seed, shaped like chat.py output."""
+
+    def __init__(self, seed: int = 42):
+        self.seed = seed
+        self.questions = QUESTIONS
+        self._popularity = {
+            # crc32, not hash(): str hashes are salted per process
+            q["key"]: _Popularity(q["options"], zlib.crc32(f"{seed}:{q['key']}".encode("utf-8")))
+            for q in QUESTIONS if "options" in q
+        }
+        # per-domain preferences make the profiles cluster
+        self._by_domain = {
+            d: {
+                "skills": _Popularity(SKILL_CATALOG, seed * 1000 + i),
+                "industry_experience": _Popularity(INDUSTRY_OPTIONS, seed * 1000 + 100 + i),
+                "preferred_roles_in_projects": _Popularity(PREFERRED_ROLES, seed * 1000 + 200 + i),
+            }
+            for i, d in enumerate(DOMAIN_OPTIONS)
+        }
+        self._languages = _Popularity(LANGUAGE_OPTIONS, seed + 7)
+        self._locations = _Popularity(LOCATIONS, seed + 11)
+
+    def _rng(self, i: int) -> random.Random:
+        return random.Random((self.seed << 40) + i)
+
+    def generate(self, i: int) -> Dict[str, Any]:
+        rng = self._rng(i)
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        domain = self._popularity["domain"].one(rng)
+        prefs = self._by_domain[domain]
+        age = rng.randint(18, 60)
+        profile = {}
+        for q in self.questions:
+            key, qtype = q["key"], q["type"]
+            if q.get("optional") and rng.random() < OPTIONAL_SKIP_RATE:
+                continue
+            if key == "domain":
+                value = domain
+            elif qtype == "select":
+                value = self._popularity[key].one(rng)
+            elif qtype in ("multiselect", "searchable_multiselect"):
+                value = self._multi(rng, q, prefs)
+            elif qtype == "number":
+                value = self._number(rng, key, q, age)
+            elif qtype == "structured_projects":
+                value = [
+                    f"{rng.choice(PROJECT_TITLES)} | {rng.choice(PREFERRED_ROLES)} | Built with {rng.choice(SKILL_CATALOG)}"
+                    for _ in range(rng.randint(0, q.get("max_projects", 3)))
+                ]
+            else:
+                value = self._text(rng, key, first, last, i, profile)
+            profile[key] = value
+        return profile
+
+    def _multi(self, rng: random.Random, q: dict, prefs: dict) -> List[str]:
+        key = q["key"]
+        popularity = prefs.get(key) or (self._languages if key == "languages_spoken" else self._popularity[key])
+        low = max(1, q.get("min_selection", 1))
+        high = {"skills": 8, "interests_hobbies": 5}.get(key, 3)
+        high = min(high, q.get("max_selections", high), len(q["options"]))
+        return popularity.some(rng, rng.randint(low, max(low, high)))
+
+    @staticmethod
+    def _number(rng: random.Random, key: str, q: dict, age: int) -> int:
+        if key == "age":
+            return age
+        if key == "experience":
+            return rng.randint(0, max(0, age - 18))
+        return rng.randint(q.get("min", 0), min(q.get("max", 100), 40))
+
+    def _text(self, rng: random.Random, key: str, first: str, last: str, i: int, profile: dict) -> str:
+        handle = f"{first}{last}{i}".lower()
+        if key == "name":
+            return f"{first} {last}"
+        if key == "preferred_name":
+            return first
+        if key == "location":
+            return self._locations.one(rng)
+        if key == "email":
+            return f"{handle}@example.com"
+        if key == "linkedin":
+            return f"https://linkedin.com/in/{handle}"
+        if key == "github":
+            return f"https://github.com/{handle}"
+        if key == "portfolio":
+            return f"https://{handle}.example.com"
+        if key == "one_line_bio":
+            return rng.choice(BIO_TEMPLATES).format(
+                role=profile.get("role", "Builder"),
+                domain=profile.get("domain", "tech"),
+                skill=rng.choice(profile.get("skills") or SKILL_CATALOG),
+                hobby=rng.choice(HOBBY_CATALOG),
+            )[:120]
+        return ""
+
+
+def iter_synthetic_profiles(count: int, seed: int = 42, start: int = 0) -> Iterator[Dict[str, Any]]:
+    """Profiles start .. start + count - 1 of `seed`."""
+    generator = ProfileGenerator(seed)
+    for i in range(start, start + count):
+        yield generator.generate(i)
@@ -0,0 +1,76 @@
+# src/topk.py
+"""
+Blocked top-k over unit vectors, shared by the local index, the precomputed
+matches and the reciprocal matcher.
+
+Queries are scored QUERY_BLOCK_SIZE at a time against CANDIDATE_BLOCK_SIZE
+candidate rows per float32 matmul; each block is cut to its best k with
+argpartition and merged into the running best k, so the (b, N) score matrix
+is never built.
+"""
+import numpy as np
+
+# query rows scored together, and candidate rows per matrix multiply
+QUERY_BLOCK_SIZE = 256
+CANDIDATE_BLOCK_SIZE = 65536
+
+
+def block_top_k(rows: np.ndarray, scores: np.ndarray, k: int):
+    """Best k of a (b, m) score block, rows (m,) or (b, m): ((b, k) rows, (b, k) scores), unsorted."""
+    rows = np.broadcast_to(rows, scores.shape)
+    m = scores.shape[1]
+    if m <= k:
+        return rows, scores
+    part = np.argpartition(scores, m - k, axis=1)[:, m - k:]
+    return np.take_along_axis(rows, part, axis=1), np.take_along_axis(scores, part, axis=1)
+
+
+def merge_top_k(best_rows: np.ndarray, best_scores: np.ndarray, rows: np.ndarray, scores: np.ndarray, k: int):
+    """Fold a new (b, m) score block into the running best k."""
+    block_rows, block_scores = block_top_k(rows, scores, k)
+    if not best_rows.shape[1]:
+        return block_rows, block_scores
+    return block_top_k(
+        np.concatenate([best_rows, block_rows], axis=1), np.concatenate([best_scores, block_scores], axis=1), k
+    )
+
+
+def finish_top_k(best_rows: np.ndarray, best_scores: np.ndarray, k: int, q_rows: np.ndarray = None):
+    """
+    Sort best first, drop each query's own row (q_rows, if given) and cut to k,
+    padding with -1 / -inf when there were fewer than k candidates.
+    """
+    order = np.argsort(-best_scores, axis=1, kind="stable")
+    best_rows = np.take_along_axis(best_rows, order, axis=1)
+    best_scores = np.take_along_axis(best_scores, order, axis=1)
+    if q_rows is not None:
+        # move the query's own row (if present) to the end, as padding: with
+        # fewer than k other candidates it would otherwise survive the cut
+        own = best_rows == q_rows[:, None]
+        order = np.argsort(own, axis=1, kind="stable")
+        own = np.take_along_axis(own, order, axis=1)
+        best_rows = np.where(own, -1, np.take_along_axis(best_rows, order, axis=1))
+        best_scores = np.where(own, np.float32(-np.inf), np.take_along_axis(best_scores, order, axis=1))
+    best_rows, best_scores = best_rows[:, :k], best_scores[:, :k]
+    if best_rows.shape[1] < k:
+        pad = k - best_rows.shape[1]
+        best_rows = np.pad(best_rows, ((0, 0), (0, pad)), constant_values=-1)
+        best_scores = np.pad(best_scores, ((0, 0), (0, pad)), constant_values=-np.inf)
+    return best_rows, best_scores
+
+
+def top_k_rows(Q: np.ndarray, q_rows: np.ndarray, vectors: np.ndarray, k: int):
+    """
+    Best k rows of `vectors` for each unit query in Q, excluding the query's own
+    row (q_rows). Returns ((b, k) int64 rows, (b, k) float32 scores), best
+    first, padded with -1 / -inf.
+    """
+    kk = k + 1  # room to drop the query itself
+    b = len(Q)
+    best_rows = np.empty((b, 0), dtype=np.int64)
+    best_scores = np.empty((b, 0), dtype=np.float32)
+    for start in range(0, len(vectors), CANDIDATE_BLOCK_SIZE):
+        scores = Q @ np.asarray(vectors[start: start + CANDIDATE_BLOCK_SIZE]).T
+        rows = np.arange(start, start + scores.shape[1])
+        best_rows, best_scores = merge_top_k(best_rows, best_scores, rows, scores, kk)
+    return finish_top_k(best_rows, best_scores, k, q_rows)
@@ -0,0 +1,36 @@
+# src/vector_backend.py
+"""
+Pick the vector index backend from the VECTOR_BACKEND env var.
+
+Both backends expose the same module-level functions:
+    ensure_index_exists(api_key, index_name, vector_dim, region)
+    upsert_users(index, user_vectors)
+    query_similar(index, query_vector, top_k)
+
+- "pinecone" (default): src/pinecone_client.py, needs network + API key
+- "local":              src/local_index.py, in-process NumPy index
+- "shared":             src/shared_index.py, mmap'd NumPy index shared by all
+                        processes on the host (one copy for every uvicorn worker)
+"""
+import os
+
+BACKENDS = ("pinecone", "local", "shared")
+
+
+def backend_name(name: str = None) -> str:
+    name = (name or os.getenv("VECTOR_BACKEND", "pinecone")).strip().lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown VECTOR_BACKEND '{name}'. Expected one of {BACKENDS}.")
+    return name
+
+
+def get_index_client(name: str = None):
+    """Return the client module for the selected backend (imported lazily)."""
+    name = backend_name(name)
+    if name == "local":
+        from src import local_index as client
+    elif name == "shared":
+        from src import shared_index as client
+    else:
+        from src import pinecone_client as client
+    return client
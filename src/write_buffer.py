@@ -0,0 +1,245 @@
+# src/write_buffer.py
+"""
+Write-behind upsert buffer in front of an AsyncIndexClient.
+
+    index = BufferedIndexClient(AsyncIndexClient(client, raw_index), max_batch=100, max_age=0.05)
+    await index.upsert_users([doc])        # queued, returns at once
+    await index.query_similar(vec, 10)     # index results + buffered vectors
+
+Upserts from concurrent requests are coalesced and sent as one upsert call
+when `max_batch` vectors are queued or the oldest has waited `max_age`
+seconds, so a burst of N sign-ups costs ~N / max_batch index calls instead of N.
+
+Read-your-writes: until a buffered vector has been flushed, and for `linger`
+seconds after that (Pinecone is eventually consistent), every query scores it
+exactly (dot product with the unit query) and merges it into the index's
+results. fetch_vectors() sees it too. Ids served from the buffer replace any
+copy the index returns, so nothing is counted twice.
+
+A failed flush puts its vectors back in the queue (they are retried with the
+next flush, `max_retries` times at most). Past `max_pending` queued vectors
+upsert_users() raises Overloaded. Shut down with aclose(): close() on its own
+refuses to drop queued vectors. All state is only touched from the event
+loop thread.
+"""
+import asyncio
+import time
+from collections import deque
+
+import numpy as np
+
+from src.executors import Overloaded
+from src.metadata_filter import matches_filter
+
+
+class BufferedIndexClient:
+    def __init__(
+        self, inner, max_batch: int = 100, max_age: float = 0.05, max_pending: int = 5000,
+        linger: float = 5.0, max_retries: int = 3,
+    ):
+        self.inner = inner
+        self.max_batch = max_batch
+        self.max_age = max_age
+        self.max_pending = max_pending
+        self.linger = linger
+        self.max_retries = max_retries
+
+        self._pending = {}       # id -> doc, in arrival order
+        self._attempts = {}      # id -> failed flushes so far
+        self._visible = {}       # id -> (unit vector, raw vector, metadata)
+        self._expiry = deque()   # (flushed_at, id) of flushed entries still visible
+        self._flushed_at = {}    # id -> latest flush time (a re-upsert extends visibility)
+        self._matrix = None      # cached (ids, unit rows, metadata) of _visible
+        self._timer = None
+        self._tasks = set()
+        self.upsert_calls = 0
+        self.vectors_flushed = 0
+        self.failures = 0
+        self.dropped = 0
+        self.flushes = {"size": 0, "age": 0, "drain": 0}
+
+    # the AsyncIndexClient attributes the API reads
+    @property
+    def client(self):
+        return self.inner.client
+
+    @property
+    def index(self):
+        return self.inner.index
+
+    @property
+    def pool(self):
+        return self.inner.pool
+
+    # ----------------- writes -----------------
+
+    async def upsert_users(self, user_vectors):
+        """Queue the docs ({"id", "vector", "metadata"}); they're visible to queries right away."""
+        if len(self._pending) + len(user_vectors) > self.max_pending:
+            raise Overloaded(f"write buffer is full ({len(self._pending)} vectors pending).")
+        for doc in user_vectors:
+            vec = np.asarray(doc["vector"], dtype=np.float32)
+            norm = np.linalg.norm(vec)
+            self._pending.pop(doc["id"], None)  # re-queue at the end
+            self._pending[doc["id"]] = doc
+            self._visible[doc["id"]] = (vec / norm if norm > 0 else vec, vec, doc.get("metadata") or {})
+        self._matrix = None
+
+        if len(self._pending) >= self.max_batch:
+            self._start_flush("size")
+        elif self._timer is None and self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.max_age, self._start_flush, "age")
+
+    def _start_flush(self, reason: str):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            ids = list(self._pending)[: self.max_batch]
+            batch = [self._pending.pop(uid) for uid in ids]
+            task = asyncio.create_task(self._flush(batch, reason))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            if reason != "drain" and len(self._pending) < self.max_batch:
+                break  # the rest waits for more docs or its own timer
+        if self._pending and self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_age, self._start_flush, "age")
+
+    async def _flush(self, batch, reason: str):
+        self.upsert_calls += 1
+        try:
+            await self.inner.upsert_users(batch)
+        except Exception as e:
+            self.failures += 1
+            self._requeue(batch, e)
+            return
+        self.flushes[reason] += 1
+        self.vectors_flushed += len(batch)
+        now = time.monotonic()
+        for doc in batch:
+            self._attempts.pop(doc["id"], None)
+            self._flushed_at[doc["id"]] = now
+            self._expiry.append((now, doc["id"]))
+        self._expire(now)
+
+    def _requeue(self, batch, error: Exception):
+        """Put a failed batch back in the queue, minus docs that failed too often or were re-upserted meanwhile."""
+        for doc in batch:
+            uid = doc["id"]
+            if uid in self._pending:
+                continue  # a newer version is already queued
+            self._attempts[uid] = self._attempts.get(uid, 0) + 1
+            if self._attempts[uid] > self.max_retries:
+                self._attempts.pop(uid)
+                self._visible.pop(uid, None)
+                self._matrix = None
+                self.dropped += 1
+                print(f"⚠️ Dropping buffered upsert for {uid} after {self.max_retries} retries: {error!r}")
+                continue
+            self._pending[uid] = doc
+        print(f"⚠️ Flush of {len(batch)} buffered upserts failed, will retry: {error!r}")
+        if self._pending and self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_age, self._start_flush, "age")
+
+    def _expire(self, now: float):
+        while self._expiry and self._expiry[0][0] <= now - self.linger:
+            flushed_at, uid = self._expiry.popleft()
+            # still queued again, or flushed again later: keep it
+            if uid not in self._pending and self._flushed_at.get(uid) == flushed_at:
+                del self._flushed_at[uid]
+                self._visible.pop(uid, None)
+                self._matrix = None
+
+    async def drain(self):
+        """
+        Flush everything queued and wait for in-flight flushes (call before
+        shutdown). Failed vectors are retried straight away until they land or
+        run out of retries, so this always ends with nothing pending.
+        """
+        while self._pending or self._tasks:
+            self._start_flush("drain")
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    async def aclose(self):
+        """drain(), then close()."""
+        await self.drain()
+        self.close()
+
+    # ----------------- reads -----------------
+
+    def _buffered(self):
+        """(ids, unit rows, metadata) of the vectors queries must see from the buffer."""
+        self._expire(time.monotonic())
+        if self._matrix is None and self._visible:
+            ids = list(self._visible)
+            entries = [self._visible[uid] for uid in ids]
+            self._matrix = (ids, np.stack([e[0] for e in entries]), [e[2] for e in entries])
+        return self._matrix
+
+    def _merge(self, res, scores: np.ndarray, buffered, top_k: int, filter: dict = None):
+        """Index result + the best buffered vectors, best first, top_k at most."""
+        ids, _, metadata = buffered
+        rows = np.arange(len(ids))
+        if filter is not None:
+            rows = np.array([r for r in rows if matches_filter(metadata[r], filter)], dtype=np.int64)
+        if len(rows) > top_k:
+            rows = rows[np.argpartition(-scores[rows], top_k - 1)[:top_k]]
+        matches = [m for m in res["matches"] if m["id"] not in self._visible]
+        matches += [{"id": ids[r], "score": float(scores[r]), "metadata": metadata[r]} for r in rows]
+        matches.sort(key=lambda m: m["score"], reverse=True)
+        return {"matches": matches[:top_k]}
+
+    async def query_similar(self, query_vector, top_k=5, filter=None):
+        res = await self.inner.query_similar(query_vector, top_k, filter=filter)
+        buffered = self._buffered()
+        q = np.asarray(query_vector, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(q)
+        if buffered is None or norm == 0:
+            return res
+        return self._merge(res, buffered[1] @ (q / norm), buffered, top_k, filter)
+
+    async def query_similar_batch(self, query_vectors, top_k=5, filter=None):
+        results = await self.inner.query_similar_batch(query_vectors, top_k, filter=filter)
+        buffered = self._buffered()
+        if buffered is None:
+            return results
+        Q = np.asarray(query_vectors, dtype=np.float32)
+        norms = np.linalg.norm(Q, axis=1)
+        scores = (Q / np.where(norms > 0, norms, 1.0)[:, None]) @ buffered[1].T
+        return [
+            self._merge(res, scores[i], buffered, top_k, filter) if norms[i] > 0 else res
+            for i, res in enumerate(results)
+        ]
+
+    async def fetch_vectors(self, ids):
+        found = {uid: self._visible[uid][1] for uid in ids if uid in self._visible}
+        missing = [uid for uid in ids if uid not in found]
+        if missing:
+            found.update(await self.inner.fetch_vectors(missing))
+        return found
+
+    def stats(self) -> dict:
+        self._expire(time.monotonic())
+        return {
+            "pending": len(self._pending),
+            "visible": len(self._visible),
+            "upsert_calls": self.upsert_calls,
+            "vectors_flushed": self.vectors_flushed,
+            "failures": self.failures,
+            "dropped": self.dropped,
+            "flushes": dict(self.flushes),
+        }
+
+    def close(self):
+        """Close the underlying client; refuses while vectors are queued or in flight (use aclose())."""
+        if self._pending or self._tasks:
+            raise RuntimeError(
+                f"write buffer still holds {len(self._pending)} queued vectors and {len(self._tasks)} flushes; drain() first."
+            )
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self.inner.close()
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from config.variables import VARIABLES
+from src.embedding_cache import LRUCache
+from src.embeddings import InferenceEmbedder, build_weighted_user_vector, build_weighted_user_vectors, field_text
+from src.utils import text_to_tokens
+
+TEXTS = [
+    "Python and Machine Learning",
+    "",
+    "zzz qqq",                               # no token in the vocabulary
+    "python PYTHON python, data!",          # repeats and punctuation
+    "Delhi India",
+    "data",
+]
+PROFILES = [
+    {"role": "Student", "domain": "Computer Science", "skills": ["Python", "Machine Learning"], "location": "Delhi India"},
+    {"role": "Mentor", "skills": [], "one_line_bio": "zzz qqq"},
+    {"skills": ["Data"], "experience": 4, "offers": ["Mentorship"]},
+]
+
+
+def _embedder(texts, dim=8):
+    vocab = sorted({t for text in texts for t in text_to_tokens(text)} - {"zzz", "qqq"})
+    vectors = np.random.default_rng(0).standard_normal((len(vocab), dim)).astype(np.float32)
+    return InferenceEmbedder(vocab, vectors)
+
+
+def test_embed_batch_matches_embed_text_row_by_row():
+    embedder = _embedder(TEXTS)
+    batch = embedder.embed_batch(TEXTS)
+    assert batch.shape == (len(TEXTS), embedder.vector_size) and batch.dtype == np.float32
+    for row, text in zip(batch, TEXTS):
+        np.testing.assert_allclose(row, embedder.embed_text(text), rtol=1e-5, atol=1e-6)
+    assert not batch[1].any() and not batch[2].any()
+
+
+def test_embed_batch_of_nothing():
+    assert _embedder(TEXTS).embed_batch([]).shape == (0, 8)
+
+
+@pytest.mark.parametrize("chunk", [1, 2, 3])
+def test_batched_user_vectors_match_one_by_one(chunk):
+    embedder = _embedder(TEXTS + ["Student Mentor Computer Science Mentorship"])
+    want = np.stack([build_weighted_user_vector(p, embedder, VARIABLES) for p in PROFILES])
+    got = np.concatenate([
+        build_weighted_user_vectors(PROFILES[s: s + chunk], embedder, VARIABLES) for s in range(0, len(PROFILES), chunk)
+    ])
+    np.testing.assert_allclose(got, want, rtol=1e-5, atol=1e-6)
+
+
+def test_catalog_options_come_from_the_option_table():
+    embedder = _embedder(TEXTS)
+    embedder.build_option_table(["Python", "Machine Learning", "Data"])
+    value = ["Python", "Machine Learning"]
+    np.testing.assert_allclose(embedder.embed_field(value), embedder.embed_text(field_text(value)), rtol=1e-5, atol=1e-6)
+    assert embedder.option_table.stats()["hits"] == 2
+    assert embedder.text_cache.stats() == {"hits": 0, "misses": 0, "size": 0, "maxsize": 4096}
+
+
+def test_free_text_is_embedded_once_then_served_from_the_lru_cache():
+    embedder = _embedder(TEXTS)
+    embedder.build_option_table(["Data"])
+    first = embedder.embed_field("python PYTHON python, data!")
+    second = embedder.embed_field("python PYTHON python, data!")
+    np.testing.assert_array_equal(first, second)
+    np.testing.assert_allclose(first, embedder.embed_text("python PYTHON python, data!"), rtol=1e-5, atol=1e-6)
+    assert embedder.text_cache.stats()["misses"] == 1 and embedder.text_cache.stats()["hits"] == 1
+    # a mixed list: options from the table, the rest from the cache
+    mixed = ["Data", "Delhi India"]
+    np.testing.assert_allclose(embedder.embed_field(mixed), embedder.embed_text(field_text(mixed)), rtol=1e-5, atol=1e-6)
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the oldest
+    cache.put("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats() == {"hits": 3, "misses": 1, "size": 2, "maxsize": 2}
+
+    off = LRUCache(maxsize=0)
+    off.put("a", 1)
+    assert off.get("a") is None and len(off) == 0
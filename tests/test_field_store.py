@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from config.variables import VARIABLES
+from src.embeddings import (
+    InferenceEmbedder,
+    build_weighted_user_vector,
+    check_weight_overrides,
+    embed_user_fields,
+    embedding_fields,
+    field_text,
+    field_weights,
+)
+from src import field_store
+from src.field_store import FieldStoreWriter, FieldVectorStore
+from src.utils import text_to_tokens
+
+PROFILES = [
+    {"role": "Student", "domain": "Computer Science", "skills": ["Python", "Machine Learning"], "location": "Delhi India"},
+    {"role": "Mentor", "skills": ["Rust"], "one_line_bio": "Systems mentor", "experience": 12},
+    {"offers": ["Mentorship"], "needs": ["Funding"], "interests_hobbies": ["Chess"]},
+    {"role": "Founder", "domain": "Fintech", "needs": ["Developer"], "location": "Mumbai India"},
+    {},
+]
+IDS = [f"user_{i}" for i in range(len(PROFILES))]
+
+
+def _embedder(dim=8):
+    vocab = sorted({t for p in PROFILES for v in p.values() for t in text_to_tokens(field_text(v))})
+    return InferenceEmbedder(vocab, np.random.default_rng(0).standard_normal((len(vocab), dim)).astype(np.float32))
+
+
+@pytest.fixture
+def store(tmp_path):
+    embedder = _embedder()
+    field_vecs, present = embed_user_fields(PROFILES, embedder, VARIABLES)
+    keys = [v["key"] for v in embedding_fields(VARIABLES)]
+    with FieldStoreWriter(str(tmp_path / "fields"), keys, embedder.vector_size) as writer:
+        for start in range(0, len(PROFILES), 2):  # streamed in chunks
+            writer.append(IDS[start: start + 2], field_vecs[start: start + 2], present[start: start + 2],
+                          [{"n": i} for i in range(start, min(start + 2, len(PROFILES)))])
+    return FieldVectorStore.open(str(tmp_path / "fields")), embedder
+
+
+def test_default_vectors_match_build_weighted_user_vector(store):
+    store, embedder = store
+    want = np.stack([build_weighted_user_vector(p, embedder, VARIABLES) for p in PROFILES])
+    np.testing.assert_allclose(store.default_vectors(VARIABLES), want, rtol=1e-5, atol=1e-6)
+    assert store.ids == IDS and len(store) == len(PROFILES)
+
+
+def test_reweighting_matches_a_fresh_embedding_with_new_weights(store):
+    store, embedder = store
+    overrides = {"skills": 5.0, "location": 0.0}
+    variables = [{**v, "default_weight": overrides.get(v["key"], v.get("default_weight", 1.0))} for v in VARIABLES]
+    want = np.stack([build_weighted_user_vector(p, embedder, variables) for p in PROFILES])
+    weights = store.weights_vector({v["key"]: v.get("default_weight", 1.0) for v in embedding_fields(variables)})
+
+    np.testing.assert_allclose(store.combine(weights), want, rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(np.concatenate(list(store.iter_combined(weights, block_rows=2))), want, rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(store.combine(weights, rows=[3, 0]), want[[3, 0]], rtol=1e-5, atol=1e-6)
+
+
+def test_iter_metadata_is_finite(store, tmp_path):
+    store, _ = store
+    assert list(store.iter_metadata()) == [{"n": i} for i in range(len(PROFILES))]
+    (tmp_path / "fields" / field_store.METADATA_FILE).unlink()
+    assert list(store.iter_metadata()) == [{}] * len(PROFILES)
+
+
+def _cosine(a, b):
+    return float(a @ b / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+def test_rescore_is_the_cosine_under_custom_weights(store):
+    store, embedder = store
+    overrides = check_weight_overrides(VARIABLES, {"skills": 3, "needs": 2, "location": 0})
+    weights = field_weights(VARIABLES, overrides)
+    variables = [{**v, "default_weight": float(w)} for v, w in zip(embedding_fields(VARIABLES), weights)]
+    query = build_weighted_user_vector(PROFILES[0], embedder, variables)
+
+    ids, scores = store.rescore(query, ["user_3", "nobody", "user_1", "user_2"], store.weights_vector(
+        dict(zip([v["key"] for v in embedding_fields(VARIABLES)], weights.tolist()))
+    ))
+    assert ids == ["user_3", "user_1", "user_2"]  # unknown ids are left out, order kept
+    want = [_cosine(query, build_weighted_user_vector(PROFILES[int(uid[-1])], embedder, variables)) for uid in ids]
+    np.testing.assert_allclose(scores, want, rtol=1e-5, atol=1e-6)
+
+    # a user with no fields scores 0 instead of NaN
+    assert store.rescore(query, ["user_4"], store.weights_vector(overrides))[1].tolist() == [0.0]
+    assert store.rescore(query, ["nobody"], weights)[0] == []
+
+
+@pytest.mark.parametrize("overrides", [{"not_a_field": 1}, {"skills": -1}, {"skills": "heavy"}, {"skills": float("inf")}])
+def test_bad_weight_overrides_are_rejected(overrides):
+    with pytest.raises(ValueError):
+        check_weight_overrides(VARIABLES, overrides)
+
+
+def test_all_zero_weights_are_rejected():
+    with pytest.raises(ValueError):
+        check_weight_overrides(VARIABLES, {v["key"]: 0 for v in embedding_fields(VARIABLES)})
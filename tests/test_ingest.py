@@ -0,0 +1,23 @@
+import io
+import json
+
+import pytest
+
+from src.ingest import _iter_json_array
+
+MIXED = '[1.5, -1.5,{"a": [1, 2.25e3, "x,]"]}, "s" ,true, null, -0.0, 10, [], {}, 123456789, -7e-2]'
+
+
+@pytest.mark.parametrize("block_size", range(1, 9))
+@pytest.mark.parametrize("text", [MIXED, "[]", " [ ] ", "[\n1\n,\n2\n]"])
+def test_json_array_survives_every_block_boundary(block_size, text):
+    assert list(_iter_json_array(io.StringIO(text), block_size)) == json.loads(text)
+
+
+@pytest.mark.parametrize("block_size", range(1, 9))
+@pytest.mark.parametrize("text", [
+    "[1.5.2]", '[{"a": 1}x]', "[1, 2", "[-]", "{}", "[1 2]", "[1,,2]", "[,1]", "[1,]", '["a" "b"]', "[",
+])
+def test_malformed_json_array_raises_value_error(block_size, text):
+    with pytest.raises(ValueError):
+        list(_iter_json_array(io.StringIO(text), block_size))
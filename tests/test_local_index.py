@@ -0,0 +1,31 @@
+import numpy as np
+
+from src.local_index import IVF_MIN_TRAIN_SIZE, LocalIndex
+
+
+def _vectors(n, dim=16, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+
+def test_ivf_queries_are_exact_until_background_training_finishes():
+    X = _vectors(4 * IVF_MIN_TRAIN_SIZE)
+    index = LocalIndex(X.shape[1], mode="ivf")
+    index.upsert([{"id": str(i), "values": x} for i, x in enumerate(X)])
+    assert index._centroids is None  # upsert returned without running k-means
+
+    # exact search meanwhile: every vector finds itself
+    for i in range(0, len(X), 500):
+        assert index.query(X[i], top_k=1, include_metadata=False)["matches"][0]["id"] == str(i)
+
+    index._trainer.join()
+    assert index._centroids is not None and index._trained_on == len(X)
+    assert index.query(X[7], top_k=1, include_metadata=False)["matches"][0]["id"] == "7"
+
+
+def test_ivf_is_trained_at_load_time():
+    X = _vectors(2 * IVF_MIN_TRAIN_SIZE, seed=1)
+    unit = X / np.linalg.norm(X, axis=1, keepdims=True)
+    index = LocalIndex.from_arrays(
+        [str(i) for i in range(len(X))], unit, np.linalg.norm(X, axis=1), [{}] * len(X), mode="ivf"
+    )
+    assert index._centroids is not None and index._trainer is None
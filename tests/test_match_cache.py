@@ -0,0 +1,71 @@
+import pytest
+
+from config.variables import VARIABLES
+from src import match_cache
+from src.match_cache import MatchCache, cache_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(match_cache, "time", clock)
+    return clock
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = MatchCache(ttl=30, max_staleness=1)
+    cache.put("k", {"matches": [1]})
+    clock.now += 29.9
+    assert cache.get("k") == {"matches": [1]}
+    clock.now += 0.1
+    assert cache.get("k") is None and len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_a_write_makes_older_entries_stale_after_max_staleness(clock):
+    cache = MatchCache(ttl=30, max_staleness=1)
+    cache.put("old", "a")
+    clock.now += 5
+    cache.record_write()
+    cache.put("new", "b")  # created after the write: unaffected by it
+    clock.now += 0.5
+    assert cache.get("old") == "a"  # within the staleness bound
+    clock.now += 0.5
+    assert cache.get("old") is None
+    assert cache.get("new") == "b"
+
+
+def test_zero_staleness_drops_everything_on_write(clock):
+    cache = MatchCache(ttl=30, max_staleness=0)
+    cache.put("k", "a")
+    cache.record_write()
+    assert cache.get("k") is None and cache.bytes == 0
+
+
+def test_size_and_memory_caps_evict_least_recently_used(clock):
+    cache = MatchCache(maxsize=2, ttl=30)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+
+    small = MatchCache(max_bytes=10, ttl=30)
+    small.put("big", "x" * 100)  # larger than the cap: not cached
+    assert len(small) == 0
+
+
+def test_cache_key_ignores_fields_that_are_not_embedded():
+    profile = {"role": "Student", "skills": ["Python"]}
+    key = cache_key(profile, VARIABLES, 10, "v1")
+    assert key == cache_key({**profile, "unrelated": "x", "location": None}, VARIABLES, 10, "v1")
+    assert key != cache_key(profile, VARIABLES, 5, "v1")
+    assert key != cache_key(profile, VARIABLES, 10, "v2")
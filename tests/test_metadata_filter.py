@@ -0,0 +1,24 @@
+import pytest
+
+from src.metadata_filter import validate_filter
+
+
+@pytest.mark.parametrize("expr", [
+    {"location": "Delhi India"},
+    {"location": {"$ne": "Mumbai India"}},
+    {"location": {"$eq": "Delhi India"}},
+    {"$or": [{"needs": "Mentor"}, {"offers": {"$in": ["Funding"]}}]},
+])
+def test_valid_filters_pass(expr):
+    assert validate_filter(expr) is expr
+
+
+@pytest.mark.parametrize("expr", [
+    {"skills": ["Python"]},
+    {"location": None},
+    {"$and": [{"needs": {"$eq": ["Mentor"]}}]},
+    {"location": {"$ne": None}},
+])
+def test_shorthand_and_eq_take_a_single_scalar(expr):
+    with pytest.raises(ValueError):
+        validate_filter(expr)
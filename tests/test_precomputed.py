@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from config.variables import VARIABLES
+from scripts import precompute_matches
+from src import topk
+from src.embeddings import embedding_fields
+from src.field_store import FieldStoreWriter
+from src.precomputed import PrecomputedMatches
+from src.topk import top_k_rows
+
+
+@pytest.mark.parametrize("block", [3, 65536])
+def test_top_k_rows_matches_brute_force(monkeypatch, block):
+    monkeypatch.setattr(topk, "CANDIDATE_BLOCK_SIZE", block)
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((40, 6)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    q_rows = np.arange(0, 40, 3)
+    rows, scores = top_k_rows(vectors[q_rows], q_rows, vectors, 5)
+    full = vectors[q_rows] @ vectors.T
+    full[np.arange(len(q_rows)), q_rows] = -np.inf  # the query itself never counts
+    np.testing.assert_allclose(scores, -np.sort(-full, axis=1)[:, :5], rtol=1e-6)
+    np.testing.assert_allclose(np.take_along_axis(full, rows, axis=1), scores, rtol=1e-6)
+
+    # fewer candidates than k: padded with -1 / -inf
+    rows, scores = top_k_rows(vectors[:1], np.array([0]), vectors[:3], 5)
+    assert rows[0, 2:].tolist() == [-1, -1, -1] and np.isneginf(scores[0, 2:]).all()
+
+
+def _field_store(path, n, seed):
+    keys = [v["key"] for v in embedding_fields(VARIABLES)]
+    rng = np.random.default_rng(seed)
+    with FieldStoreWriter(str(path), keys, 8) as writer:
+        writer.append([f"user_{i}" for i in range(n)], rng.standard_normal((n, len(keys), 8)).astype(np.float32),
+                      np.ones((n, len(keys)), dtype=bool), [{"i": i, "seed": seed} for i in range(n)])
+    return str(path)
+
+
+def _run(tmp_path, seed, *extra):
+    store = _field_store(tmp_path / f"fields_{seed}", 30, seed)
+    precompute_matches.main(precompute_matches.parse_args(
+        ["--field-store", store, "--top-k", "4", "--workers", "1", "--output", str(tmp_path / "precomputed"), *extra]
+    ))
+    return str(tmp_path / "precomputed")
+
+
+def test_get_serves_the_run_it_opened_across_a_publish(tmp_path):
+    out = _run(tmp_path, seed=1)
+    old = PrecomputedMatches.open(out)
+    before = old.get("user_5")
+    assert len(before) == 4 and all(m["metadata"]["seed"] == 1 for m in before)
+    assert "user_5" not in [m["id"] for m in before]
+    assert [m["score"] for m in before] == sorted((m["score"] for m in before), reverse=True)
+    assert old.get("user_5", 2) == before[:2] and old.get("nobody") is None
+
+    _run(tmp_path, seed=2)  # swaps a new directory in
+    assert old.get("user_5") == before  # the open store keeps its mapped files
+    new = PrecomputedMatches.open(out)
+    assert all(m["metadata"]["seed"] == 2 for m in new.get("user_5"))
+    old.close()
+    new.close()
+
+
+def test_float16_scores_keep_the_order(tmp_path):
+    exact = PrecomputedMatches.open(_run(tmp_path, 3))
+    rows = {uid: exact.get(uid) for uid in exact.ids}
+    exact.close()
+    small = PrecomputedMatches.open(_run(tmp_path, 3, "--storage", "float16"))
+    assert small.scores.dtype == np.float16 and small.meta["storage"] == "float16"
+    for uid, want in rows.items():
+        got = small.get(uid)
+        assert [m["id"] for m in got] == [m["id"] for m in want]
+        np.testing.assert_allclose([m["score"] for m in got], [m["score"] for m in want], atol=1e-3)
+    small.close()
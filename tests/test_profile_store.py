@@ -0,0 +1,66 @@
+import sqlite3
+
+import pytest
+
+from src.profile_store import ProfileStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    with ProfileStore(str(tmp_path / "profiles.db")) as store:
+        yield store
+
+
+def test_replace_keeps_one_row_per_id_and_moves_it_to_the_end(store):
+    store.put_many([("a", {"name": "Asha"}), ("b", {"name": "Ben"}), ("c", {"name": "Chen"})])
+    store.put("a", {"name": "Asha", "role": "Mentor"}, saved_at="2024-01-01 10:00:00")
+    assert len(store) == 3
+    assert store.get("a") == {"name": "Asha", "role": "Mentor"}
+    assert [uid for uid, _ in store.iter_profiles()] == ["b", "c", "a"]
+    assert store.latest() == ("a", {"name": "Asha", "role": "Mentor"})
+    assert "a" in store and "z" not in store and store.get("z") is None
+
+
+def test_same_name_profiles_no_longer_overwrite_each_other(store):
+    store.put("user_1", {"name": "Sam"})
+    store.put("user_2", {"name": "Sam"})
+    assert store.get_many(["user_1", "user_2", "nobody"]) == {"user_1": {"name": "Sam"}, "user_2": {"name": "Sam"}}
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 3, 7, 100])
+def test_keyset_iteration_returns_every_row_once_in_write_order(store, batch_size):
+    store.put_many((f"u{i}", {"i": i}) for i in range(7))
+    assert list(store.iter_profiles(batch_size)) == [(f"u{i}", {"i": i}) for i in range(7)]
+
+
+def test_writes_during_a_scan_show_up_at_its_end(store):
+    store.put_many((f"u{i}", {"i": i}) for i in range(5))
+    seen = []
+    for uid, profile in store.iter_profiles(batch_size=2):
+        seen.append(uid)
+        if uid == "u1":
+            store.put("u0", {"i": 0, "edited": True})  # already scanned: comes back once more, edited
+            store.put("new", {"i": 5})
+    assert seen == ["u0", "u1", "u2", "u3", "u4", "u0", "new"]
+
+
+def test_get_many_beyond_the_parameter_chunk(store):
+    store.put_many((f"u{i}", {"i": i}) for i in range(1200))
+    found = store.get_many([f"u{i}" for i in range(0, 1300, 3)])
+    assert found == {f"u{i}": {"i": i} for i in range(0, 1200, 3)}
+
+
+def test_failed_batch_is_rolled_back(store):
+    store.put("keep", {"ok": True})
+    with pytest.raises(sqlite3.Error):
+        store.put_many([("x", {}), (["not", "an", "id"], {})])
+    assert "x" not in store and len(store) == 1
+    store.put("after", {})  # the connection is usable again
+    assert len(store) == 2
+
+
+def test_a_second_connection_sees_committed_writes(tmp_path):
+    path = str(tmp_path / "shared.db")
+    with ProfileStore(path) as writer, ProfileStore(path, synchronous="NORMAL") as reader:
+        writer.put("user_1", {"name": "Asha"})
+        assert reader.get("user_1") == {"name": "Asha"}
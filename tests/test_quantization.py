@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from scripts.bench_quantization import recall, top_rows
+from src.local_index import LocalIndex, _normalize_rows
+from src.quantization import QUANT_MIN_TRAIN_SIZE, make_codec
+
+N, DIM, K = 3000, 32, 10
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((12, DIM)).astype(np.float32)
+    vectors = centers[rng.integers(len(centers), size=N)] + 0.5 * rng.standard_normal((N, DIM)).astype(np.float32)
+    unit, norms = _normalize_rows(vectors)
+    unit = unit.astype(np.float32)
+    ids = [str(i) for i in range(N)]
+    queries = unit[rng.choice(N, size=50, replace=False)]
+    exact = LocalIndex.from_arrays(ids, unit, norms, [{}] * N)
+    kth = [exact.query(q, top_k=K, include_metadata=False)["matches"][-1]["score"] for q in queries]
+    return ids, unit, norms, queries, kth, exact.vector_bytes()
+
+
+# minimum recall@10 without / with an exact re-rank of 100 candidates, and the most RAM per vector
+@pytest.mark.parametrize("storage, min_recall, min_reranked, max_bytes", [
+    ("float16", 0.99, 1.0, 2 * DIM),
+    ("int8", 0.9, 1.0, DIM + 1),
+    ("pq", 0.3, 0.95, DIM // 4 + 12),
+])
+def test_recall_vs_memory(data, storage, min_recall, min_reranked, max_bytes):
+    ids, unit, norms, queries, kth, float32_bytes = data
+    index = LocalIndex.from_arrays(ids, unit, norms, [{}] * N, storage=storage)
+    assert recall(top_rows(index, queries, K), unit, queries, kth) >= min_recall
+    assert index.vector_bytes() / N <= max_bytes < float32_bytes / N
+
+    reranked = LocalIndex.from_arrays(ids, unit, norms, [{}] * N, storage=storage, rerank=100)
+    assert recall(top_rows(reranked, queries, K), unit, queries, kth) >= min_reranked
+
+
+@pytest.mark.parametrize("storage", ["float16", "int8", "pq"])
+def test_rerank_returns_exact_scores_best_first(data, storage):
+    ids, unit, norms, queries, _, _ = data
+    index = LocalIndex.from_arrays(ids, unit, norms, [{}] * N, storage=storage, rerank=50)
+    for q in queries[:10]:
+        matches = index.query(q, top_k=K, include_metadata=False)["matches"]
+        scores = [m["score"] for m in matches]
+        np.testing.assert_allclose(scores, [float(unit[int(m["id"])] @ q) for m in matches], rtol=1e-5, atol=1e-6)
+        assert scores == sorted(scores, reverse=True)
+
+
+@pytest.mark.parametrize("storage", ["float16", "int8", "pq"])
+def test_fetch_and_vectors_stay_exact(data, storage):
+    ids, unit, norms, _, _, _ = data
+    index = LocalIndex.from_arrays(ids, unit, norms, [{}] * N, storage=storage)
+    np.testing.assert_array_equal(np.asarray(index.vectors), unit)
+    got = index.fetch(["7"])["vectors"]["7"]["values"]
+    np.testing.assert_allclose(got, unit[7] * norms[7], rtol=1e-6)
+
+
+@pytest.mark.parametrize("storage", ["int8", "pq"])
+def test_untrained_codecs_score_exactly(data, storage):
+    ids, unit, norms, queries, _, _ = data
+    n = QUANT_MIN_TRAIN_SIZE - 1
+    small = LocalIndex(DIM, storage=storage)
+    small.upsert([{"id": ids[i], "values": unit[i] * norms[i]} for i in range(n)])
+    exact = LocalIndex.from_arrays(ids[:n], unit[:n], norms[:n], [{}] * n)
+    for q in queries[:5]:
+        assert top_rows(small, [q], K) == top_rows(exact, [q], K)
+
+
+@pytest.mark.parametrize("storage", ["float16", "int8", "pq"])
+def test_codec_round_trip_error_is_small(data, storage):
+    unit = data[1]
+    codec = make_codec(storage, DIM)
+    codec.fit(unit)
+    decoded = codec.decode(codec.encode(unit))
+    err = np.linalg.norm(decoded - unit, axis=1)
+    assert err.mean() < {"float16": 1e-3, "int8": 0.02, "pq": 0.3}[storage]
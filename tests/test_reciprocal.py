@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+
+from config.catalogs import NEED_OFFER_COMPATIBILITY, NEED_OPTIONS, OFFER_OPTIONS
+from src import reciprocal
+from src.reciprocal import (
+    ReciprocalIndex,
+    benefit_matrix,
+    compatibility_matrix,
+    encode_options,
+    mutual_benefit,
+    rescore_matches,
+)
+
+WEIGHT = 0.5
+
+
+def _profiles(n, seed=0):
+    rng = np.random.default_rng(seed)
+    pick = lambda options: [o for o in options if rng.random() < 0.25]  # noqa: E731 (some users get nothing)
+    return [{"needs": pick(NEED_OPTIONS), "offers": pick(OFFER_OPTIONS)} for _ in range(n)]
+
+
+def _benefit(needs, offers):
+    """Straight from the definition: sum of C[need][offer] over the pairs, / number of needs, capped at 1."""
+    if not needs:
+        return 0.0
+    total = sum(NEED_OFFER_COMPATIBILITY.get(nd, {}).get(of, 0.0) for nd in needs for of in offers)
+    return min(total / len(needs), 1.0)
+
+
+def _mutual(a, b):
+    return min(_benefit(a["needs"], b["offers"]), _benefit(b["needs"], a["offers"]))
+
+
+def _masks(profiles):
+    return (encode_options([p["needs"] for p in profiles], NEED_OPTIONS),
+            encode_options([p["offers"] for p in profiles], OFFER_OPTIONS))
+
+
+def test_bitmask_benefit_matches_the_definition():
+    profiles = _profiles(60)
+    C = compatibility_matrix()
+    needs, offers = _masks(profiles)
+    want = np.array([[_benefit(a["needs"], b["offers"]) for b in profiles] for a in profiles])
+    np.testing.assert_allclose(benefit_matrix(needs, offers, C), want, rtol=1e-6, atol=1e-6)
+    want = np.array([[_mutual(a, b) for b in profiles] for a in profiles])
+    np.testing.assert_allclose(mutual_benefit(needs, offers, needs, offers, C), want, rtol=1e-6, atol=1e-6)
+
+
+def test_encode_options_takes_strings_lists_and_ignores_unknowns():
+    masks = encode_options(["Job", ["Job", "Investor", "Not An Option"], None, []], NEED_OPTIONS)
+    assert masks.tolist() == [1 << 1, (1 << 1) | (1 << 3), 0, 0]
+
+
+def _brute_force(unit, profiles, k, query=None, query_profile=None):
+    """Reciprocal top-k scores of each user (or of one query), mutual pairs only, self excluded."""
+    queries = [(i, unit[i], profiles[i]) for i in range(len(unit))] if query is None else [(None, query, query_profile)]
+    out = []
+    for i, q, qp in queries:
+        scored = [
+            (float(q @ unit[j]) + WEIGHT * _mutual(qp, profiles[j]), j)
+            for j in range(len(unit)) if j != i and _mutual(qp, profiles[j]) > 0
+        ]
+        scored.sort(reverse=True)
+        out.append(scored[:k])
+    return out
+
+
+@pytest.mark.parametrize("candidate_block", [7, 65536])
+def test_reciprocal_index_matches_brute_force(monkeypatch, candidate_block):
+    monkeypatch.setattr(reciprocal, "CANDIDATE_BLOCK_SIZE", candidate_block)
+    monkeypatch.setattr(reciprocal, "QUERY_BLOCK_SIZE", 16)
+    n, k = 150, 5
+    profiles = _profiles(n, seed=1)
+    vectors = np.random.default_rng(2).standard_normal((n, 8)).astype(np.float32)
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    rix = ReciprocalIndex.from_profiles([str(i) for i in range(n)], vectors, profiles, weight=WEIGHT)
+    want = _brute_force(unit, profiles, k)
+
+    seen = set()
+    for q_rows, best_rows, best_scores in rix.iter_top_k(k):
+        for q, rows, scores in zip(q_rows.tolist(), best_rows, best_scores):
+            seen.add(q)
+            expected = want[q]
+            found = [(float(s), int(r)) for r, s in zip(rows, scores) if r >= 0]
+            assert len(found) == len(expected)
+            np.testing.assert_allclose([s for s, _ in found], [s for s, _ in expected], rtol=1e-5, atol=1e-5)
+            assert q not in [r for _, r in found]
+            for s, r in found:  # every returned row really scores what it says
+                assert s == pytest.approx(float(unit[q] @ unit[r]) + WEIGHT * _mutual(profiles[q], profiles[r]), abs=1e-5)
+            assert np.all(np.isneginf(scores[len(found):]))
+    assert seen == set(range(n))
+
+
+def test_query_for_a_new_profile_matches_brute_force():
+    n, k = 120, 8
+    profiles = _profiles(n, seed=3)
+    vectors = np.random.default_rng(4).standard_normal((n, 8)).astype(np.float32)
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    rix = ReciprocalIndex.from_profiles([str(i) for i in range(n)], vectors, profiles, weight=WEIGHT)
+    new = {"needs": ["Co-Founder", "Investor"], "offers": ["Code/Design", "Capital"]}
+    q = np.random.default_rng(5).standard_normal(8).astype(np.float32)
+    got = rix.query(q, new["needs"], new["offers"], k)
+    want = _brute_force(unit, profiles, k, query=q / np.linalg.norm(q), query_profile=new)[0]
+    np.testing.assert_allclose([m["score"] for m in got], [s for s, _ in want], rtol=1e-5, atol=1e-5)
+    assert rix.query(np.zeros(8), new["needs"], new["offers"], k) == []
+
+
+def test_rescore_matches_keeps_mutual_matches_only():
+    profile = {"needs": ["Client"], "offers": ["Code/Design"]}
+    matches = [
+        {"id": "a", "score": 0.9, "metadata": {"needs": ["Collaborator"], "offers": ["Capital"]}},   # both gain
+        {"id": "b", "score": 0.95, "metadata": {"needs": [], "offers": ["Capital"]}},               # one-sided
+        {"id": "c", "score": 0.1, "metadata": {"needs": ["Collaborator"], "offers": ["Distribution"]}},
+    ]
+    kept = rescore_matches(profile, matches, weight=WEIGHT)
+    assert [m["id"] for m in kept] == ["a", "c"]
+    for m in kept:
+        meta = next(x["metadata"] for x in matches if x["id"] == m["id"])
+        mutual = _mutual(profile, meta)
+        assert m["mutual_benefit"] == pytest.approx(mutual)
+        assert m["score"] == pytest.approx(next(x["score"] for x in matches if x["id"] == m["id"]) + WEIGHT * mutual)
@@ -0,0 +1,88 @@
+import multiprocessing as mp
+import os
+
+import numpy as np
+
+from src.shared_index import SharedIndex
+
+DIM = 8
+# spawn, not fork: a forked child would share the parent's flock file description
+CTX = mp.get_context("spawn")
+
+
+def unit(i: int) -> list:
+    vec = np.zeros(DIM, dtype=np.float32)
+    vec[i % DIM] = 1.0
+    return vec.tolist()
+
+
+def write(path: str, user_id: str, axis: int):
+    SharedIndex(path, DIM).upsert([{"id": user_id, "values": unit(axis), "metadata": {"location": user_id}}])
+
+
+def crash_mid_write(path: str, user_id: str, axis: int, torn_tail: bool):
+    """Do upsert()'s steps up to the log append, then die before bumping COUNT/GENERATION."""
+    index = SharedIndex(path, DIM)
+    with index._writer():
+        index.refresh(force=True)
+        row = index._count
+        index._vectors[row] = unit(axis)
+        index._norms[row] = 1.0
+        os.write(index._log_fd, index._log_line(row, user_id, {"location": user_id}))
+        if torn_tail:
+            os.write(index._log_fd, b'{"row": ')
+        os._exit(1)
+
+
+def top_ids(path: str, queue):
+    index = SharedIndex(path, DIM)
+    queue.put({
+        "rows": {uid: index._id_to_row[uid] for uid in index.ids},
+        "top": [index.query(unit(axis), top_k=1)["matches"][0]["id"] for axis in range(4)],
+        "count": len(index),
+    })
+
+
+def run(target, *args):
+    proc = CTX.Process(target=target, args=args)
+    proc.start()
+    proc.join(60)
+    return proc.exitcode
+
+
+def other_process_view(path: str) -> dict:
+    queue = CTX.Queue()
+    assert run(top_ids, path, queue) == 0
+    return queue.get(timeout=10)
+
+
+def test_writes_from_another_process_are_visible(tmp_path):
+    path = str(tmp_path / "idx")
+    reader = SharedIndex(path, DIM)
+    assert len(reader) == 0
+    assert run(write, path, "a", 0) == 0
+    assert run(write, path, "b", 1) == 0
+    assert len(reader) == 2
+    assert reader.query(unit(1), top_k=1)["matches"][0]["id"] == "b"
+    assert reader.query(unit(0), top_k=1, filter={"location": {"$eq": "a"}})["matches"][0]["id"] == "a"
+
+
+def test_rows_left_by_a_dead_writer_are_not_reused(tmp_path):
+    path = str(tmp_path / "idx")
+    assert run(write, path, "a", 0) == 0
+    assert run(crash_mid_write, path, "orphan", 1, False) == 1
+    assert run(crash_mid_write, path, "torn", 3, True) == 1
+
+    index = SharedIndex(path, DIM)  # a writer that started before the crashes works the same way
+    index.upsert([{"id": "c", "values": unit(2), "metadata": {}}])
+
+    for view in (
+        {"rows": {uid: index._id_to_row[uid] for uid in index.ids}, "count": len(index)},
+        other_process_view(path),
+    ):
+        rows = view["rows"]
+        assert len(set(rows.values())) == len(rows) == view["count"]
+        assert set(rows) == {"a", "orphan", "torn", "c"}
+    assert other_process_view(path)["top"] == ["a", "orphan", "c", "torn"]
+    with open(path + ".log", "rb") as f:
+        assert f.read().endswith(b"\n")
@@ -0,0 +1,60 @@
+import numpy as np
+
+from config.variables import VARIABLES
+from src.embeddings import InferenceEmbedder, embed_user_fields, field_text
+from src.snapshot import ProfileSnapshot, SnapshotWriter
+from src.utils import text_to_tokens
+
+PROFILES = [
+    {"name": "Asha Rao", "age": 3.7, "experience": 3.7, "domain": "Computer Science",
+     "skills": ["Python", "Machine Learning"], "one_line_bio": "Builds ML tools.",
+     "past_projects": ["Chat bot for clinics", "", "Crop yield model"]},
+    {"name": "Ben", "age": 30.0, "experience": 12, "skills": [], "location": "Delhi India"},
+    {"name": "Chen", "age": "thirty", "experience": 2 ** 60, "domain": "Not In The Catalog", "favourite": "tea"},
+    {"name": "Dana", "age": None, "skills": ["Python", "Rust"], "experience": True, "past_projects": []},
+]
+
+
+def _embedder(profiles):
+    tokens = sorted({t for p in profiles for v in p.values() if v is not None for t in text_to_tokens(field_text(v))})
+    vectors = np.random.default_rng(0).standard_normal((len(tokens), 8)).astype(np.float32)
+    return InferenceEmbedder(tokens, vectors)
+
+
+def _write(tmp_path, profiles):
+    path = str(tmp_path / "profiles")
+    with SnapshotWriter(path) as writer:
+        writer.append([f"user_{i}" for i in range(len(profiles))], profiles)
+    return ProfileSnapshot.open(path)
+
+
+def test_decode_returns_the_original_profiles(tmp_path):
+    snapshot = _write(tmp_path, PROFILES)
+    expected = [{k: v for k, v in p.items() if v is not None} for p in PROFILES]
+    decoded = snapshot.decode()
+    assert decoded == expected
+    # same types too: 30.0 stays a float, 12 an int
+    assert [{k: type(v) for k, v in p.items()} for p in decoded] == [{k: type(v) for k, v in p.items()} for p in expected]
+    assert snapshot.profile("user_2") == expected[2]
+    assert list(snapshot.iter_profiles(block_rows=3)) == [(f"user_{i}", p) for i, p in enumerate(expected)]
+
+
+def test_embed_fields_matches_embed_user_fields(tmp_path):
+    snapshot = _write(tmp_path, PROFILES)
+    embedder = _embedder(PROFILES)
+    field_vecs, present = snapshot.embed_fields(embedder, VARIABLES)
+    want_vecs, want_present = embed_user_fields(PROFILES, embedder, VARIABLES)
+    np.testing.assert_array_equal(present, want_present)
+    np.testing.assert_allclose(field_vecs, want_vecs, rtol=1e-5, atol=1e-6)
+
+    blocks = list(snapshot.iter_embedded(embedder, VARIABLES, block_rows=3))
+    np.testing.assert_allclose(np.concatenate([b[1] for b in blocks]), want_vecs, rtol=1e-5, atol=1e-6)
+
+
+def test_catalog_options_keep_their_codes(tmp_path):
+    snapshot = _write(tmp_path, PROFILES)
+    first = snapshot.columns["domain"].dictionary
+    again = _write(tmp_path / "again", list(reversed(PROFILES))).columns["domain"].dictionary
+    # catalog entries first, in catalog order; unseen values appended after them
+    assert first.index("Computer Science") == again.index("Computer Science")
+    assert first[-1] == again[-1] == "Not In The Catalog"
@@ -0,0 +1,126 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from src import local_index
+from src.async_index import AsyncIndexClient
+from src.write_buffer import BufferedIndexClient
+
+
+class FlakyIndexClient(AsyncIndexClient):
+    """AsyncIndexClient whose first `failures` upserts raise."""
+
+    def __init__(self, index, failures: int = 0):
+        super().__init__(local_index, index, max_workers=2, max_pending=16)
+        self.failures = failures
+        self.calls = 0
+
+    async def upsert_users(self, user_vectors):
+        self.calls += 1
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("index unavailable")
+        return await super().upsert_users(user_vectors)
+
+
+def make_index():
+    index = local_index.LocalIndex(4)
+    index.upsert([{"id": "old", "values": [1, 0, 0, 0], "metadata": {"location": "Delhi India"}}])
+    return index
+
+
+def doc(user_id, vector, location="Mumbai India"):
+    return {"id": user_id, "vector": vector, "metadata": {"location": location}}
+
+
+def ids(res):
+    return [m["id"] for m in res["matches"]]
+
+
+def test_buffered_vectors_are_visible_before_and_after_flush():
+    async def run():
+        index = make_index()
+        buffer = BufferedIndexClient(FlakyIndexClient(index), max_batch=10, max_age=0.05, linger=0.2)
+        await buffer.upsert_users([doc("new", [0.9, 0.1, 0, 0])])
+        query = np.array([1, 0, 0, 0], dtype=np.float32)
+
+        # queued, not in the index yet
+        assert len(index) == 1
+        res = await buffer.query_similar(query, top_k=5)
+        assert ids(res) == ["old", "new"]
+        assert res["matches"][1]["score"] == pytest.approx(0.9 / np.hypot(0.9, 0.1), rel=1e-5)
+        assert ids(await buffer.query_similar(query, top_k=5, filter={"location": {"$eq": "Delhi India"}})) == ["old"]
+        assert ids(await buffer.query_similar(query, top_k=1)) == ["old"]
+        batch = await buffer.query_similar_batch(np.stack([query, np.zeros(4, np.float32)]), top_k=5)
+        assert [ids(r) for r in batch] == [["old", "new"], []]
+        assert set(await buffer.fetch_vectors(["new", "old", "missing"])) == {"new", "old"}
+
+        # flushed by age: in the index, still served from the buffer while it lingers, never twice
+        await asyncio.sleep(0.1)
+        assert len(index) == 2
+        assert buffer.stats()["visible"] == 1
+        assert ids(await buffer.query_similar(query, top_k=5)) == ["old", "new"]
+
+        await asyncio.sleep(0.25)
+        assert buffer.stats()["visible"] == 0
+        assert ids(await buffer.query_similar(query, top_k=5)) == ["old", "new"]
+        await buffer.aclose()
+
+    asyncio.run(run())
+
+
+def test_flushes_coalesce_by_size():
+    async def run():
+        inner = FlakyIndexClient(make_index())
+        buffer = BufferedIndexClient(inner, max_batch=4, max_age=10)
+        for i in range(8):
+            await buffer.upsert_users([doc(f"u{i}", [0, 1, 0, i])])
+        await asyncio.sleep(0)
+        await asyncio.gather(*buffer._tasks)
+        assert inner.calls == 2
+        assert buffer.stats()["flushes"]["size"] == 2
+        await buffer.aclose()
+
+    asyncio.run(run())
+
+
+def test_failed_flush_is_requeued_then_dropped_after_max_retries():
+    async def run():
+        index = make_index()
+        buffer = BufferedIndexClient(FlakyIndexClient(index, failures=2), max_batch=10, max_age=0.01, max_retries=3)
+        await buffer.upsert_users([doc("new", [0, 1, 0, 0])])
+        await asyncio.sleep(0.1)
+        # two failures, then the retry lands
+        stats = buffer.stats()
+        assert (stats["failures"], stats["dropped"], stats["pending"]) == (2, 0, 0)
+        assert "new" in index._id_to_row
+
+        buffer.inner.failures = 100
+        await buffer.upsert_users([doc("doomed", [0, 0, 1, 0])])
+        await asyncio.sleep(0.2)
+        stats = buffer.stats()
+        assert stats["dropped"] == 1 and stats["pending"] == 0
+        assert buffer.inner.calls == 3 + 4  # 1 try + 3 retries
+        assert "doomed" not in index._id_to_row
+        assert "doomed" not in ids(await buffer.query_similar(np.array([0, 0, 1, 0], np.float32), top_k=5))
+        await buffer.aclose()
+
+    asyncio.run(run())
+
+
+def test_drain_flushes_everything_before_close():
+    async def run():
+        index = make_index()
+        buffer = BufferedIndexClient(FlakyIndexClient(index, failures=1), max_batch=3, max_age=60)
+        await buffer.upsert_users([doc(f"u{i}", [0, 1, 0, i]) for i in range(2)])
+        with pytest.raises(RuntimeError):
+            buffer.close()  # would drop the queued vectors
+        await buffer.upsert_users([doc(f"u{i}", [0, 1, 0, i]) for i in range(2, 7)])
+        await buffer.drain()
+        assert buffer.stats()["pending"] == 0 and not buffer._tasks
+        assert len(index) == 8
+        assert buffer.stats()["flushes"]["drain"] >= 1
+        buffer.close()
+
+    asyncio.run(run())